@@ -0,0 +1,434 @@
+"""
+Lockstep batch battle simulator
+
+Runs many independent 1v1 battles at once, with the battle state held as NumPy arrays
+(struct-of-arrays) instead of one set of Python objects per battle. Every battle advances
+one tick at a time in lockstep and finished battles are masked out.
+
+Only the subset of the rules without items and hero powers is supported. For that subset
+the results are the same as `engine.batterulogico.battle`, down to the damage numbers,
+provided each battle gets the same seed as the `battle` call.
+"""
+import random
+import typing as T
+
+import numpy as np
+
+from engine.batterulogico import Battler
+from engine.batterulogico import INCREMENT
+from engine.batterulogico import Weather
+from engine.batterulogico import get_weather
+from engine.batterulogico import moves
+from engine.models.enums import PokemonType
+from engine.models.pokemon import BattleCard
+
+# move choices, in the order of the battle card move slots
+NO_MOVE = 0
+FAST_MOVE = 1
+CHARGED_MOVE = 2
+TM_MOVE = 3
+
+# the timer value a charged move leaves behind, see `launch_attack`
+CHARGED_MOVE_TIMER = -500
+BUFF_DIVISOR = 4
+
+
+class BatchResult(T.NamedTuple):
+    """
+    Results of a batch of 1v1 battles, one row per battle.
+
+    `winner` is 1 or 2 for the winning team and 0 for a tie. The damage arrays have one
+    column per team.
+    """
+
+    winner: np.ndarray
+    ticks: np.ndarray
+    damage_dealt: np.ndarray
+    damage_taken: np.ndarray
+
+
+def effective_stats(base: np.ndarray, stage: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `batterulogico.effective_stat`, with the operations in the same order.
+    """
+    with np.errstate(divide="ignore"):
+        return np.where(
+            stage > 0,
+            base * (BUFF_DIVISOR + stage) / BUFF_DIVISOR,
+            np.where(stage < 0, base * BUFF_DIVISOR / (BUFF_DIVISOR - stage), base),
+        )
+
+
+def hits_to_ko(hp: np.ndarray, damage: np.ndarray) -> np.ndarray:
+    """
+    How many hits of `damage` it takes to bring `hp` down to zero or below.
+
+    Matches subtracting `damage` in a loop as long as the damage is a whole number.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hits = np.maximum(np.ceil(hp / damage), 0)
+    hits = np.where(np.isfinite(hits), hits, 0)
+    # the division can be off by one ulp, so check the neighbours exactly
+    hits -= (hits > 0) & (hp - (hits - 1) * damage <= 0)
+    hits += hp - hits * damage > 0
+    return hits
+
+
+class BatchBattle:
+    """
+    State of a batch of 1v1 battles.
+
+    Per-battle values are arrays shaped `(N, 2)`, indexed by battle and team, and per-move
+    values are shaped `(N, 2, 3)` with the fast, charged and tm slots. Static values come
+    straight from the battle cards while the battle state lives in `hp`, `energy`, `timer`,
+    `am`, `dm` and `shield`.
+    """
+
+    def __init__(
+        self,
+        team1_cards: T.Sequence[BattleCard],
+        team2_cards: T.Sequence[BattleCard],
+        bonus_types: T.Sequence[PokemonType] = (),
+        seeds: T.Optional[T.Sequence[int]] = None,
+    ):
+        if len(team1_cards) != len(team2_cards):
+            raise ValueError("Both teams need one card per battle")
+        if seeds is None:
+            seeds = [random.getrandbits(32) for _ in team1_cards]
+        if len(seeds) != len(team1_cards):
+            raise ValueError("Need one seed per battle")
+
+        size = len(team1_cards)
+        self.size = size
+        # buff chances are the only randomness. each battle draws from its own stream, in the
+        # same order as a `battle` call seeded the same way would
+        self.rngs = [random.Random(seed) for seed in seeds]
+
+        self.power = np.zeros((size, 2, 3))
+        self.mult = np.zeros((size, 2, 3))
+        self.atk = np.zeros((size, 2))
+        self.dfn = np.zeros((size, 2))
+        self.cts = np.zeros((size, 2))
+        self.fast_energy = np.zeros((size, 2))
+        self.fast_cooldown = np.zeros((size, 2))
+        self.tm_flag = np.zeros((size, 2), dtype=bool)
+        # charged and tm slots only
+        self.spend = np.zeros((size, 2, 2))
+        self.min_energy = np.zeros((size, 2, 2))
+        self.cooldown = np.zeros((size, 2, 2))
+        self.self_debuff = np.zeros((size, 2, 2), dtype=bool)
+        self.weak_buff = np.zeros((size, 2, 2), dtype=bool)
+        self.has_buff = np.zeros((size, 2, 2), dtype=bool)
+        self.buff_chance = np.zeros((size, 2, 2))
+        self.buff_self = np.zeros((size, 2, 2), dtype=bool)
+        self.buff_opponent = np.zeros((size, 2, 2), dtype=bool)
+        self.buff_atk = np.zeros((size, 2, 2), dtype=np.int64)
+        self.buff_def = np.zeros((size, 2, 2), dtype=np.int64)
+
+        self.hp = np.zeros((size, 2))
+        self.energy = np.zeros((size, 2))
+        self.timer = np.zeros((size, 2))
+        self.am = np.zeros((size, 2), dtype=np.int64)
+        self.dm = np.zeros((size, 2), dtype=np.int64)
+        self.shield = np.zeros((size, 2), dtype=np.int64)
+        self.damage_dealt = np.zeros((size, 2))
+        self.damage_taken = np.zeros((size, 2))
+        self.winner = np.zeros(size, dtype=np.int8)
+        self.ticks = np.zeros(size, dtype=np.int64)
+
+        weather = get_weather(bonus_types)
+        for idx, (card1, card2) in enumerate(zip(team1_cards, team2_cards)):
+            battlers = [
+                Battler(self._prepare_card(card, weather), 0, team, nickname=None)
+                for team, card in ((1, card1), (2, card2))
+            ]
+            for side, battler in enumerate(battlers):
+                self._load(idx, side, battler, battlers[1 - side])
+
+    @staticmethod
+    def _prepare_card(card: BattleCard, weather: Weather) -> BattleCard:
+        """
+        Copy a card and apply the weather bonus, the same way `battle` does.
+        """
+        if card.item is not None:
+            raise ValueError(f"Batch battles do not support items, {card} holds {card.item}")
+        card = card.copy()
+        weather.apply(card)
+        return card
+
+    def _load(self, idx: int, side: int, battler: Battler, opponent: Battler):
+        card = battler.battlecard
+        self.power[idx, side] = battler.power
+        for slot in range(3):
+            self.mult[idx, side, slot] = (
+                opponent.profile.damage[battler.stab[slot]][battler.move_types[slot]] + card.multiplier
+            )
+        self.atk[idx, side] = battler.a
+        self.dfn[idx, side] = battler.d
+        self.cts[idx, side] = card.atk_spd_timer_cts
+        self.fast_energy[idx, side] = card._move_f_energy
+        self.fast_cooldown[idx, side] = moves[card.move_f.name]["cooldown"]
+        self.tm_flag[idx, side] = card.tm_flag == 1
+        self.spend[idx, side] = (card._move_ch_energy, card._move_tm_energy)
+
+        for slot, name in enumerate((card.move_ch.name, card.move_tm.name)):
+            move = moves[name]
+            self.min_energy[idx, side, slot] = move["energy"]
+            self.cooldown[idx, side, slot] = move["cooldown"]
+            self.self_debuff[idx, side, slot] = move.get("archetype") == "Self-Debuff"
+            if "buffs" in move and "buffTarget" in move and "buffApplyChance" in move:
+                chance = float(move["buffApplyChance"])
+                self.has_buff[idx, side, slot] = True
+                self.buff_chance[idx, side, slot] = chance * 1000
+                self.buff_self[idx, side, slot] = move["buffTarget"] == "self"
+                self.buff_opponent[idx, side, slot] = move["buffTarget"] == "opponent"
+                self.buff_atk[idx, side, slot] = int(move["buffs"][0])
+                self.buff_def[idx, side, slot] = int(move["buffs"][1])
+                self.weak_buff[idx, side, slot] = (
+                    move["buffTarget"] == "self" or (move["buffTarget"] == "opponent" and chance == 1)
+                )
+
+        self.hp[idx, side] = battler.hp
+        self.energy[idx, side] = battler.energy
+        self.shield[idx, side] = card.bonus_shield
+
+    def damage(self, side: int, slot: int, idx: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `calculate_damage` for one team and move slot in the selected battles.
+        """
+        other = 1 - side
+        atkstat = effective_stats(self.atk[idx, side], self.am[idx, side])
+        defstat = effective_stats(self.dfn[idx, other], self.dm[idx, other])
+        raw = self.power[idx, side, slot] * (atkstat / defstat) * self.mult[idx, side, slot] * 0.5 * 1.3
+        return np.maximum(1, np.floor(raw))
+
+    def turns_to_die(self, side: int, idx: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `turnstodie`, with `side` as the battler under threat.
+        """
+        other = 1 - side
+        dps = self.damage(other, 0, idx) * self.fast_cooldown[idx, other] / 500
+        charged = self.damage(other, 1, idx)
+        tm = self.damage(other, 2, idx)
+        use_charged = charged > tm
+        which = np.where(use_charged, charged, tm)
+        cost = np.where(use_charged, self.min_energy[idx, other, 0], self.min_energy[idx, other, 1])
+        # `turnstodie` spends its shield count before using it, so shields never matter
+        incoming = np.maximum(np.floor((self.energy[idx, other] - 1) / cost), 0)
+
+        hp = self.hp[idx, side]
+        charged_hits = np.minimum(incoming, hits_to_ko(hp, which))
+        hp = hp - charged_hits * which
+        return charged_hits + np.where(hp > 0, hits_to_ko(hp, dps), 0)
+
+    def choose_move(self, side: int, idx: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `calculate_optimal_move`. Returns one of the move choice constants.
+        """
+        other = 1 - side
+        energy = self.energy[idx, side]
+        timer = self.timer[idx, side]
+        fast = self.damage(side, 0, idx)
+        holder = []
+        for slot in range(2):
+            ready = (energy >= self.min_energy[idx, side, slot]) & (timer >= self.cooldown[idx, side, slot])
+            if slot == 1:
+                ready &= self.tm_flag[idx, side]
+            damage = np.where(ready, self.damage(side, slot + 1, idx), -1)
+            # self debuffing moves are held back unless they can finish the job in time
+            check = ready & self.self_debuff[idx, side, slot]
+            if check.any():
+                sub = idx[check]
+                max_times = np.floor(self.energy[sub, side] / self.min_energy[sub, side, slot]) - self.shield[sub, other]
+                theoretical = max_times * damage[check]
+                use = (theoretical > self.hp[sub, other]) & (max_times < self.turns_to_die(side, sub))
+                damage[np.flatnonzero(check)[~use]] = -1
+            holder.append(damage)
+        charged, tm = holder
+
+        fast_ready = timer >= self.cts[idx, side]
+        return np.select(
+            [
+                (fast >= charged) & (fast >= tm) & fast_ready,
+                (charged >= tm) & (charged > 0),
+                tm > 0,
+                fast_ready,
+            ],
+            [FAST_MOVE, CHARGED_MOVE, TM_MOVE, FAST_MOVE],
+            NO_MOVE,
+        )
+
+    def will_shield(self, side: int, slot: np.ndarray, idx: np.ndarray, proposed: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `will_shield`, for charged (0) or tm (1) slots.
+        """
+        other = 1 - side
+        weak = self.weak_buff[idx, side, slot]
+        fast_dpt = self.damage(side, 0, idx) / (self.fast_cooldown[idx, side] / 500)
+        return ~(weak & (proposed < self.hp[idx, other] / 1.5) & (fast_dpt <= 1.5))
+
+    def forecast(self, side: int, idx: np.ndarray) -> T.Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized `forecast_attack`. Returns whether the move is charged and whether it is fatal.
+        """
+        other = 1 - side
+        move = self.choose_move(side, idx)
+        hp = self.hp[idx, other]
+        fast = self.damage(side, 0, idx)
+        fast_ko = (self.timer[idx, side] >= self.cts[idx, side]) & (fast >= hp)
+
+        charged = ~fast_ko & (move >= CHARGED_MOVE)
+        slot = np.where(move == TM_MOVE, 1, 0)
+        damage = np.where(slot == 1, self.damage(side, 2, idx), self.damage(side, 1, idx))
+        shielded = (self.shield[idx, other] > 0) & self.will_shield(side, slot, idx, damage)
+        damage = np.where(shielded, 1, damage)
+
+        fatal = fast_ko | (charged & (damage >= hp)) | (~fast_ko & (move == FAST_MOVE) & (fast >= hp))
+        return charged, fatal
+
+    def resolve_priority(self, idx: np.ndarray) -> T.Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized `resolve_priority`. Returns `(can_attack_1, can_attack_2)`.
+        """
+        threat = np.zeros(len(idx), dtype=bool)
+        for side in range(2):
+            ready = self.timer[idx, side] >= self.cts[idx, side]
+            for slot in range(3):
+                threat |= ready & (self.damage(side, slot, idx) >= self.hp[idx, 1 - side])
+        can_attack_1 = np.ones(len(idx), dtype=bool)
+        can_attack_2 = np.ones(len(idx), dtype=bool)
+        if not threat.any():
+            return can_attack_1, can_attack_2
+
+        sub = idx[threat]
+        charged1, fatal1 = self.forecast(0, sub)
+        charged2, fatal2 = self.forecast(1, sub)
+        atk1 = self.atk[sub, 0]
+        atk2 = self.atk[sub, 1]
+        priority = np.select(
+            [charged1 & charged2 & (atk1 > atk2), charged1 & charged2 & (atk2 > atk1), charged1 & charged2, charged1, charged2],
+            [1, 2, 0, 1, 2],
+            0,
+        )
+        can_attack_1[threat] = ~(fatal2 & (priority == 2))
+        can_attack_2[threat] = ~(fatal1 & (priority == 1))
+        return can_attack_1, can_attack_2
+
+    def launch_attack(self, side: int, idx: np.ndarray, move: np.ndarray = None) -> np.ndarray:
+        """
+        Vectorized `launch_attack` for `side` in the selected battles. Returns which attacks were fatal.
+        """
+        other = 1 - side
+        if move is None:
+            move = self.choose_move(side, idx)
+        fast = self.damage(side, 0, idx)
+
+        # a lethal fast move takes priority and, like `is_lethal`, lands its damage twice
+        lethal = (fast >= self.hp[idx, other]) & (self.timer[idx, side] >= self.cts[idx, side])
+        if lethal.any():
+            sub = idx[lethal]
+            self.damage_dealt[sub, side] += fast[lethal]
+            self.hp[sub, other] -= fast[lethal]
+            self.damage_taken[sub, other] += fast[lethal]
+            self.timer[sub, side] = 0
+            move = np.where(lethal, FAST_MOVE, move)
+
+        charged = move >= CHARGED_MOVE
+        if charged.any():
+            self._charged_attack(side, idx[charged], move[charged] - CHARGED_MOVE)
+
+        is_fast = move == FAST_MOVE
+        if is_fast.any():
+            sub = idx[is_fast]
+            self.energy[sub, side] += self.fast_energy[sub, side]
+            damage = fast[is_fast]
+            self.hp[sub, other] -= damage
+            self.damage_dealt[sub, side] += damage
+            self.damage_taken[sub, other] += damage
+            self.timer[sub, side] -= self.cts[sub, side]
+
+        return (move != NO_MOVE) & (self.hp[idx, other] <= 0)
+
+    def _charged_attack(self, side: int, idx: np.ndarray, slot: np.ndarray):
+        other = 1 - side
+        self.energy[idx, side] -= self.spend[idx, side, slot]
+        self.timer[idx, side] = CHARGED_MOVE_TIMER
+        proposed = np.where(slot == 1, self.damage(side, 2, idx), self.damage(side, 1, idx))
+        block = (self.shield[idx, other] > 0) & self.will_shield(side, slot, idx, proposed)
+        self.shield[idx, other] -= block
+        damage = np.where(block, 1, proposed)
+        self.hp[idx, other] -= damage
+        self.damage_taken[idx, other] += damage
+        self.damage_dealt[idx, side] += damage
+
+        # buff rolls are rare enough to do one at a time
+        buffed = self.has_buff[idx, side, slot]
+        for battle, move_slot in zip(idx[buffed], slot[buffed]):
+            luck = self.rngs[battle].randint(1, 1000)
+            if self.buff_chance[battle, side, move_slot] < luck:
+                continue
+            if self.buff_opponent[battle, side, move_slot]:
+                target = other
+            elif self.buff_self[battle, side, move_slot]:
+                target = side
+            else:
+                continue
+            self.am[battle, target] += self.buff_atk[battle, side, move_slot]
+            self.dm[battle, target] += self.buff_def[battle, side, move_slot]
+
+    def run(self) -> BatchResult:
+        """
+        Run every battle to completion.
+        """
+        idx = np.arange(self.size)
+        while idx.size:
+            self.timer[idx] += INCREMENT
+            self.ticks[idx] += 1
+
+            move1 = self.choose_move(0, idx)
+            move2 = self.choose_move(1, idx)
+            acting = (move1 != NO_MOVE) | (move2 != NO_MOVE)
+            live = idx[acting]
+            move1 = move1[acting]
+
+            can_attack_1 = np.ones(len(live), dtype=bool)
+            can_attack_2 = np.ones(len(live), dtype=bool)
+            both_ready = (self.timer[live, 0] >= 500) & (self.timer[live, 1] >= 500)
+            if both_ready.any():
+                can_attack_1[both_ready], can_attack_2[both_ready] = self.resolve_priority(live[both_ready])
+
+            # team 1 attacks first, then team 2 picks its move against the updated state
+            dead2 = np.zeros(len(live), dtype=bool)
+            dead1 = np.zeros(len(live), dtype=bool)
+            if can_attack_1.any():
+                dead2[can_attack_1] = self.launch_attack(0, live[can_attack_1], move1[can_attack_1])
+            if can_attack_2.any():
+                dead1[can_attack_2] = self.launch_attack(1, live[can_attack_2])
+
+            over = dead1 | dead2
+            self.winner[live[over]] = np.select([dead1 & dead2, dead2], [0, 1], 2)[over]
+            finished = np.zeros(self.size, dtype=bool)
+            finished[live[over]] = True
+            idx = idx[~finished[idx]]
+
+        return BatchResult(
+            winner=self.winner.copy(),
+            ticks=self.ticks.copy(),
+            damage_dealt=self.damage_dealt.astype(np.int64),
+            damage_taken=self.damage_taken.astype(np.int64),
+        )
+
+
+def simulate_batch(
+    team1_cards: T.Sequence[BattleCard],
+    team2_cards: T.Sequence[BattleCard],
+    bonus_types: T.Sequence[PokemonType] = (),
+    seeds: T.Optional[T.Sequence[int]] = None,
+) -> BatchResult:
+    """
+    Simulate `team1_cards[i]` against `team2_cards[i]` for every i, all in one weather.
+
+    Cards must not hold items. `seeds` gives the random seed for each battle; passing the
+    same seed to `battle` gives identical results.
+    """
+    return BatchBattle(team1_cards, team2_cards, bonus_types, seeds).run()
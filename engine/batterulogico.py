@@ -52,42 +52,33 @@
 
 
 from bdb import effective
-import json
-import copy
 import math
+import random
+import threading
 import typing as T
-from random import randint
+from collections import OrderedDict
+from functools import lru_cache
 
-import os.path
 from engine.models.enums import Move, PokemonId
-from engine.models.battle import BattleEvent, Event
+from engine.models.battle import BattleEvent, Event, LogPolicy
 from engine.models.combat_hooks import CombatHook
 from engine.models.items import ComplexHeroPower
 from engine.models.pokemon import SHINY_STAT_MULT, BattleCard
+from engine.models.stats import Stats
 from engine.models.weather import WeatherType
 from engine.utils.gamemaster import gamemaster
+from engine.utils.type_chart import as_pokemon_type
+from engine.utils.type_chart import type_profile
 from engine.weather import WeatherManager
 from engine.models.enums import PokemonType
 
 if T.TYPE_CHECKING:
     from engine.models.items import CombatItem
 
-current_directory = os.path.dirname(__file__)
-parent_directory = os.path.split(current_directory)[0]
-parent_directory = os.path.split(parent_directory)[0]
-file_path = os.path.join(parent_directory,'autobattler_demo/battle_engine/src/data/gamemaster.json')
-# with open('../../battle_engine/src/data/gamemaster.json', 'r') as origin:
-with open(file_path, 'r') as origin:
-    dataset = json.load(origin)
-    #pokedex = {x["speciesId"] : x for x in dataset["pokemon"]} # creates a list of all pokemon
-
-#    moves = {x["moveId"] : x for x in dataset["moves"]} # creates a list of all moves
-# issue where SUPERPOWER is a move, but super_power is the id, basically
-    moves = {x["moveId"] : x for x in dataset["moves"]} # not name
-
-    types = dataset['types'] # creates a list of all types and their attributes
-    # how combat power modifies
-    # cpms = dataset["cpms"] or whatever
+# the battle engine shares the game's gamemaster rather than parsing its own copy
+file_path = gamemaster.path
+moves = gamemaster.moves # by move ID, e.g SUPER_POWER
+types = gamemaster.types # creates a list of all types and their attributes
 cpms = [0.0939999967813491, 0.135137430784308, 0.166397869586944, 0.192650914456886, 0.215732470154762, 0.236572655026622, 0.255720049142837, 0.273530381100769, 0.290249884128570, 0.306057381335773, 0.321087598800659, 0.335445032295077, 0.349212676286697, 0.362457748778790, 0.375235587358474, 0.387592411085168, 0.399567276239395, 0.411193549517250, 0.422500014305114, 0.432926413410414, 0.443107545375824, 0.453059953871985, 0.462798386812210, 0.472336077786704, 0.481684952974319, 0.490855810259008, 0.499858438968658, 0.508701756943992, 0.517393946647644, 0.525942508771329, 0.534354329109191, 0.542635762230353, 0.550792694091796, 0.558830599438087, 0.566754519939422, 0.574569148039264, 0.582278907299041, 0.589887911977272, 0.597400009632110, 0.604823657502073, 0.612157285213470, 0.619404110566050, 0.626567125320434, 0.633649181622743, 0.640652954578399, 0.647580963301656, 0.654435634613037, 0.661219263506722, 0.667934000492096, 0.674581899290818, 0.681164920330047, 0.687684905887771, 0.694143652915954, 0.700542893277978, 0.706884205341339, 0.713169102333341, 0.719399094581604, 0.725575616972598, 0.731700003147125, 0.734741011137376, 0.737769484519958, 0.740785574597326, 0.743789434432983, 0.746781208702482, 0.749761044979095, 0.752729105305821, 0.755685508251190, 0.758630366519684, 0.761563837528228, 0.764486065255226, 0.767397165298461, 0.770297273971590, 0.773186504840850, 0.776064945942412, 0.778932750225067, 0.781790064808426, 0.784636974334716, 0.787473583646825, 0.790300011634826, 0.792803950958807, 0.795300006866455, 0.797803921486970, 0.800300002098083, 0.802803892322847, 0.805299997329711, 0.807803863460723, 0.810299992561340, 0.812803834895026, 0.815299987792968, 0.817803806620319, 0.820299983024597, 0.822803778631297, 0.825299978256225, 0.827803750922782, 0.830299973487854, 0.832803753381377, 0.835300028324127, 0.837803755931569, 0.840300023555755, 0.842803729034748, 0.845300018787384, 0.847803702398935, 0.850300014019012, 0.852803676019539, 0.855300009250640, 0.857803649892077, 0.860300004482269, 0.862803624012168, 0.865299999713897]
 
 # current_team1_hp = current_team1.hp_iv*pokedex[current_team1.name.name]["baseStats"]["hp"]
@@ -96,6 +87,45 @@ cpms = [0.0939999967813491, 0.135137430784308, 0.166397869586944, 0.192650914456
 # I assume pokemon health doesn't initialize to 0, but if it does, need to create base stats for the pokemon
 
 class Battler:
+    """
+    Battle-local state for one Pokemon.
+
+    Numbers that get read every tick are flattened out of the `BattleCard` into plain slots
+    when the battle starts, which keeps pydantic attribute access out of the inner loop.
+    Energy lives here for the length of the battle and goes back to the card in
+    `write_back`.
+    """
+
+    __slots__ = (
+        "battlecard",
+        "team",
+        "nickname",
+        "a",
+        "d",
+        "hp",
+        "energy",
+        "id",
+        "dmg_dealt",
+        "dmg_taken",
+        "ready",
+        "timer",
+        "am",
+        "dm",
+        "profile",
+        "move_types",
+        "stab",
+        "tm_flag",
+        "move_f",
+        "move_ch",
+        "move_tm",
+        "power",
+        "move_energy",
+        "required_energy",
+        "cooldown",
+        "self_debuff",
+        "damage_memo",
+    )
+
     def __init__(
         self,
         battle_card: BattleCard,
@@ -114,6 +144,7 @@ class Battler:
         self.hp = self.battlecard.hitpoints
         if self.hp < 10:
             self.hp = 10
+        self.energy = battle_card.energy
 
         self.id = index # keep track of where on the bench it is. for keeping track of how much damage it does
         self.dmg_dealt = 0
@@ -125,13 +156,77 @@ class Battler:
         self.am = 0
         self.dm = 0
 
-        # can look at pokemon.js line 595 "self.activechargedmoves = []" to see sorting charged move array by cost, selecting an optimal move
+        # types do not change during a battle, so resolve them once up front
+        # move slots are ordered fast, charged, tm
+        self.profile = type_profile(battle_card.poke_type1, battle_card.poke_type2)
+        move_types = [
+            as_pokemon_type(battle_card._f_move_type),
+            as_pokemon_type(battle_card._ch_move_type),
+            as_pokemon_type(battle_card._tm_move_type),
+        ]
+        self.move_types = tuple(x.value for x in move_types)
+        self.stab = tuple(int(x in self.profile.types) for x in move_types)
+        self.tm_flag = battle_card.tm_flag == 1
+
+        # damage only depends on the buff stages once a battle is under way. anything else
+        # that changes damage (move power, the card multiplier) must call invalidate_damage
+        self.damage_memo: T.Dict[T.Tuple, T.Tuple[int, float]] = {}
+        self.load_moves()
 
-        # should maybe do energy and shields also, because currently I'm just using the battle_card info, which ideally isn't changed because the object isn't meant for that
+        # can look at pokemon.js line 595 "self.activechargedmoves = []" to see sorting charged move array by cost, selecting an optimal move
 
     def __repr__(self):
         return f"{self.battlecard.name} ({self.id}): HP={self.hp}"
 
+    def load_moves(self):
+        """
+        Flatten the card's moves into plain tuples, ordered fast, charged, tm.
+
+        Items that swap a move out mid battle need to call this again.
+        """
+        card = self.battlecard
+        self.move_f = card.move_f.name
+        self.move_ch = card.move_ch.name
+        self.move_tm = card.move_tm.name
+        self.power = (card._move_f_damage, card._move_ch_damage, card._move_tm_damage)
+        self.move_energy = (card._move_f_energy, card._move_ch_energy, card._move_tm_energy)
+        specs = [moves.get(name) or {} for name in (self.move_f, self.move_ch, self.move_tm)]
+        self.required_energy = tuple(spec.get("energy") for spec in specs)
+        self.cooldown = tuple(spec.get("cooldown") for spec in specs)
+        self.self_debuff = tuple(spec.get("archetype") == "Self-Debuff" for spec in specs)
+        self.invalidate_damage()
+
+    def write_back(self):
+        """
+        Copy battle state that lives on the battler back onto the card.
+        """
+        self.battlecard.energy = self.energy
+
+    def invalidate_damage(self):
+        """
+        Forget memoized damage numbers for moves used by this battler.
+        """
+        self.damage_memo.clear()
+
+
+class BattlerState(T.NamedTuple):
+    """
+    Battle state a battler builds up that its card does not keep, see `battle` lead_states
+    """
+
+    shields: int
+    am: int
+    dm: int
+
+    @classmethod
+    def of(cls, battler: Battler) -> "BattlerState":
+        return cls(battler.battlecard.bonus_shield, battler.am, battler.dm)
+
+    def restore(self, battler: Battler) -> None:
+        battler.battlecard.bonus_shield = self.shields
+        battler.am = self.am
+        battler.dm = self.dm
+
 
 class EventLogger:
     """
@@ -139,13 +234,22 @@ class EventLogger:
 
     Sorts them automatically.
 
+    Messages can be passed as a `str.format` template plus arguments. Formatting and the
+    `BattleEvent` models are deferred until the events are read, and a disabled logger
+    drops messages without doing any work at all. Since formatting happens later, arguments
+    should be plain values rather than objects that keep changing during the battle.
+
     Eventually can use something similar to implement some sort of action queue.
     """
 
-    def __init__(self):
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
         self.global_timer = 0
         self.sequence_idx = 0
-        self.events: T.List[Event] = []
+        self._records: T.List[T.Tuple[int, float, str, str, T.Tuple]] = []
+
+    def __bool__(self):
+        return self.enabled
 
     def increment_timer(self, incr: float):
         """
@@ -153,31 +257,51 @@ class EventLogger:
         """
         self.global_timer += incr
 
-    def __call__(self, category: str, msg: str):
+    def __call__(self, category: str, msg: str, *args: T.Any):
         """
         Log a message. Append a message to the list of events.
         """
-        self.events.append(
+        if not self.enabled:
+            return
+        self._records.append((self.sequence_idx, self.global_timer, category, msg, args))
+        self.sequence_idx += 1
+
+    @property
+    def events(self) -> T.List[BattleEvent]:
+        return [
             BattleEvent(
-                seq=self.sequence_idx,
-                timestamp=self.global_timer,
+                seq=seq,
+                timestamp=timestamp,
                 category=category,
-                value=msg
+                value=msg.format(*args) if args else msg
             )
-        )
-        self.sequence_idx += 1
+            for seq, timestamp, category, msg, args in self._records
+        ]
 
 
 class RenderLogger:
     """
     Callable that records all the render strings
+
+    Like the EventLogger, takes an optional `str.format` template and arguments and only
+    formats them when the output is read.
     """
 
-    def __init__(self):
-        self.statements = []
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._records: T.List[T.Tuple[str, T.Tuple]] = []
 
-    def __call__(self, msg: str):
-        self.statements.append(msg)
+    def __bool__(self):
+        return self.enabled
+
+    def __call__(self, msg: str, *args: T.Any):
+        if not self.enabled:
+            return
+        self._records.append((msg, args))
+
+    @property
+    def statements(self) -> T.List[str]:
+        return [msg.format(*args) if args else msg for msg, args in self._records]
 
     @property
     def output(self):
@@ -207,6 +331,9 @@ class HookExecutor:
         self.team1_items = self.get_all_team_items(self.team1) + team1_hero_items
         self.team2_items = self.get_all_team_items(self.team2) + team2_hero_items
 
+        # per hook dispatch tables for each pair of battlers the executor gets called with
+        self._tables: T.Dict[T.Tuple[Battler, Battler], T.Dict["CombatHook", HookDispatch]] = {}
+
     def get_all_team_items(self, team: T.List[Battler]):
         """
         Get all items
@@ -248,30 +375,17 @@ class HookExecutor:
 
         raise Exception("Battler not on either team")
 
-    def __call__(
+    def get_hook_context(
         self,
         hook: "CombatHook",
         battler1: Battler,
         battler2: Battler,
-        **context: T.Dict
-    ) -> None:
+    ) -> T.Tuple[T.List["CombatItem"], T.Dict]:
         """
-        Run combat item execution
+        Get the active items for a combat hook and the context their actions get called with
         """
-        if battler1 is None or battler2 is None:
-            return
-
-        context = context or dict()
-
-        if battler1 is not None:
-            battler1_team = self.get_battler_team(battler1)
-        else:
-            battler1_team = []
-
-        if battler2 is not None:
-            battler2_team = self.get_battler_team(battler2)
-        else:
-            battler2_team = []
+        battler1_team = self.get_battler_team(battler1)
+        battler2_team = self.get_battler_team(battler2)
 
         # determine the active items
         # for pre / post-battle hooks, all item effects should always trigger by default
@@ -283,61 +397,245 @@ class HookExecutor:
         active_items = team1_items.copy()
         active_items.update(team2_items)
 
+        context = dict()
+        if battler1_team == self.team1:
+            context['current_team1'] = battler1
+            context['team1_items'] = team1_items
+            context['team1'] = self.team1
+            context['current_team2'] = battler2
+            context['team2_items'] = team2_items
+            context['team2'] = self.team2
+        elif battler1_team == self.team2:
+            context['current_team1'] = battler2
+            context['team1_items'] = team2_items
+            context['team1'] = self.team2
+            context['current_team2'] = battler1
+            context['team2_items'] = team1_items
+            context['team2'] = self.team1
+        else:
+            raise Exception('omg')
+
+        return [item for item in active_items.values() if item is not None], context
+
+    def refresh(self) -> None:
+        """
+        Throw away the dispatch tables.
+
+        The active items only change when a battler faints, switches or gets revived, so the
+        battle loop calls this when one of those happens.
+        """
+        self._tables.clear()
+
+    def get_dispatch_table(self, battler1: Battler, battler2: Battler) -> T.Dict["CombatHook", "HookDispatch"]:
+        """
+        Get the bound item actions for every combat hook that has subscribers
+        """
+        table = self._tables.get((battler1, battler2))
+        if table is None:
+            table = {}
+            for hook in CombatHook:
+                items, context = self.get_hook_context(hook, battler1, battler2)
+                items = [item for item in items if item.implements(hook)]
+                if items:
+                    table[hook] = HookDispatch(items, [item.get_method(hook) for item in items], context)
+            self._tables[(battler1, battler2)] = table
+        return table
+
+    def get_subscribers(self, hook: "CombatHook", battler1: Battler, battler2: Battler) -> T.List["CombatItem"]:
+        """
+        Get the active items that actually do something on a combat hook
+        """
+        dispatch = self.get_dispatch_table(battler1, battler2).get(hook)
+        return dispatch.items if dispatch is not None else []
+
+    def __call__(
+        self,
+        hook: "CombatHook",
+        battler1: Battler,
+        battler2: Battler,
+        **context: T.Dict
+    ) -> None:
+        """
+        Run combat item execution
+        """
+        if battler1 is None or battler2 is None:
+            return
+
+        dispatch = self.get_dispatch_table(battler1, battler2).get(hook)
+        if dispatch is None:
+            return
+        context.update(dispatch.context)
+
         # run item callbacks
-        for item in active_items.values():
-            if item is None:
-                continue
-            kwargs = dict()
-            if battler1_team == self.team1:
-                kwargs['current_team1'] = battler1
-                kwargs['team1_items'] = team1_items
-                kwargs['team1'] = self.team1
-                kwargs['current_team2'] = battler2
-                kwargs['team2_items'] = team2_items
-                kwargs['team2'] = self.team2
-            elif battler1_team == self.team2:
-                kwargs['current_team1'] = battler2
-                kwargs['team1_items'] = team2_items
-                kwargs['team1'] = self.team2
-                kwargs['current_team2'] = battler1
-                kwargs['team2_items'] = team1_items
-                kwargs['team2'] = self.team1
-            else:
-                raise Exception('omg')
-            context.update(kwargs)
-            method = item.get_method(hook)
+        for method in dispatch.methods:
             method(
                 logger=self.logger,
                 render=self.render,
                 **context
             )
 
+    def skip_ticks(self, ticks: int, battler1: Battler, battler2: Battler) -> None:
+        """
+        Run the on tick item effects for a number of ticks in one go
+        """
+        dispatch = self.get_dispatch_table(battler1, battler2).get(CombatHook.ON_TICK)
+        if dispatch is None:
+            return
+        for item in dispatch.items:
+            item.on_ticks_action(
+                ticks,
+                logger=self.logger,
+                render=self.render,
+                **dispatch.context
+            )
+
+
+class HookDispatch(T.NamedTuple):
+    """
+    The subscribed items for a combat hook, their bound actions and the context to call them with
+    """
+
+    items: T.List["CombatItem"]
+    methods: T.List[T.Callable]
+    context: T.Dict[str, T.Any]
+
+
+class BattleContext:
+    """
+    State shared by the battle loop, `launch_attack` and the combat item hooks of one battle.
+
+    Every battle builds its own context instead of going through module globals, so battles
+    can run side by side (e.g in threads, or a preview next to a live battle).
+    """
+
+    def __init__(
+        self,
+        logger: EventLogger,
+        render: RenderLogger,
+        execute_hook: T.Optional[HookExecutor],
+        rng: random.Random,
+    ):
+        self.logger = logger
+        self.render = render
+        self.execute_hook = execute_hook
+        self.rng = rng
+        self.sequence: T.List[Event] = []
+
+
+class Weather(T.NamedTuple):
+    """
+    Everything a battle needs to know about the weather, worked out once by `get_weather`
+    """
+
+    bonus_types: T.FrozenSet[PokemonType]
+    name: str
+    render: str
+
+    def apply(self, card: BattleCard) -> None:
+        """
+        Add the weather bonus to the power of a card's moves
+        """
+        if as_pokemon_type(card._f_move_type) in self.bonus_types:
+            card._move_f_damage += 1
+        if as_pokemon_type(card._ch_move_type) in self.bonus_types:
+            card._move_ch_damage += 10
+        if as_pokemon_type(card._tm_move_type) in self.bonus_types:
+            card._move_tm_damage += 10
+
+
+# the first bonus type in this list picks the name of the weather
+WEATHER_NAMES = [
+    (PokemonType.ice, 'Snowy', 'hail'),
+    (PokemonType.fire, 'Sunny', 'sunnyday'),
+    (PokemonType.water, 'Rainy', 'raindance'),
+    (PokemonType.dark, 'Foggy', 'fog'),
+    (PokemonType.poison, 'Cloudy', 'cloudy'),
+    (PokemonType.normal, 'Partly Cloudy', 'pcloudy'),
+]
+
+
+@lru_cache(maxsize=None)
+def _get_weather(bonus_types: T.FrozenSet[PokemonType]) -> Weather:
+    for bonus_type, name, render in WEATHER_NAMES:
+        if bonus_type in bonus_types:
+            return Weather(bonus_types, name, render)
+    return Weather(bonus_types, 'Windy', 'deltastream')
+
+
+def get_weather(bonus_types: T.Union[T.Iterable[PokemonType], Weather]) -> Weather:
+    """
+    Look up the weather for a set of bonus types. Passing a `Weather` returns it unchanged.
+    """
+    if isinstance(bonus_types, Weather):
+        return bonus_types
+    return _get_weather(frozenset(bonus_types))
+
+
 INCREMENT = 100
 
-# TODO(albert): this global is gross
-execute_hook = None
+# a battle is called after this many ticks
+MAX_TICKS = 10000
+# or once this many ticks pass without either active pokemon dropping to a new lowest HP, e.g
+# when Leftovers heals back everything a weak attacker deals
+STALEMATE_TICKS = 600
+
+# bump this whenever a change to the battle rules changes battle outcomes, so that cached
+# results (see engine.utils.matchup_matrix) get thrown away
+ENGINE_VERSION = 1
 
 
 def battle(
     team1_cards: T.List[BattleCard],
     team2_cards: T.List[BattleCard],
-    bonus_types: T.List[PokemonType],
+    bonus_types: T.Union[T.List[PokemonType], Weather],
     team1_hero: T.List[ComplexHeroPower] = None,
     team2_hero: T.List[ComplexHeroPower] = None,
+    log_policy: LogPolicy = LogPolicy.FULL,
+    seed: T.Union[int, random.Random, None] = None,
+    max_ticks: int = MAX_TICKS,
+    stalemate_ticks: int = STALEMATE_TICKS,
+    fast_path: bool = True,
+    lead_states: T.Optional[T.Tuple[BattlerState, BattlerState]] = None,
 ):
     """
     Takes two arrays of battle cards and simulates combat between them.
 
     The original battle cards are shallow-copied and modified during the battle.
+
+    `log_policy` picks which of the event and render logs get recorded. Bulk simulations
+    that only care about the result should use `LogPolicy.NONE`.
+
+    Every random roll in the battle comes from `seed`, which is either an integer seed or a
+    `random.Random` to draw from. Without one, a seed is drawn from the global random state.
+    The integer seed is recorded in the output as "seed", and running the same cards with it
+    again replays the battle exactly.
+
+    A battle that runs for `max_ticks`, or goes `stalemate_ticks` without making progress, is
+    called for the team with more of its total HP left. The output "end" says how the battle
+    finished: "knockout", "tick_limit" or "stalemate".
+
+    When nobody holds an item and there are no hero powers, no combat hook can do anything,
+    so the battle skips building the `HookExecutor` and every hook dispatch. Pass
+    `fast_path=False` to dispatch hooks regardless, which gives the same results.
+
+    `lead_states` picks up each team's lead battler from shields and buff stages it already
+    has, rather than starting fresh. Lookahead simulations use it to continue a live battle,
+    so pre-battle item effects, which the live battle already applied, are skipped too.
     """
     team1_hero = team1_hero or []
     team2_hero = team2_hero or []
 
+    if isinstance(seed, random.Random):
+        rng = seed
+        seed = None
+    else:
+        if seed is None:
+            seed = random.getrandbits(32)
+        rng = random.Random(seed)
+
     # start a new logger for each battle
-    logger = EventLogger()
-    null_logger = EventLogger()  # do not log...
-    render = RenderLogger()
-    null_render = RenderLogger()  # ...
+    logger = EventLogger(enabled=log_policy.events)
+    render = RenderLogger(enabled=log_policy.render)
 
     # TODO(will): render header
     #team1_items = {poke.item: team1_cards[poke] for poke in team1_cards}
@@ -358,52 +656,71 @@ def battle(
         "team2damagetaken": [],
         "events": [],
         "render": [],
+        "seed": seed,
+        "end": "knockout",
+        "ticks": 0,
     }
     t1_dmg_dealt = []
     t1_dmg_taken = []
     t2_dmg_dealt = []
     t2_dmg_taken = []
-    sequence = []
 
     #team1_live: T.List[BattleCard] = copy.copy(team1_cards) # create an instance of the team for the battle
     #team2_live: T.List[BattleCard] = copy.copy(team2_cards)
     team1_live: T.List[BattleCard] = [x.copy() for x in team1_cards]
     team2_live: T.List[BattleCard] = [x.copy() for x in team2_cards]
 
-    for team in [team1_live, team2_live]:
-        for member in team:
-            if member._f_move_type in bonus_types:
-                member._move_f_damage += 1
-            if member._ch_move_type in bonus_types:
-                member._move_ch_damage += 10
-            if member._tm_move_type in bonus_types:
-                member._move_tm_damage += 10
+    weather = get_weather(bonus_types)
+    for member in team1_live + team2_live:
+        weather.apply(member)
 
     bench1 = []
     bench2 = []
 
     for index, x in enumerate(team1_live):
         bench1.append(Battler(x, index, 1, nickname=gamemaster.get_nickname(x.name)))
-        logger("join_party", f"{x} joined team 1")
+        if logger:
+            # the card changes during the battle, so this cannot be formatted lazily
+            logger("join_party", f"{x} joined team 1")
     for index, x in enumerate(team2_live):
         bench2.append(Battler(x, index, 2, nickname=gamemaster.get_nickname(x.name)))
-        logger("join_party", f"{x} joined team 2")
+        if logger:
+            # the card changes during the battle, so this cannot be formatted lazily
+            logger("join_party", f"{x} joined team 2")
+    if lead_states is not None:
+        for lead, state in zip((bench1[:1], bench2[:1]), lead_states):
+            for battler in lead:
+                state.restore(battler)
+
+    has_hooks = (
+        not fast_path
+        or bool(team1_hero or team2_hero)
+        or any(x.item is not None for x in team1_live + team2_live)
+    )
 
     # TODO(albert): should this be cards or live?
-    global execute_hook
-    execute_hook = HookExecutor(
-        bench1,
-        bench2,
-        team1_hero_items=team1_hero,
-        team2_hero_items=team2_hero,
-        logger=logger,
-        render=render,
+    context = BattleContext(
+        logger,
+        render,
+        HookExecutor(
+            bench1,
+            bench2,
+            team1_hero_items=team1_hero,
+            team2_hero_items=team2_hero,
+            # items check for a missing logger before formatting anything
+            logger=logger or None,
+            render=render or None,
+        ) if has_hooks else None,
+        rng,
     )
+    execute_hook = context.execute_hook
 
     # because I pop off the benches, and that leads to index problem when putting pokemon back at the end
     bench1_permanent = bench1
     bench2_permanent = bench2
 
+    advantage = AdvantageMatrix(bench1, bench2)
+
     try:
         current_team1: Battler = bench1[0]
     except IndexError:
@@ -432,70 +749,100 @@ def battle(
     team2_switches = 0
     turnnumber = 0
 
+    # the active pair and the lowest HP each has been at, for stalemate detection
+    watched = None
+    lowest = None
+    progress_turn = 0
+
     # COMBAT ITEM HOOK: pre_battle_action
-    execute_hook(CombatHook.PRE_BATTLE, current_team1, current_team2)
+    # a battle picked up from lead_states is already under way, so items have done this part
+    if has_hooks and lead_states is None:
+        execute_hook(CombatHook.PRE_BATTLE, current_team1, current_team2)
 
     combat_rising_edge = False
 
     team_1_active = False
     team_2_active = False
 
-    if render:
-        if PokemonType.ice in bonus_types:
-            weather = 'Snowy'
-            render_w = 'hail'
-        elif PokemonType.fire in bonus_types:
-            weather = 'Sunny'
-            render_w = 'sunnyday'
-        elif PokemonType.water in bonus_types:
-            weather = 'Rainy'
-            render_w = 'raindance'
-        elif PokemonType.dark in bonus_types:
-            weather = 'Foggy'
-            render_w = 'fog'
-        elif PokemonType.poison in bonus_types:
-            weather = 'Cloudy'
-            render_w = 'cloudy'
-        elif PokemonType.normal in bonus_types:
-            weather = 'Partly Cloudy'
-            render_w = 'pcloudy'
-        else:
-            weather = 'Windy'
-            render_w = 'deltastream'
-        render("|-weather|" +render_w)
-        pass
-    if logger:
-        logger("Weather", "The weather is " + weather)
+    render("|-weather|" + weather.render)
+    logger("Weather", "The weather is " + weather.name)
 
     while (len(team1_live) > 0 and len(team2_live) > 0 and stop_this == False): # while there are pokemon alive for a team
+        # healing back up does not count as progress, only reaching a new lowest HP does
+        if watched != (current_team1, current_team2):
+            watched = (current_team1, current_team2)
+            lowest = (current_team1.hp, current_team2.hp)
+            progress_turn = turnnumber
+        elif current_team1.hp < lowest[0] or current_team2.hp < lowest[1]:
+            lowest = (min(lowest[0], current_team1.hp), min(lowest[1], current_team2.hp))
+            progress_turn = turnnumber
+        if turnnumber >= max_ticks:
+            output["end"] = "tick_limit"
+            break
+        if turnnumber - progress_turn >= stalemate_ticks:
+            output["end"] = "stalemate"
+            break
+
+        if combat_rising_edge:
+            # jump ahead over ticks where neither pokemon can do anything. the on tick item
+            # effects for those ticks still get applied, just all at once
+            tick_items = has_hooks and execute_hook.get_subscribers(CombatHook.ON_TICK, current_team1, current_team2)
+            skip = min(
+                count_idle_ticks(current_team1, bool(tick_items)),
+                count_idle_ticks(current_team2, bool(tick_items)),
+            )
+            if skip > 0:
+                if tick_items:
+                    execute_hook.skip_ticks(skip, current_team1, current_team2)
+                turnnumber += skip
+                logger.increment_timer(INCREMENT * skip)
+                current_team1.timer += INCREMENT * skip
+                current_team2.timer += INCREMENT * skip
+
         turnnumber += 1
-        logger("Turn", str(turnnumber))
+        logger("Turn", "{}", turnnumber)
 
         if not combat_rising_edge:            
             # announce current team members
-            logger("team1_active", f"{current_team1.battlecard.name} is fighting for team 1")
+            logger("team1_active", "{} is fighting for team 1", current_team1.battlecard.name)
             if not team_1_active:
                 if current_team1.battlecard.shiny == True:
                     shiny_term = ", shiny|"
                 else:
                     shiny_term = "|"
-                render("|switch|p1a: " + current_team1.nickname +  "|" + current_team1.nickname + shiny_term + str(int(current_team1.hp)) + r"\/" + str(int(current_team1.battlecard.max_health)))
+                render(
+                    r"|switch|p1a: {}|{}{}{}\/{}",
+                    current_team1.nickname,
+                    current_team1.nickname,
+                    shiny_term,
+                    int(current_team1.hp),
+                    int(current_team1.battlecard.max_health),
+                )
                 team_1_active = True
-            logger("team2_active", f"{current_team2.battlecard.name} is fighting for team2")
+            logger("team2_active", "{} is fighting for team2", current_team2.battlecard.name)
             if not team_2_active:
                 if current_team2.battlecard.shiny == True:
                     shiny_term = ", shiny|"
                 else:
                     shiny_term = "|"
-                render("|switch|p2a: " + current_team2.nickname +  "|" + current_team2.nickname + shiny_term + str(int(current_team2.hp)) + r"\/" + str(int(current_team2.battlecard.max_health)))
+                render(
+                    r"|switch|p2a: {}|{}{}{}\/{}",
+                    current_team2.nickname,
+                    current_team2.nickname,
+                    shiny_term,
+                    int(current_team2.hp),
+                    int(current_team2.battlecard.max_health),
+                )
                 team_2_active = True
 
             # COMBAT ITEM HOOK: pre_combat_action
-            execute_hook(CombatHook.PRE_COMBAT, current_team1, current_team2)
+            if has_hooks:
+                execute_hook(CombatHook.PRE_COMBAT, current_team1, current_team2)
             combat_rising_edge = True
 
         # COMBAT ITEM HOOK: on_tick
-        execute_hook(CombatHook.ON_TICK, current_team1, current_team2)
+        if has_hooks:
+            execute_hook(CombatHook.ON_TICK, current_team1, current_team2)
 
         # increment time
         logger.increment_timer(INCREMENT)
@@ -511,8 +858,8 @@ def battle(
         can_attack_2 = True
         # if bad matchup, switch
 # THIS NEEDS WORK, IF WANT TO TRY 1V1
-        index1 = check_advantage(current_team1, current_team2, bench1) # the index on bench for best pokemon
-        index2 = check_advantage(current_team2, current_team1, bench2)
+        index1 = check_advantage(current_team1, current_team2, bench1, advantage) # the index on bench for best pokemon
+        index2 = check_advantage(current_team2, current_team1, bench2, advantage)
 #        index1 = matchup(current_team1, current_team2, bench1)
 #        index2 = matchup(current_team2, current_team1, bench2)
 
@@ -520,101 +867,49 @@ def battle(
             current_team1, bench1 = swap_pokemon(current_team1, bench1, index1)
             # print('team 1 has swapped '+bench1[index1].name.name+' with '+current_team1.name.name)
             logger("Switch", "team1")
-            render("|switch|p1a: "+current_team1.nickname+"|"+current_team1.nickname+"|"+ str(int(current_team1.battlecard.health)) + r"\/" + str(int(current_team1.battlecard.max_health)))
+            render(
+                r"|switch|p1a: {}|{}|{}\/{}",
+                current_team1.nickname,
+                current_team1.nickname,
+                int(current_team1.battlecard.health),
+                int(current_team1.battlecard.max_health),
+            )
 
             #sequence.append(Event(-1, "switch", "team 1"))
             can_attack_1 = False # can no longer attack this round
             team1_switches -= 1
+            if has_hooks:
+                execute_hook.refresh()
         if index2 >= 0 and team2_switches > 0:
             current_team2, bench2 = swap_pokemon(current_team2, bench2, index2)
             # print('team 2 has swapped '+bench2[index2].name.name+' with '+current_team2.name.name)
             logger("Switch", "team2")
-            render("|switch|p1a: "+current_team2.nickname+"|"+current_team2.nickname+"|"+ str(int(current_team2.battlecard.health)) + r"\/" + str(int(current_team2.battlecard.max_health)))
+            render(
+                r"|switch|p1a: {}|{}|{}\/{}",
+                current_team2.nickname,
+                current_team2.nickname,
+                int(current_team2.battlecard.health),
+                int(current_team2.battlecard.max_health),
+            )
 
             #sequence.append(Event(-1, "switch", "team 2"))
             can_attack_2 = False
             team2_switches -= 1
+            if has_hooks:
+                execute_hook.refresh()
 
         # was considering making array of possible moves, but handled in optimal moves function
 
         pokemon1_dead = False # at the resolution of a turn, will decide if pokemon is switched   
         pokemon2_dead = False
 
-        dummy1 = copy.copy(current_team1)
-        dummy2 = copy.copy(current_team2)
-        dumseq = [] # copy.copy(sequence)
-        dumdead1 = False
-        dumdead2 = False
-        if can_attack_1 and can_attack_2 and dummy1.timer >= 500 and dummy2.timer >=500:
-            runtheblock = False
-            firstset = [dummy1.battlecard.move_f.name, dummy1.battlecard.move_ch.name, dummy1.battlecard.move_tm.name]
-            secondset = [dummy2.battlecard.move_f.name, dummy2.battlecard.move_ch.name, dummy2.battlecard.move_tm.name]
-            for x in firstset:
-                # consider an if_legal() function to check cooldown and tm flag, energy. though just adding cooldown check made the code slower
-                # COULD USE IF_LEGAL IN CHOOSE OPTIMAL MOVE FUNCTION, or just take the code out of there
-# the problem here is is_lethal changes the values, because I initially coded it as just a check, but turned it into a move
-# would need to change the is_lethal function, correct the part in the battle loop. get rid of these deep copies then                
-                dummy1_2 = copy.copy(dummy1)
-                dummy2_2 = copy.copy(dummy2)
-                if is_lethal(dummy1_2, x, dummy2_2, dummy2_2.hp, dumseq):
-                    runtheblock = True
-            for x in secondset:
-                dummy1_2 = copy.copy(dummy1)
-                dummy2_2 = copy.copy(dummy2)
-                if is_lethal(dummy2_2, x, dummy1_2, dummy1_2.hp, dumseq):
-                    runtheblock = True
-            if runtheblock:
-                dumdead2, firstattack = launch_attack(dummy1, dummy2, dumseq, null_logger, null_render)
-                dumdead1, secondattack = launch_attack(dummy2, dummy1, dumseq, null_logger, null_render)
-                wascharged1 = False
-                wascharged2 = False
-                if dummy1.battlecard.move_ch.name == firstattack or dummy1.battlecard.move_tm.name == firstattack:
-                    wascharged1 = True
-                if dummy2.battlecard.move_ch.name == secondattack or dummy2.battlecard.move_tm.name == secondattack:
-                    wascharged2 = True
-                priority = -1
-                if wascharged1 and wascharged2:
-                    # stat1 = effective_stat(dummy1, "a") # if debuffs/buffs changing base stats were what impacted the tiebreaker
-                    # stat2 = effective_stat(dummy2, "a")
-                    # print(stat1, stat2)
-                    if dummy1.a > dummy2.a:
-                        priority = 1
-                    elif dummy2.a > dummy1.a:
-                        priority = 2
-                    elif dummy1.a == dummy2.a:
-                        priority = 0
-                elif wascharged1 and not wascharged2:
-                    priority = 1
-                elif wascharged2 and not wascharged1:
-                    priority = 2
-                elif not wascharged1 and not wascharged2:
-                    priority = 0
-                else:
-                    print('help')
-                if priority == -1:
-                    print('help')
-                if dumdead1 and dumdead2:
-                    if priority == 1:
-                        can_attack_2 = False
-                    elif priority == 2:
-                        can_attack_1 = False
-                elif dumdead2 and not dumdead1:
-                    # priority = 1
-                    if wascharged2 and not wascharged1:
-                        priority = 0
-                    if priority == 1:
-                        can_attack_2 = False
-                elif dumdead1 and not dumdead2:
-                    # priority = 2 # with this, if A has priority on double charged attack, but B has lethal, then A doesn't get the first attack
-                    if wascharged1 and not wascharged2:
-                        priority = 0
-                    if priority == 2:
-                        can_attack_1 = False
+        if can_attack_1 and can_attack_2 and current_team1.timer >= 500 and current_team2.timer >= 500:
+            can_attack_1, can_attack_2 = resolve_priority(current_team1, current_team2)
 
         if can_attack_1: # pokemon 1 attacks
-            pokemon2_dead = launch_attack(current_team1, current_team2, sequence, logger, render, execute_hooks=True)[0]
+            pokemon2_dead = launch_attack(current_team1, current_team2, context, execute_hooks=has_hooks)[0]
         if can_attack_2:
-            pokemon1_dead = launch_attack(current_team2, current_team1, sequence, logger, render, execute_hooks=True)[0]
+            pokemon1_dead = launch_attack(current_team2, current_team1, context, execute_hooks=has_hooks)[0]
 
         combat_over = False
         if pokemon1_dead:
@@ -622,9 +917,11 @@ def battle(
             current_team1.battlecard.status = 0
             logger(
                 "Team1 Faint",
-                f"team 2 {current_team2.battlecard.name.name} KOs team 1 {current_team1.battlecard.name.name}"
+                "team 2 {} KOs team 1 {}",
+                current_team2.battlecard.name.name,
+                current_team1.battlecard.name.name,
             )
-            render("|faint|p1a: " + current_team1.nickname)
+            render("|faint|p1a: {}", current_team1.nickname)
             team_1_active = False
 
         if pokemon2_dead:
@@ -632,14 +929,20 @@ def battle(
             current_team2.battlecard.status = 0
             logger(
                 "Team2 Faint",
-                f"team 1 {current_team1.battlecard.name.name} KOs team 2 {current_team2.battlecard.name.name}"
+                "team 1 {} KOs team 2 {}",
+                current_team1.battlecard.name.name,
+                current_team2.battlecard.name.name,
             )
-            render("|faint|p2a: " + current_team2.nickname)
+            render("|faint|p2a: {}", current_team2.nickname)
             team_2_active = False
 
         if combat_over:
             combat_rising_edge = False
-            execute_hook(CombatHook.POST_COMBAT, current_team1, current_team2)
+            # fainting deactivates items, and post combat items can revive their holder
+            if has_hooks:
+                execute_hook.refresh()
+                execute_hook(CombatHook.POST_COMBAT, current_team1, current_team2)
+                execute_hook.refresh()
 
         if pokemon2_dead and current_team2.battlecard.status == 0:
             current_team2 = next_pokemon(bench2) # handles the death of current pokemon
@@ -655,6 +958,22 @@ def battle(
     # closing messages
     survivor1 = len(team1_live) # how many pokemon left on the team
     survivor2 = len(team2_live)
+    if output["end"] != "knockout":
+        # nobody got knocked out in time, so call it on the HP each team has left
+        remaining1 = remaining_hp_fraction(bench1_permanent)
+        remaining2 = remaining_hp_fraction(bench2_permanent)
+        logger(
+            "Timeout",
+            "{} after {} ticks, team1 has {:.1%} HP left and team2 has {:.1%}",
+            output["end"],
+            turnnumber,
+            remaining1,
+            remaining2,
+        )
+        render("|-message|The battle was called on remaining HP")
+        survivor1 = int(remaining1 > remaining2)
+        survivor2 = int(remaining2 > remaining1)
+    output["ticks"] = turnnumber
     if survivor1 == survivor2 == 0: # if they're equal, then they're both 0
         # print('it was a hard-fought battle but ended in a tie')
         output["winner"] = "tie"
@@ -674,6 +993,9 @@ def battle(
 #    bench1[current_team1.id] = current_team1
 #    bench2[current_team2.id] = current_team2
 
+    for x in bench1_permanent + bench2_permanent:
+        x.write_back()
+
     for index, x in enumerate(bench1_permanent):
         # t1_dmg_dealt[index] = x.dmg_dealt
         # t1_dmg_taken[index] = x.dmg_taken
@@ -696,15 +1018,46 @@ def battle(
     return output
 
 
+def remaining_hp_fraction(team: T.List[Battler]) -> float:
+    """
+    The share of a team's total HP it has left
+    """
+    total = sum(max(x.battlecard.hitpoints, 10) for x in team)
+    if not total:
+        return 0.0
+    return sum(max(x.hp, 0) for x in team) / total
+
+
+def count_idle_ticks(battler: Battler, energy_on_tick: bool = False) -> int:
+    """
+    Count the upcoming ticks in which a battler definitely cannot make a move.
+
+    Every move needs the battler timer to reach some threshold: the fast move speed, or the
+    cooldown of a charged move. Charged moves also need energy, which only changes between
+    moves if an on tick effect (e.g Cell Battery) is active.
+
+    This is a lower bound, so the engine may still evaluate some idle ticks normally.
+    """
+    ready = battler.battlecard.atk_spd_timer_cts
+    charged = (1, 2) if battler.tm_flag else (1,)
+    for slot in charged:
+        if energy_on_tick or battler.energy >= battler.required_energy[slot]:
+            ready = min(ready, battler.cooldown[slot])
+    # the timer is incremented before moves are picked, so a tick is idle while the
+    # incremented timer is still short of `ready`
+    return max(0, math.ceil((ready - battler.timer) / INCREMENT) - 1)
+
+
 def launch_attack(
     attacker: Battler,
     defender: Battler,
-    sequence: T.List[BattleEvent],
-    logger: EventLogger,
-    render: RenderLogger,
+    context: BattleContext,
     execute_hooks: bool = False
 ): # this is the bulk of battle logic. returns if damage was fatal. otherwise, directly changes battlecard data
     # THIS WILL CHANGE THE SEQUENCE BECAUSE OF POINTERS
+    sequence = context.sequence
+    logger = context.logger
+    render = context.render
 
     fatal = False # if the attack will be fatal
     # I THINK THE ELEMENT IN THE ARRAY IN MEMORY WILL BE CHANGED???
@@ -715,17 +1068,17 @@ def launch_attack(
     move = calculate_optimal_move(attacker, defender) # picks the move with the highest damage, in case a charged is type-disadvantaged
     
     # if fast move lethal, use move because can't be shielded
-    if is_lethal(attacker, attacker.battlecard.move_f.name, defender, defender.hp, sequence):
+    if is_lethal(attacker, attacker.move_f, defender, defender.hp, sequence):
         # print(attacker.name.name+' used '+attacker.move_f.name)
         fatal = True
-        move = attacker.battlecard.move_f.name
+        move = attacker.move_f
 
-    if move == attacker.battlecard.move_tm.name or move == attacker.battlecard.move_ch.name: # if the optimal move needs energy
+    if move == attacker.move_tm or move == attacker.move_ch: # if the optimal move needs energy
         # ON CHARGED MOVE COMBAT HOOKS: should run before damage calculations
 
         # COMBAT ITEM HOOK: on_charged_move
         if execute_hooks:
-            execute_hook(
+            context.execute_hook(
                 CombatHook.ON_CHARGED_MOVE,
                 attacker,
                 defender,
@@ -734,7 +1087,7 @@ def launch_attack(
                 defender=defender,
             )
             # COMBAT ITEM HOOK: on_enemy_charged_move
-            execute_hook(
+            context.execute_hook(
                 CombatHook.ON_ENEMY_CHARGED_MOVE,
                 attacker,
                 defender,
@@ -745,23 +1098,29 @@ def launch_attack(
             # print(attacker.name.name+' used '+move)
         logger(
             "Charged Attack",
-            f"{attacker.team} {attacker.battlecard.name.name} used {move} "
-            f"on {defender.team} {defender.battlecard.name.name}"
+            "{} {} used {} on {} {}",
+            attacker.team,
+            attacker.battlecard.name.name,
+            move,
+            defender.team,
+            defender.battlecard.name.name,
         )
-        render("|-prepare|p" + str(attacker.team) + "a: " + attacker.nickname + "|Geomancy")
+        render("|-prepare|p{}a: {}|Geomancy", attacker.team, attacker.nickname)
 
-        #attacker.battlecard.energy -= moves[move]["energy"] # decrement energy
-        if move == attacker.battlecard.move_tm.name:
-            attacker.battlecard.energy -= attacker.battlecard._move_tm_energy
-        elif move == attacker.battlecard.move_ch.name:
-            attacker.battlecard.energy -= attacker.battlecard._move_ch_energy
+        #attacker.energy -= moves[move]["energy"] # decrement energy
+        if move == attacker.move_tm:
+            attacker.energy -= attacker.move_energy[2]
+        elif move == attacker.move_ch:
+            attacker.energy -= attacker.move_energy[1]
         else:
             raise Exception('what fuckin happened')
 
         logger(
             "Energy Use",
-            f"{attacker.team} {attacker.battlecard.name.name} "
-            f"has {attacker.battlecard.energy:.0f} energy left"
+            "{} {} has {:.0f} energy left",
+            attacker.team,
+            attacker.battlecard.name.name,
+            attacker.energy,
         )
 
         # idk about this, to simulate charged attack taking a while based on how it
@@ -774,24 +1133,12 @@ def launch_attack(
         # check for shield
         block = False
         if defender.battlecard.bonus_shield > 0:
-            isweakbuff = False
-            block = True
-            try:
-                if moves[move]["buffTarget"] == "opponent" and float(moves[move]["buffApplyChance"]) == 1:
-                    isweakbuff = True
-                elif moves[move]["buffTarget"] == "self":
-                    isweakbuff = True
-            except:
-                pass
-            if isweakbuff and not is_lethal(attacker, move, defender, defender.hp, sequence):
-                fastDPT = calculate_damage(attacker, attacker.battlecard.move_f.name, defender)[0] / (moves[attacker.battlecard.move_f.name]["cooldown"] / 500)
-                if proposed_damage < (defender.hp / 1.5) and (fastDPT) <= 1.5: # opposite of battle.js line 2251 ("if the defender can't afford")
-                    block = False
+            block = will_shield(attacker, move, defender, proposed_damage)
             if block:
                 defender.battlecard.bonus_shield -= 1 # if shield, decrement
                 # print(defender.name.name+' used a shield')
-                logger("Shield", f"{defender.team} {defender.battlecard.name.name} used a shield")
-                render("|-singleturn|p"+defender.team+"a: "+defender.nickname +"|Protect")
+                logger("Shield", "{} {} used a shield", defender.team, defender.battlecard.name.name)
+                render("|-singleturn|p{}a: {}|Protect", defender.team, defender.nickname)
         if not block:
             damage = proposed_damage
             effectiveness = p_effectiveness
@@ -813,7 +1160,7 @@ def launch_attack(
         if hasbuff:
             a_modifier = int(buff[0])
             d_modifier = int(buff[1])
-            luck = randint(1, 1000)
+            luck = context.rng.randint(1, 1000)
             # NOT TAKING INTO ACCOUNT MAXBUFFSTAGES YET. do with global setting for buffdivisor
             if chance >= luck:
                 if buff_target == "opponent":
@@ -821,32 +1168,43 @@ def launch_attack(
                         if a_modifier <0:
                             logger(
                                 "Attack Debuff",
-                                f"{attacker.team} {attacker.battlecard.name.name} debuffed {defender.battlecard.name.name}"
-                                
+                                "{} {} debuffed {}",
+                                attacker.team,
+                                attacker.battlecard.name.name,
+                                defender.battlecard.name.name,
                             )
-                            render("|-unboost|p"+defender.team+"a: "+defender.nickname+"|atk|"+str(a_modifier))
+                            render("|-unboost|p{}a: {}|atk|{}", defender.team, defender.nickname, a_modifier)
                         else:
                             logger(
                                 "Attack Buff",
-                                f"{attacker.team} {attacker.battlecard.name.name} buffed {defender.battlecard.name.name}"
+                                "{} {} buffed {}",
+                                attacker.team,
+                                attacker.battlecard.name.name,
+                                defender.battlecard.name.name,
                             )
-                            render("|-boost|p"+defender.team+"a: "+defender.nickname+"|atk|"+str(a_modifier))
+                            render("|-boost|p{}a: {}|atk|{}", defender.team, defender.nickname, a_modifier)
                             
                         defender.am += a_modifier
                     if d_modifier != 0:
                         if d_modifier < 0:
                             logger(
                                 "Defense Debuff",
-                                f"{attacker.team} {attacker.battlecard.name.name} debuffed {defender.battlecard.name.name}"
+                                "{} {} debuffed {}",
+                                attacker.team,
+                                attacker.battlecard.name.name,
+                                defender.battlecard.name.name,
                             )
-                            render("|-unboost|p"+defender.team+"a: "+defender.nickname+"|def|"+str(d_modifier))
+                            render("|-unboost|p{}a: {}|def|{}", defender.team, defender.nickname, d_modifier)
 
                         else:
                             logger(
                                 "Defense Buff",
-                                f"{attacker.team} {attacker.battlecard.name.name} buffed {defender.battlecard.name.name}"
+                                "{} {} buffed {}",
+                                attacker.team,
+                                attacker.battlecard.name.name,
+                                defender.battlecard.name.name,
                             )
-                            render("|-boost|p"+defender.team+"a: "+defender.nickname+"|def|"+str(d_modifier))
+                            render("|-boost|p{}a: {}|def|{}", defender.team, defender.nickname, d_modifier)
 
                         defender.dm += d_modifier
                 elif buff_target == "self":
@@ -854,32 +1212,40 @@ def launch_attack(
                         if a_modifier > 0:
                             logger(
                                 "Attack Buff",
-                                f"{attacker.team} {attacker.battlecard.name.name} buffed its own attack"
+                                "{} {} buffed its own attack",
+                                attacker.team,
+                                attacker.battlecard.name.name,
                             )
-                            render("|-boost|p"+attacker.team+"a: "+attacker.nickname+"|atk|"+str(a_modifier))
+                            render("|-boost|p{}a: {}|atk|{}", attacker.team, attacker.nickname, a_modifier)
 
                         else:
                             logger(
                                 "Attack Debuff",
-                                f"{attacker.team} {attacker.battlecard.name.name} debuffed its own attack"
+                                "{} {} debuffed its own attack",
+                                attacker.team,
+                                attacker.battlecard.name.name,
                             )
-                            render("|-unboost|p"+attacker.team+"a: "+attacker.nickname+"|atk|"+str(a_modifier))
+                            render("|-unboost|p{}a: {}|atk|{}", attacker.team, attacker.nickname, a_modifier)
 
                         attacker.am += a_modifier
                     if d_modifier != 0:
                         if d_modifier >0:
                             logger(
                                 "Defense Buff",
-                                f"{defender.team} {defender.battlecard.name.name} buffed its own defense"
+                                "{} {} buffed its own defense",
+                                defender.team,
+                                defender.battlecard.name.name,
                             )
-                            render("|-boost|p"+defender.team+"a: "+defender.nickname+"|def|"+str(d_modifier))
+                            render("|-boost|p{}a: {}|def|{}", defender.team, defender.nickname, d_modifier)
 
                         else:
                             logger(
                                 "Defense Debuff",
-                                f"{defender.team} {defender.battlecard.name.name} debuffed its own defense"
+                                "{} {} debuffed its own defense",
+                                defender.team,
+                                defender.battlecard.name.name,
                             )
-                            render("|-unboost|p"+defender.team+"a: "+defender.nickname+"|def|"+str(d_modifier))
+                            render("|-unboost|p{}a: {}|def|{}", defender.team, defender.nickname, d_modifier)
 
                         attacker.dm += d_modifier
         
@@ -905,34 +1271,51 @@ def launch_attack(
             how_was_it = 'it was not very effective'
         logger(
             "Charged Move Damage",
-            f"{defender.team} {defender.battlecard.name.name} took {damage:.0f} damage: {how_was_it}"
+            "{} {} took {:.0f} damage: {}",
+            defender.team,
+            defender.battlecard.name.name,
+            damage,
+            how_was_it,
         )
-        render("|move|p" + str(attacker.team) + "a: " + attacker.nickname + "|" + render.move_name_cleaner(move) + "|p" + str(defender.team) + "a: " +defender.nickname)
+        if render:
+            render(
+                "|move|p{}a: {}|{}|p{}a: {}",
+                attacker.team,
+                attacker.nickname,
+                render.move_name_cleaner(move),
+                defender.team,
+                defender.nickname,
+            )
         render("|upkeep")
 
         if effectiveness > 1.3:
-            render("|-supereffective|p" + defender.team + "a: " + defender.nickname)
+            render("|-supereffective|p{}a: {}", defender.team, defender.nickname)
         elif effectiveness < 0.6:
-            render("|-resisted|p" + defender.team + "a: " + defender.nickname)
+            render("|-resisted|p{}a: {}", defender.team, defender.nickname)
         logger(
             "Health",
-            f"{defender.team} {defender.battlecard.name.name} has {defender.hp:.0f} hp left"
+            "{} {} has {:.0f} hp left",
+            defender.team,
+            defender.battlecard.name.name,
+            defender.hp,
         )
         render(
-            f"|-damage|p{defender.team}a: {defender.nickname}|{int(defender.hp)}"
-            f"\/{int(defender.battlecard.max_health)}"
+            r"|-damage|p{}a: {}|{}\/{}",
+            defender.team,
+            defender.nickname,
+            int(defender.hp),
+            int(defender.battlecard.max_health),
         )
 
 
         if defender.hp <= 0: # check if dead
             fatal = True
 
-    elif move == attacker.battlecard.move_f.name: # if the optimal move was a fast move
+    elif move == attacker.move_f: # if the optimal move was a fast move
         # COMBAT ITEM HOOK: on_fast_move_action
         # COMBAT ITEM HOOK: on_enemy_fast_move_action
         if execute_hooks:
-            print(f'Executing hook where {attacker=} {defender=}')
-            execute_hook(
+            context.execute_hook(
                 CombatHook.ON_FAST_MOVE,
                 attacker,
                 defender,
@@ -940,7 +1323,7 @@ def launch_attack(
                 attacker=attacker,
                 defender=defender
             )
-            execute_hook(
+            context.execute_hook(
                 CombatHook.ON_ENEMY_FAST_MOVE,
                 attacker,
                 defender,
@@ -951,19 +1334,33 @@ def launch_attack(
         # print(attacker.name.name+' used '+attacker.move_f.name)
         logger(
             "Fast Attack",
-            f"{attacker.team} {attacker.battlecard.name.name} used {attacker.battlecard.move_f.name} "
-            f"on {defender.team} {defender.battlecard.name.name}"
+            "{} {} used {} on {} {}",
+            attacker.team,
+            attacker.battlecard.name.name,
+            attacker.move_f,
+            defender.team,
+            defender.battlecard.name.name,
         )
-        render("|move|p" + str(attacker.team) + "a: " + attacker.nickname + "|" + render.move_name_cleaner(move) + "|p" + str(defender.team) + "a: " +defender.nickname)
+        if render:
+            render(
+                "|move|p{}a: {}|{}|p{}a: {}",
+                attacker.team,
+                attacker.nickname,
+                render.move_name_cleaner(move),
+                defender.team,
+                defender.nickname,
+            )
 
-        #sequence.append(Event(-1, "attack", attacker.battlecard.name.name+" used "+attacker.battlecard.move_f.name+" on "+defender.battlecard.name.name))
-        attacker.battlecard.energy += attacker.battlecard._move_f_energy
+        #sequence.append(Event(-1, "attack", attacker.battlecard.name.name+" used "+attacker.move_f+" on "+defender.battlecard.name.name))
+        attacker.energy += attacker.move_energy[0]
         logger(
             "Attack Charge Up",
-            f"{attacker.team} {attacker.battlecard.name.name} now "
-            f"has {attacker.battlecard.energy:.0f} energy"
+            "{} {} now has {:.0f} energy",
+            attacker.team,
+            attacker.battlecard.name.name,
+            attacker.energy,
         )
-        #sequence.append(Event(-1, '', attacker.battlecard.name.name+" needs "+str(moves[attacker.battlecard.move_ch.name]["energy"] - attacker.battlecard.energy)+" more energy to use a charged move"))
+        #sequence.append(Event(-1, '', attacker.battlecard.name.name+" needs "+str(moves[attacker.move_ch]["energy"] - attacker.energy)+" more energy to use a charged move"))
         damage, effectiveness = calculate_damage(attacker, move, defender)
         defender.hp -= damage
         attacker.dmg_dealt += damage
@@ -981,19 +1378,32 @@ def launch_attack(
         elif effectiveness < 0.6:
             how_was_it = 'it was not very effective'
         if effectiveness > 1.3:
-            render("|-supereffective|p" + defender.team + "a: " + defender.nickname)
+            render("|-supereffective|p{}a: {}", defender.team, defender.nickname)
         elif effectiveness < 0.6:
-            render("|-resisted|p" + defender.team + "a: " + defender.nickname)
+            render("|-resisted|p{}a: {}", defender.team, defender.nickname)
 
         logger(
             "Fast Attack Damage",
-            f"{defender.team} {defender.battlecard.name.name} took {damage:.0f} damage: {how_was_it}"
+            "{} {} took {:.0f} damage: {}",
+            defender.team,
+            defender.battlecard.name.name,
+            damage,
+            how_was_it,
+        )
+        render(
+            r"|-damage|p{}a: {}|{}\/{}",
+            defender.team,
+            defender.nickname,
+            int(defender.hp),
+            int(defender.battlecard.max_health),
         )
-        render("|-damage|p"+defender.team+"a: "+defender.nickname + "|" + str(int(defender.hp)) + r"\/" + str(int(defender.battlecard.max_health)))
 
         logger(
             "Health",
-            f"{defender.team} {defender.battlecard.name.name} has {defender.hp:.0f} HP left"
+            "{} {} has {:.0f} HP left",
+            defender.team,
+            defender.battlecard.name.name,
+            defender.hp,
         )
         if defender.hp <= 0: # check if dead
             fatal = True
@@ -1034,109 +1444,236 @@ def swap_pokemon(current, bench, index): # takes in pokemon, bench, and index of
     bench[current.id] = current
     return holder, bench
 
+class AdvantageMatrix:
+    """
+    `analyze_type` for every team1 x team2 pairing, worked out once when a battle starts.
+
+    Types and tm flags do not change during a battle, so neither do the balances. Rows are
+    indexed by the battler id, which is its bench position.
+    """
+
+    def __init__(self, team1: T.List[Battler], team2: T.List[Battler]):
+        self.balance = [[analyze_type(x, y) for y in team2] for x in team1]
+        # keyed by the defender's team. analyze_type(x, y) == -analyze_type(y, x), so team2
+        # only needs the negated balances
+        self._against = {
+            "1": [[-self.balance[i][j] for j in range(len(team2))] for i in range(len(team1))],
+            "2": [[self.balance[i][j] for i in range(len(team1))] for j in range(len(team2))],
+        }
+
+    def against(self, defender: Battler) -> T.List[int]:
+        """
+        The balance of every member of the other team against `defender`, by bench position
+        """
+        return self._against[defender.team][defender.id]
+
+    def __call__(self, attacker: Battler, defender: Battler) -> int:
+        return self.against(defender)[attacker.id]
+
+
 # can just simulate a 1v1 to determine how the matchup is
-def check_advantage(attacker, defender, bench): # (attacker's bench). returns -1 if current is best. returns index on bench if better pokemon
+def check_advantage(attacker, defender, bench, advantage: T.Optional[AdvantageMatrix] = None): # (attacker's bench). returns -1 if current is best. returns index on bench if better pokemon
+    if advantage is not None:
+        balances = advantage.against(defender)
+        if balances[attacker.id] < 0:
+            for i, balance in enumerate(balances):
+                if balance > 0:
+                    return i
+        return -1
     if analyze_type(attacker, defender) < 0: # can change this value if don't want to switch as often
         for i, x in enumerate(bench): # checks pokemon on the bench
             if analyze_type(x, defender) > 0:
                 return i # return the index of the type-advantaged pokemon
     return -1 # no *significantly* better pokemon to switch to
 
-def matchup(attacker, defender, bench):
-    if simulate1v1(attacker, defender) == "team 2":
+def matchup(attacker, defender, bench, bonus_types=()):
+    if simulate1v1(attacker, defender, bonus_types) == "team2":
         for i, x in enumerate(bench):
-            if simulate1v1(x, defender) == "team 1":
+            if simulate1v1(x, defender, bonus_types) == "team1":
                 return i
     return -1
 
-# this is too recursive. try the thing albert mentioned about memoization
-def simulate1v1(attacker, defender):
-    return battle([attacker.battlecard], [defender.battlecard])["winner"]
 
-def analyze_type(attacker: Battler, defender: Battler, disabled=True): # >0 is good, <0 is bad
-    # these lines pull the types of the moves
-    attacker_fast = attacker.battlecard._f_move_type
-    attacker_charged = attacker.battlecard._ch_move_type
-    attacker_tm = attacker.battlecard._tm_move_type
-    defender_fast = defender.battlecard._f_move_type
-    defender_charged = defender.battlecard._ch_move_type
-    defender_tm = defender.battlecard._tm_move_type
-    
-    attacker_type = [] # initialize the array of move types
-    defender_type = []
+class CacheInfo(T.NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
 
-    attacker_self = set([attacker.battlecard.poke_type1, attacker.battlecard.poke_type2])
-    defender_self = set([defender.battlecard.poke_type1, defender.battlecard.poke_type2])
 
-    # if-else that creates array of available attack types. to avoid dodging a tem attack when they don't have it available. can change this to simulate uncertainty of enemy team
-    if attacker.battlecard.tm_flag == 1: # if the tm is available
-        attacker_type = [attacker_fast, attacker_charged, attacker_tm]
-    else:
-        attacker_type = [attacker_fast, attacker_charged] # ignoring if the charged attack is available, for now
+class OutcomeCache:
+    """
+    Bounded LRU cache of 1v1 battle outcomes, keyed by `outcome_key`.
+
+    Thread safe, so lookahead from concurrent battles can share one cache.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._outcomes: "OrderedDict[T.Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: T.Tuple) -> T.Optional[str]:
+        with self._lock:
+            outcome = self._outcomes.get(key)
+            if outcome is None:
+                self.misses += 1
+                return None
+            self._outcomes.move_to_end(key)
+            self.hits += 1
+            return outcome
+
+    def put(self, key: T.Tuple, outcome: str):
+        with self._lock:
+            self._outcomes[key] = outcome
+            self._outcomes.move_to_end(key)
+            while len(self._outcomes) > self.maxsize:
+                self._outcomes.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._outcomes))
+
+    def clear(self):
+        with self._lock:
+            self._outcomes.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+outcome_cache = OutcomeCache()
+
+# current HP is rounded up to this many steps of max HP for the cache key
+HP_BUCKETS = 20
+
+# random seed for lookahead simulations, see `simulate1v1`
+LOOKAHEAD_SEED = 0
+
+
+def hp_bucket(battler: Battler) -> int:
+    max_hp = max(battler.battlecard.hitpoints, 10)
+    return min(HP_BUCKETS, max(0, math.ceil(battler.hp / max_hp * HP_BUCKETS)))
+
+
+def battler_fingerprint(battler: Battler) -> T.Tuple:
+    """
+    Everything about one side that can change the outcome of a 1v1 simulation.
+    """
+    card = battler.battlecard
+    item = card.item
+    return (
+        card.name,
+        card.move_f,
+        card.move_ch,
+        card.move_tm,
+        card.level,
+        card.atk_,
+        card.def_,
+        card.health,
+        tuple(card.modifiers),
+        card.shiny,
+        bool(card.tm_flag),
+        card.bonus_shield,
+        battler.am,
+        battler.dm,
+        battler.energy,
+        card.multiplier,
+        battler.power,
+        hp_bucket(battler),
+        None if item is None else (type(item).__name__, item.json(exclude={"holder", "id"})),
+    )
+
+
+def outcome_key(attacker: Battler, defender: Battler, bonus_types: T.Iterable[PokemonType] = ()) -> T.Tuple:
+    return (
+        battler_fingerprint(attacker),
+        battler_fingerprint(defender),
+        tuple(sorted(x.name for x in bonus_types)),
+    )
+
+
+def lookahead_card(battler: Battler) -> BattleCard:
+    """
+    Copy a battler's card for a simulation, starting at its (bucketed) current HP.
+
+    The copy gets its own modifiers and item so the simulation cannot touch the live card.
+    Its move power already includes the weather bonus, so simulate it without weather.
+    """
+    card = battler.battlecard
+    update = {"modifiers": list(card.modifiers), "energy": battler.energy}
+    bucket = hp_bucket(battler)
+    if bucket < HP_BUCKETS:
+        hp = max(card.hitpoints, 10) * bucket / HP_BUCKETS
+        update["health"] = hp - card.modifiers[Stats.HP.value]
+    copied = card.copy(update=update)
+    item = card.item
+    if item is not None:
+        item = item.copy()
+    copied.give_item(item)
+    return copied
+
+
+def simulate1v1(attacker: Battler, defender: Battler, bonus_types: T.Sequence[PokemonType] = ()) -> str:
+    """
+    Winner ("team1", "team2" or "tie") of the attacker fighting the defender from their current state.
+
+    Both sides keep their energy, shields and buff stages. The battlers' move power already
+    has the weather bonus in it, so `bonus_types` only goes into the cache key.
+
+    Outcomes are memoized in `outcome_cache`. Simulations always use `LOOKAHEAD_SEED`, so
+    lookahead from a live battle does not change how that battle plays out and a cached
+    outcome is the same one a fresh simulation would give.
+    """
+    key = outcome_key(attacker, defender, bonus_types)
+    winner = outcome_cache.get(key)
+    if winner is None:
+        winner = battle(
+            [lookahead_card(attacker)],
+            [lookahead_card(defender)],
+            [],
+            log_policy=LogPolicy.NONE,
+            seed=LOOKAHEAD_SEED,
+            lead_states=(BattlerState.of(attacker), BattlerState.of(defender)),
+        )["winner"]
+        outcome_cache.put(key, winner)
+    return winner
+
+def analyze_type(attacker: Battler, defender: Battler, disabled=True): # >0 is good, <0 is bad
+    # only consider the tm move type if the tm is available. to avoid dodging a tm attack when
+    # they don't have it available. can change this to simulate uncertainty of enemy team
+    attacker_types = attacker.move_types if attacker.tm_flag else attacker.move_types[:2]
+    defender_types = defender.move_types if defender.tm_flag else defender.move_types[:2]
 
-    if defender.battlecard.tm_flag == 1:
-        defender_type = [defender_fast, defender_charged, defender_tm]
-    else:
-        defender_type = [defender_fast, defender_charged]
-
-    attacker_resistances = []
-    attacker_weaknesses = []
-    attacker_immunities = []
-    defender_resistances = []
-    defender_weaknesses = []
-    defender_immunities = []
-
-    # this doesn't account for duplicate resistances/weaknesses
-    # this pulls resistances
-    for x in attacker_self:
-        attacker_resistances += types[x.name]["resistances"]
-        attacker_weaknesses += types[x.name]["weaknesses"]
-        attacker_immunities += types[x.name]["immunities"]
-    for x in defender_self:
-        defender_resistances += types[x.name]["resistances"]
-        defender_weaknesses += types[x.name]["weaknesses"]
-        defender_immunities += types[x.name]["immunities"]
-
-    # could make the multiplier stuff in calculate_damage its own function, instead of these discrete integers
-    
     balance = 0 # start with neutral advantage
-    for x in attacker_type:
-        if x in defender_weaknesses:
-            balance += 1
-        if x in defender_resistances:
-            balance -= 1
-        if x in defender_immunities:
-            balance -= 2
-    for x in defender_type:
-        if x in attacker_weaknesses:
-            balance -= 1
-        if x in attacker_resistances:
-            balance += 1
-        if x in attacker_immunities:
-            balance += 2
+    for x in attacker_types:
+        balance += defender.profile.advantage[x]
+    for x in defender_types:
+        balance -= attacker.profile.advantage[x]
     return balance
 
 
 def calculate_optimal_move(attacker: Battler, defender: Battler): # returns string, the name of best move
     # can consider passing back a flag for if the move was effective or not, to print. or change in calculate_damage
-    fast_damage = calculate_damage(attacker, attacker.battlecard.move_f.name, defender)[0]
+    fast_damage = calculate_damage(attacker, attacker.move_f, defender)[0]
     charged_damage = -1 # assume it's not available
     tm_damage = -1
 
-    if attacker.battlecard.energy >= moves[attacker.battlecard.move_ch.name]['energy'] and attacker.timer >= moves[attacker.battlecard.move_ch.name]["cooldown"]: # if you can use charged attack
-        charged_damage = calculate_damage(attacker, attacker.battlecard.move_ch.name, defender)[0]
+    if attacker.energy >= attacker.required_energy[1] and attacker.timer >= attacker.cooldown[1]: # if you can use charged attack
+        charged_damage = calculate_damage(attacker, attacker.move_ch, defender)[0]
     
-    if attacker.battlecard.tm_flag == 1 and attacker.battlecard.energy >= moves[attacker.battlecard.move_tm.name]['energy'] and attacker.timer >= moves[attacker.battlecard.move_tm.name]["cooldown"]: # if you can use tm attack
-        tm_damage = calculate_damage(attacker, attacker.battlecard.move_tm.name, defender)[0]
+    if attacker.tm_flag and attacker.energy >= attacker.required_energy[2] and attacker.timer >= attacker.cooldown[2]: # if you can use tm attack
+        tm_damage = calculate_damage(attacker, attacker.move_tm, defender)[0]
     
     holder = [charged_damage, tm_damage]
-    holder2 = [attacker.battlecard.move_ch.name, attacker.battlecard.move_tm.name]
+    holder2 = [attacker.move_ch, attacker.move_tm]
     for i, x in enumerate(holder2):
         if x in (None, 'none'):
             continue
-        if moves[x]["archetype"] =="Self-Debuff":
+        if attacker.self_debuff[i + 1]:
             dontuse = False
-            maxtimes = math.floor(attacker.battlecard.energy / moves[x]["energy"]) - defender.battlecard.bonus_shield
+            maxtimes = math.floor(attacker.energy / attacker.required_energy[i + 1]) - defender.battlecard.bonus_shield
             theoreticaldamage = maxtimes * calculate_damage(attacker, x, defender)[0]
             turnsleft = turnstodie(attacker, defender)
             if theoreticaldamage > defender.hp and maxtimes < turnsleft:
@@ -1145,7 +1682,7 @@ def calculate_optimal_move(attacker: Battler, defender: Battler): # returns stri
             else:
                 dontuse = True
 # this is pvpoke "minimize time debuffed and it can stack the move" in battle.js                
-            # if (defender.hp > holder[i] or defender.battlecard.bonus_shield > 0) and (attacker.hp > calculate_damage(defender, defender.battlecard.move_f.name, attacker) or moves[defender.battlecard.move_f.name]["cooldown" - moves[attacker.battlecard.move_f.name]["cooldown"] > 500]):
+            # if (defender.hp > holder[i] or defender.battlecard.bonus_shield > 0) and (attacker.hp > calculate_damage(defender, defender.move_f, attacker) or moves[defender.move_f]["cooldown" - moves[attacker.move_f]["cooldown"] > 500]):
             #     dontuse = True
 
 
@@ -1155,92 +1692,79 @@ def calculate_optimal_move(attacker: Battler, defender: Battler): # returns stri
     tm_damage = holder[1]
 
     if fast_damage >= charged_damage and fast_damage >= tm_damage and attacker.timer >= attacker.battlecard.atk_spd_timer_cts:
-        return attacker.battlecard.move_f.name
+        return attacker.move_f
     elif charged_damage >= tm_damage and charged_damage > 0:
     # could add logic about using the cheaper attack or whatever
-        return attacker.battlecard.move_ch.name
+        return attacker.move_ch
     elif tm_damage > 0:
-        return attacker.battlecard.move_tm.name
+        return attacker.move_tm
     elif attacker.timer >= attacker.battlecard.atk_spd_timer_cts:
-        return attacker.battlecard.move_f.name
+        return attacker.move_f
     return ''
 
 
+def hits_to_ko(hp: float, damage: float) -> int:
+    """
+    How many hits of `damage` it takes to bring `hp` down to zero or below.
+
+    Gives the same count as subtracting `damage` in a loop while `hp > 0`, as long as the
+    damage is a whole number (subtracting those from HP is exact). The division can be off
+    by one ulp, so the ceiling gets checked against its neighbours.
+    """
+    if hp <= 0:
+        return 0
+    hits = math.ceil(hp / damage)
+    if hp - (hits - 1) * damage <= 0:
+        hits -= 1
+    elif hp - hits * damage > 0:
+        hits += 1
+    return hits
+
+
 def turnstodie(me: Battler, them: Battler):
+    """
+    Rough number of attacks `me` can take from `them` before fainting.
+
+    Their charged moves land first, as many as their energy pays for, then fast moves.
+    """
     myhp = me.hp
-    theirenergy = them.battlecard.energy
-    theirmovef = them.battlecard.move_f.name
-    theirdps = calculate_damage(them, theirmovef, me)[0] * moves[theirmovef]["cooldown"] / 500
-    whichcharged = ''
-    if calculate_damage(them, them.battlecard.move_ch.name, me)[0] > calculate_damage(them, them.battlecard.move_tm.name, me)[0]:
-        whichcharged = them.battlecard.move_ch.name
+    theirdps = calculate_damage(them, them.move_f, me)[0] * them.cooldown[0] / 500
+    charged_damage = calculate_damage(them, them.move_ch, me)[0]
+    tm_damage = calculate_damage(them, them.move_tm, me)[0]
+    if charged_damage > tm_damage:
+        cost = them.required_energy[1]
+        whichdamage = charged_damage
     else:
-        whichcharged = them.battlecard.move_tm.name
-    howmanytheircharged = 0
-    while theirenergy > moves[whichcharged]["energy"]:
-        howmanytheircharged += 1
-        theirenergy -= moves[whichcharged]["energy"]
-    myshields = me.battlecard.bonus_shield
-    maxblocked = 0
-    while myshields > 0:
-        maxblocked += 1
-        myshields -= 1
-    chargedincoming = max(0, howmanytheircharged - myshields)
-    turnstodie = 0
-    while myhp > 0 and chargedincoming > 0:
-        myhp -= calculate_damage(them, whichcharged, me)[0]
-        chargedincoming -= 1
-        turnstodie += 1
-    while myhp > 0:
-        myhp -= theirdps
-        turnstodie += 1
-    return turnstodie
+        cost = them.required_energy[2]
+        whichdamage = tm_damage
+    # every charged move they can pay for while keeping some energy back
+    howmanytheircharged = hits_to_ko(them.energy - cost, cost)
+    # NOTE: shields were meant to block some of these, but the old counting loop spent the
+    # shields before subtracting them, so every charged move counts
+    chargedincoming = howmanytheircharged
+    turnstodie = min(chargedincoming, hits_to_ko(myhp, whichdamage))
+    myhp -= turnstodie * whichdamage
+    return turnstodie + hits_to_ko(myhp, theirdps)
 
 
 def calculate_damage(attacker: Battler, move: Move, defender: Battler): # battlecard, string, battlecard. returns damage
     # this is theoretical damage
-
-    #attacker_type = pokedex[attacker.battlecard.name.name]["types"] # gives an array of strings that are the types
-    attacker_type = set((attacker.battlecard.poke_type1, attacker.battlecard.poke_type2))  # use set to dedupe
-    # attacker_attack = attacker.a_iv*pokedex[attacker.name.name]["baseStats"]["atk"] # defines which attack
-    #attacker_attack = attacker.a
-    if move == attacker.battlecard.move_f.name:
-        move_type = attacker.battlecard._f_move_type
-        power = attacker.battlecard._move_f_damage
-    elif move == attacker.battlecard.move_ch.name:
-        move_type = attacker.battlecard._ch_move_type
-        power = attacker.battlecard._move_ch_damage
-    elif move == attacker.battlecard.move_tm.name:
-        move_type = attacker.battlecard._tm_move_type
-        power = attacker.battlecard._move_tm_damage
-
-    #defender_type = pokedex[defender.battlecard.name.name]["types"] # gives an array of strings that are the types
-    # defender_defense = defender.d_iv*pokedex[defender.name.name]["baseStats"]["def"]
-    #defender_defense = defender.d
-    defender_type = set((defender.battlecard.poke_type1, defender.battlecard.poke_type2))
-    defender_resistances = []
-    defender_weaknesses = []
-    defender_immunities = []
-    # need to make resistances into it's own function. see "analyze_type"
-    for x in defender_type:
-        defender_resistances += types[x.name]["resistances"]
-        defender_weaknesses += types[x.name]["weaknesses"]
-        defender_immunities += types[x.name]["immunities"]
-    
-    #multiplier = 1 # how much the damage is influenced
-    multiplier = 1
-    for x in attacker_type:
-        if move_type == x:
-            multiplier *= 1.2
-    for x in defender_resistances:
-        if move_type == x:
-            multiplier *= 0.625
-    for x in defender_weaknesses:
-        if move_type == x:
-            multiplier *= 1.6
-    for x in defender_immunities:
-        if move_type == x:
-            multiplier *= 0.390625  # make this 0 if you're real
+    # moves are keyed by name, since items like Choice Specs can swap a move out mid battle
+    key = (defender, move, attacker.am, defender.dm)
+    memoized = attacker.damage_memo.get(key)
+    if memoized is not None:
+        return memoized
+
+    if move == attacker.move_f:
+        slot = 0
+    elif move == attacker.move_ch:
+        slot = 1
+    elif move == attacker.move_tm:
+        slot = 2
+    power = attacker.power[slot]
+
+    # STAB and type effectiveness, see engine.utils.type_chart
+    multiplier = defender.profile.damage[attacker.stab[slot]][attacker.move_types[slot]]
 
     atkstat = effective_stat(attacker, "a")
     defstat = effective_stat(defender, "d")
@@ -1248,9 +1772,9 @@ def calculate_damage(attacker: Battler, move: Move, defender: Battler): # battle
 
     # add any attack multiplier from battle card
     multiplier += attacker.battlecard.multiplier
-    #return multiplier*power*attacker_attack/defender_defense, multiplier
     damage = max(1, math.floor(power * (atkstat/defstat) * multiplier  * 0.5 * 1.3))   # 1.3 is bonusMultiplier. chargeMultiplier is how many circles you tap in minigame
-    return damage, multiplier
+    result = attacker.damage_memo[key] = (damage, multiplier)
+    return result
 
 
 def effective_stat(poke: Battler, which: str):
@@ -1305,6 +1829,109 @@ def is_lethal(
     else:
         return False
 
+def can_ko(attacker: Battler, move: Move, defender: Battler) -> bool:
+    """
+    Side-effect free version of the `is_lethal` check.
+    """
+    if attacker.timer < attacker.battlecard.atk_spd_timer_cts:
+        return False
+    return calculate_damage(attacker, move, defender)[0] >= defender.hp
+
+
+def will_shield(attacker: Battler, move: Move, defender: Battler, proposed_damage: float) -> bool:
+    """
+    Decide whether the defender shields a charged move, assuming it has a shield left.
+
+    Shields are held back against moves with a guaranteed buff if the hit is survivable and
+    the attacker's fast move pressure is low.
+    """
+    isweakbuff = False
+    try:
+        if moves[move]["buffTarget"] == "opponent" and float(moves[move]["buffApplyChance"]) == 1:
+            isweakbuff = True
+        elif moves[move]["buffTarget"] == "self":
+            isweakbuff = True
+    except:
+        pass
+    # the attacker timer is already reset when a charged move lands, so there is no lethality
+    # check here
+    if isweakbuff:
+        fastDPT = calculate_damage(attacker, attacker.move_f, defender)[0] / (attacker.cooldown[0] / 500)
+        if proposed_damage < (defender.hp / 1.5) and (fastDPT) <= 1.5: # opposite of battle.js line 2251 ("if the defender can't afford")
+            return False
+    return True
+
+
+class AttackForecast(T.NamedTuple):
+    """
+    What `launch_attack` would do if the attacker acted right now.
+    """
+
+    move: str
+    charged: bool
+    fatal: bool
+
+
+def forecast_attack(attacker: Battler, defender: Battler) -> AttackForecast:
+    """
+    Predict the move choice and outcome of `launch_attack` without touching either battler.
+    """
+    move = calculate_optimal_move(attacker, defender)
+    move_f = attacker.move_f
+    if can_ko(attacker, move_f, defender):
+        return AttackForecast(move_f, False, True)
+    if move in (attacker.move_ch, attacker.move_tm):
+        damage = calculate_damage(attacker, move, defender)[0]
+        if defender.battlecard.bonus_shield > 0 and will_shield(attacker, move, defender, damage):
+            damage = 1
+        return AttackForecast(move, True, damage >= defender.hp)
+    if move == move_f:
+        return AttackForecast(move, False, calculate_damage(attacker, move, defender)[0] >= defender.hp)
+    return AttackForecast(move, False, False)
+
+
+def resolve_priority(battler1: Battler, battler2: Battler) -> T.Tuple[bool, bool]:
+    """
+    Work out who gets to attack when both battlers are ready on the same tick.
+
+    Normally both attacks go through. If either side threatens a KO, a charged move beats a
+    fast move and attack stat breaks ties between two charged moves, so the slower side may
+    be knocked out before it acts. Returns `(can_attack_1, can_attack_2)`.
+    """
+    threat = False
+    for attacker, defender in ((battler1, battler2), (battler2, battler1)):
+        for move in (attacker.move_f, attacker.move_ch, attacker.move_tm):
+            if can_ko(attacker, move, defender):
+                threat = True
+    if not threat:
+        return True, True
+
+    # both sides are evaluated against the current state, as if they attacked simultaneously
+    first = forecast_attack(battler1, battler2)
+    second = forecast_attack(battler2, battler1)
+    if first.charged and second.charged:
+        if battler1.a > battler2.a:
+            priority = 1
+        elif battler2.a > battler1.a:
+            priority = 2
+        else:
+            priority = 0
+    elif first.charged:
+        priority = 1
+    elif second.charged:
+        priority = 2
+    else:
+        priority = 0
+
+    if first.fatal and second.fatal:
+        return priority != 2, priority != 1
+    if first.fatal:
+        return True, priority != 1
+    if second.fatal:
+        return priority != 2, True
+    return True, True
+
+
 # import mock
 
 # from engine.player import EntityType, Player
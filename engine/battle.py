@@ -2,8 +2,14 @@
 NOTE: UNDEPRECATED!!!!
 Battle Manager
 """
+import atexit
 import copy
+import hashlib
+import os
+import threading
 import typing as T
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from engine.base import Component
 from engine.batterulogico import battle
@@ -12,7 +18,13 @@ from engine.models.association import PokemonHeldItem
 from engine.models.battle import BattleStat
 from engine.models.battle import BattleStatus
 from engine.models.battle import BattleSummary
+from engine.models.battle_spec import BattleJob
+from engine.models.battle_spec import BattleSpec
+from engine.models.battle_spec import ItemSpec
+from engine.models.enums import PokemonType
 from engine.models.items import CombatItem
+from engine.models.items import ComplexHeroPower
+from engine.models.items import Item
 from engine.models.player import Player
 from engine.models.pokemon import BattleCard, Pokemon
 from engine.models.stats import Stats
@@ -23,6 +35,125 @@ if T.TYPE_CHECKING:
     from engine.player import PlayerManager
 
 
+def derive_battle_seed(game_seed: int, turn_number: int, player1: Player, player2: Player) -> int:
+    """
+    Seed for one match battle, derived from the game seed.
+
+    A game replayed from the same seed gives every battle the same seed, whatever order the
+    battles run in.
+    """
+    parts = (str(game_seed), str(turn_number), str(player1.id), str(player2.id))
+    return int(hashlib.sha256('|'.join(parts).encode()).hexdigest()[:8], 16)
+
+
+def restore_item_state(item: T.Optional[Item], state: T.Optional[ItemSpec]) -> None:
+    """
+    Copy item changes made during a battle on rebuilt items (e.g a consumed Focus Band) back
+    onto the live item
+    """
+    if item is None or state is None:
+        return
+    # using up an item is the only change battles make to items
+    if item.consumed != state.consumed:
+        item.consumed = state.consumed
+
+
+def run_battle_job(spec: BattleSpec) -> T.Tuple[T.Dict, T.List[T.List[T.Optional[ItemSpec]]]]:
+    """
+    Run a battle spec. Can run in a worker process.
+
+    Returns the battle output and the state of every card item after the battle.
+    """
+    job = spec.to_job()
+    # seed the battle so the result does not depend on where or in which order it runs
+    res = battle(
+        job.team1_cards,
+        job.team2_cards,
+        bonus_types=job.bonus_types,
+        team1_hero=job.team1_hero,
+        team2_hero=job.team2_hero,
+        seed=job.seed,
+    )
+    return res, get_job_item_states(job)
+
+
+def get_job_item_states(job: BattleJob) -> T.List[T.List[T.Optional[ItemSpec]]]:
+    return [
+        [ItemSpec.from_item(card.item) for card in cards]
+        for cards in (job.team1_cards, job.team2_cards)
+    ]
+
+
+def run_battle_job_batch(specs: T.List[BattleSpec]) -> T.List[T.Tuple[T.Dict, T.List[T.List[T.Optional[ItemSpec]]]]]:
+    """
+    Run battle specs one after another, e.g a worker's share of a turn's matches. Can run in
+    a worker process, and sending one batch costs less than sending each spec on its own.
+    """
+    return [run_battle_job(spec) for spec in specs]
+
+
+# one pool per process, shared by every game and kept between turns. Starting a pool forks
+# its workers and shutting it down joins them, which costs about as much as a battle
+_battle_pool: T.Optional[ProcessPoolExecutor] = None
+_battle_pool_workers = 0
+_battle_pool_lock = threading.Lock()
+
+
+def get_battle_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Get the shared battle worker pool, starting it on first use
+    """
+    global _battle_pool, _battle_pool_workers
+    with _battle_pool_lock:
+        if _battle_pool is not None and _battle_pool_workers != max_workers:
+            _battle_pool.shutdown(wait=False)
+            _battle_pool = None
+        if _battle_pool is None:
+            _battle_pool = ProcessPoolExecutor(max_workers=max_workers)
+            _battle_pool_workers = max_workers
+        return _battle_pool
+
+
+def shutdown_battle_pool() -> None:
+    global _battle_pool
+    with _battle_pool_lock:
+        if _battle_pool is not None:
+            _battle_pool.shutdown()
+            _battle_pool = None
+
+
+atexit.register(shutdown_battle_pool)
+
+
+def run_battle_specs(
+    specs: T.List[BattleSpec],
+    max_workers: T.Optional[int] = None,
+    min_parallel_jobs: int = 2,
+) -> T.List[T.Tuple[T.Dict, T.List[T.List[T.Optional[ItemSpec]]]]]:
+    """
+    Run battle specs, in the shared worker pool if there are at least `min_parallel_jobs` of
+    them and more than one worker.
+
+    Each worker gets one contiguous batch of specs. Results come back in spec order.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    workers = min(len(specs), max_workers)
+    if workers <= 1 or len(specs) < min_parallel_jobs:
+        return run_battle_job_batch(specs)
+
+    size = -(-len(specs) // workers)
+    batches = [specs[start:start + size] for start in range(0, len(specs), size)]
+    try:
+        pooled = get_battle_pool(max_workers).map(run_battle_job_batch, batches)
+        return [result for batch in pooled for result in batch]
+    except BrokenProcessPool:
+        # a worker died. battles only depend on their specs, so run them here instead and
+        # start a new pool next time
+        print("Battle worker pool broke, running battles in process")
+        shutdown_battle_pool()
+        return run_battle_job_batch(specs)
+
+
 class BattleManager(Component):
     """
     Supports making battle callbacks to API server somewhere.
@@ -35,6 +166,12 @@ class BattleManager(Component):
     REPORT_DIALOG = True
     ENV_PROXY = 'battle'
 
+    # number of worker processes for a turn's battles. None uses one per CPU, 1 runs them all
+    # in this process
+    MAX_WORKERS: T.Optional[int] = None
+    # turns with fewer battles than this run them in this process, see `run_battle_specs`
+    MIN_PARALLEL_JOBS = 2
+
     def initialize(self):
         """
         Load movesets from data file
@@ -69,34 +206,73 @@ class BattleManager(Component):
 
         return cards
 
-    def battle(self, player1: Player, player2: Player,):
+    def get_hero_powers(self, player: Player) -> T.List[ComplexHeroPower]:
         """
-        Run a battle between two players using the batterulogico engine.
+        Get the hero power of a player, if they have one. Creeps do not.
+        """
+        hero = self.state.player_hero.get(str(player.id))
+        if hero is None or hero._power is None:
+            return []
+        return [hero._power]
+
+    def create_battle_job(self, player1: Player, player2: Player) -> T.Tuple[BattleSpec, T.List[T.List[Item]]]:
+        """
+        Create a battle spec for two players.
+
+        Also returns the live items held by each team, to copy changes back onto after the battle.
         """
         p1_cards = self.assemble_team_cards(player1)
         p2_cards = self.assemble_team_cards(player2)
-        p1_hero = self.state.player_hero[player1]._power
-        p2_hero = self.state.player_hero[player2]._power
+        live_items = [[card.item for card in p1_cards], [card.item for card in p2_cards]]
         weather_manager: WeatherManager = self.env.weather_manager
         weather = self.state.weather
         bonus_types = weather_manager.weather_bonuses[weather]
-        return battle(
-            p1_cards,
-            p2_cards,
+        spec = BattleSpec.from_job(BattleJob(
+            team1_cards=p1_cards,
+            team2_cards=p2_cards,
             bonus_types=bonus_types,
-            team1_hero=[p1_hero],
-            team2_hero=[p2_hero],
-        )
+            team1_hero=self.get_hero_powers(player1),
+            team2_hero=self.get_hero_powers(player2),
+            seed=derive_battle_seed(self.state.seed, self.state.turn_number, player1, player2),
+        ))
+        return spec, live_items
+
+    def run_battle_jobs(self, jobs: T.List[T.Tuple[BattleSpec, T.List[T.List[Item]]]]) -> T.List[T.Dict]:
+        """
+        Run battle jobs, in the shared worker pool if there are enough of them.
+
+        Results come back in job order, and item changes are copied back in that order too.
+        """
+        results = run_battle_specs([job for job, _ in jobs], self.MAX_WORKERS, self.MIN_PARALLEL_JOBS)
+
+        outputs = []
+        for (_, live_items), (res, item_states) in zip(jobs, results):
+            for team_items, team_states in zip(live_items, item_states):
+                for item, state in zip(team_items, team_states):
+                    restore_item_state(item, state)
+            outputs.append(res)
+        return outputs
+
+    def battle(self, player1: Player, player2: Player,):
+        """
+        Run a battle between two players using the batterulogico engine.
+        """
+        return self.run_battle_jobs([self.create_battle_job(player1, player2)])[0]
 
     def turn_execute(self, debug: bool = True):
         """
         For all matches, run battles.
+
+        The battles themselves are independent of each other, so they all run up front (in
+        parallel). Their results are then applied in match order.
         """
         matches = self.state.current_matches
-        for match in matches:
-            p1 = self.state.get_player_by_id(match.player1)
-            p2 = self.state.get_player_by_id(match.player2)
-            res = self.battle(p1, p2)
+        players = [
+            (self.state.get_player_by_id(match.player1), self.state.get_player_by_id(match.player2))
+            for match in matches
+        ]
+        results = self.run_battle_jobs([self.create_battle_job(p1, p2) for p1, p2 in players])
+        for (p1, p2), res in zip(players, results):
 
             creep_avatars = {
                 "Preschooler": 'preschooler',
@@ -150,6 +326,9 @@ class BattleManager(Component):
 
             recipients = (p1, p2)
 
+            if res['end'] != 'knockout':
+                self.log(msg=f"{p1} vs {p2} was called on remaining HP ({res['end']})", recipient=recipients)
+
             if res['winner'] == 'team1':
                 self.log(msg=f"{p1} beats {p2}", recipient=recipients)
                 losing_player = (p2,)
@@ -212,7 +391,8 @@ class BattleManager(Component):
                 player2_id=p2.id,
                 team1=[poke.id for poke in team1],
                 team2=[poke.id for poke in team2],
-                battle_stats=stats
+                battle_stats=stats,
+                seed=res['seed'],
             )
             # TODO: render
             msg = f"Battle between {p1} and {p2}"
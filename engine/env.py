@@ -8,6 +8,8 @@ from uuid import uuid4
 
 from engine.base import Component
 from engine.battle import BattleManager
+from engine.game_config import GameConfig
+from engine.game_config import get_game_config
 from engine.hero import HeroManager
 from engine.logger import __ALL_PLAYERS__
 from engine.logger import Logger
@@ -67,8 +69,16 @@ class Environment:
     def state_factory(self):
         return State.default
 
-    def __init__(self, max_players: int, id=None, component_classes: T.List[Component]=None):
+    def __init__(
+        self,
+        max_players: int,
+        id=None,
+        component_classes: T.List[Component]=None,
+        config: GameConfig = None,
+    ):
         self.component_classes = component_classes or self.default_component_classes
+        # parsed data files, shared read-only with every other game in this process
+        self.config: GameConfig = config or get_game_config()
         self._id = UUID(id) if id else uuid4()
         print("Created env with id {}".format(self._id))
         self.state: State = self.state_factory()
@@ -86,7 +96,7 @@ class Environment:
             self.components.append(component(self, self.state))
 
     @classmethod
-    def create_webless_game(cls, max_players: int):
+    def create_webless_game(cls, max_players: int, config: GameConfig = None):
         # add all non-web components
         component_classes = [
             Turn,
@@ -103,7 +113,7 @@ class Environment:
             EvolutionManager,
             ItemEventManager,
         ]
-        return cls(max_players, component_classes=component_classes)
+        return cls(max_players, component_classes=component_classes, config=config)
 
     def log(self, msg: str, recipient=__ALL_PLAYERS__):
         """
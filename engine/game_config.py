@@ -0,0 +1,274 @@
+"""
+Game Config
+
+Everything the game loads from the data directory, parsed once per process and shared by
+every `Environment`. The config is read-only: mappings are wrapped in `MappingProxyType`
+and lists are stored as tuples, so one game cannot change what another game sees.
+
+Use `get_game_config` to get the shared config. `reload_game_config` parses the files again
+and swaps in the new config for every game created afterwards. Games that already exist keep
+the config they were created with.
+"""
+import csv
+import threading
+import typing as T
+from types import MappingProxyType
+
+from engine.models.enums import Move, PokemonId, PokemonType
+from engine.models.item_event import ItemSchedule
+from engine.models.pokemon import EvolutionConfig
+from engine.models.stage_config import StageConfig
+
+
+class ConfigPaths(T.NamedTuple):
+    """
+    Where each part of the config is loaded from
+    """
+
+    stages: str = 'data/stages.txt'
+    shop_tiers: str = 'data/shop_tiers.txt'
+    shop_distribution: str = 'data/shop_distribution.txt'
+    shop_progression: str = 'data/shop_progression.txt'
+    creep_rounds: str = 'data/creep_rounds.txt'
+    evolutions: str = 'data/evolutions_list.txt'
+    default_movesets: str = 'data/default_movesets.txt'
+    pve_movesets: str = 'data/PVE_movesets.txt'
+    item_schedule: str = 'data/default_item_schedule.json'
+    nicknames: str = 'data/sanitized_names.csv'
+    move_types: str = 'data/move_types.csv'
+    pokemon_types: str = 'data/pokemon_types.csv'
+
+
+class CreepRound(T.NamedTuple):
+    """
+    The trainer name and Pokemon names for one creep round
+    """
+
+    name: str
+    pokemon: T.Tuple[str, ...]
+
+
+def read_lines(path: str) -> T.List[str]:
+    with open(path, 'r') as config_file:
+        return config_file.readlines()
+
+
+def read_csv_column(path: str, key: str, value: str) -> T.Dict[str, str]:
+    """
+    Map one column of a CSV to another. The first row is the header.
+    """
+    with open(path, 'r', newline='') as csv_file:
+        return {row[key]: row[value] for row in csv.DictReader(csv_file)}
+
+
+def reference_type(name: str) -> PokemonType:
+    """
+    Look up a type as it is written in the reference CSVs, e.g `Fire` or `No Type`
+    """
+    name = name.lower()
+    if name == 'no type':
+        name = "none"  # feed into enum
+    return PokemonType[name]
+
+
+def parse_stages(lines: T.List[str]) -> T.Dict[int, StageConfig]:
+    stages = {}
+    turn_number = 1
+    for line in lines:
+        # turn is unit indexed
+        if not line:
+            continue
+        if line.startswith('#'):
+            continue
+
+        entries = line.split()
+        stage = int(entries[0])
+        round = int(entries[1])
+        location = ' '.join(entries[2:])
+        stages[turn_number] = StageConfig(stage=stage, round=round, location=location)
+        turn_number += 1
+    return stages
+
+
+def parse_shop_tiers(lines: T.List[str]) -> T.Dict[str, int]:
+    tiers = {}
+    for line in lines:
+        if not line:
+            continue
+        if line.startswith('#'):
+            continue
+        split = line.split()
+        tiers[split[1].strip()] = int(split[0].strip())
+    return tiers
+
+
+def parse_shop_distribution(lines: T.List[str]) -> T.Tuple[T.Tuple[int, ...], ...]:
+    return tuple(tuple(int(x) for x in line.split()) for line in lines)
+
+
+def parse_shop_progression(lines: T.List[str]) -> T.Tuple[T.Tuple[int, ...], ...]:
+    return tuple(
+        tuple(int(x) for x in line.split(','))
+        for line in lines
+        if line and not line.startswith('#')
+    )
+
+
+def parse_creep_rounds(lines: T.List[str]) -> T.Dict[int, CreepRound]:
+    rounds = {}
+    for idx, line in enumerate(lines):
+        round_num = None
+        if line.startswith('#'):
+            continue
+        try:
+            round_num = int(line)
+            # next line is the trainer name, and the six after it are the pokemon battle cards
+            rounds[round_num] = CreepRound(
+                name=lines[idx + 1].strip(),
+                pokemon=tuple(pokemon.strip().split(',')[0] for pokemon in lines[idx + 2:idx + 8]),
+            )
+        except ValueError:
+            # re-raise exception if a line number was parseable
+            if round_num is not None:
+                print('Error parsing creep round {}'.format(round_num))
+                raise
+    return rounds
+
+
+def parse_evolutions(lines: T.List[str]) -> T.Dict[str, EvolutionConfig]:
+    evolutions = {}
+    for line in lines:
+        base, turns, evolved = line.split()
+        evolutions[base] = EvolutionConfig(evolved, int(turns))
+    return evolutions
+
+
+def parse_movesets(lines: T.List[str]) -> T.Dict[str, str]:
+    """
+    Map Pokemon names to their whole moveset line
+    """
+    return {line.split(',')[0]: line for line in lines}
+
+
+def parse_tm_movesets(lines: T.List[str]) -> T.Dict[PokemonId, Move]:
+    tm_movesets = {}
+    for line in lines:
+        if line.startswith('#') or not line:
+            continue
+        split = line.split(',')
+        tm_movesets[PokemonId[split[0]]] = Move[split[3]]
+    return tm_movesets
+
+
+class GameConfig(T.NamedTuple):
+    """
+    Every data file the game reads, parsed
+    """
+
+    paths: ConfigPaths
+    stages: T.Mapping[int, StageConfig]
+    shop_tiers: T.Mapping[str, int]
+    shop_distribution: T.Tuple[T.Tuple[int, ...], ...]
+    shop_progression: T.Tuple[T.Tuple[int, ...], ...]
+    creep_rounds: T.Mapping[int, CreepRound]
+    evolutions: T.Mapping[str, EvolutionConfig]
+    default_movesets: T.Mapping[str, str]
+    pve_movesets: T.Mapping[str, str]
+    tm_movesets: T.Mapping[PokemonId, Move]
+    item_schedule: ItemSchedule
+    nicknames: T.Mapping[str, str]
+    move_types: T.Mapping[str, PokemonType]
+    pokemon_types: T.Mapping[str, T.Tuple[PokemonType, PokemonType]]
+
+    @classmethod
+    def load(cls, paths: ConfigPaths = ConfigPaths()) -> "GameConfig":
+        default_movesets = read_lines(paths.default_movesets)
+        type1 = read_csv_column(paths.pokemon_types, 'name', 'type1')
+        type2 = read_csv_column(paths.pokemon_types, 'name', 'type2')
+        return cls(
+            paths=paths,
+            stages=MappingProxyType(parse_stages(read_lines(paths.stages))),
+            shop_tiers=MappingProxyType(parse_shop_tiers(read_lines(paths.shop_tiers))),
+            shop_distribution=parse_shop_distribution(read_lines(paths.shop_distribution)),
+            shop_progression=parse_shop_progression(read_lines(paths.shop_progression)),
+            creep_rounds=MappingProxyType(parse_creep_rounds(read_lines(paths.creep_rounds))),
+            evolutions=MappingProxyType(parse_evolutions(read_lines(paths.evolutions))),
+            default_movesets=MappingProxyType(parse_movesets(default_movesets)),
+            pve_movesets=MappingProxyType(parse_movesets(read_lines(paths.pve_movesets))),
+            tm_movesets=MappingProxyType(parse_tm_movesets(default_movesets)),
+            item_schedule=ItemSchedule.parse_file(paths.item_schedule),
+            nicknames=MappingProxyType(read_csv_column(paths.nicknames, 'name', 'sanitized_name')),
+            move_types=MappingProxyType({
+                move: reference_type(move_type)
+                for move, move_type in read_csv_column(paths.move_types, 'move', 'type').items()
+            }),
+            pokemon_types=MappingProxyType({
+                name: (reference_type(type1[name]), reference_type(type2[name])) for name in type1
+            }),
+        )
+
+    def problems(self) -> T.List[str]:
+        """
+        Describe every reference between config files that does not resolve
+        """
+        problems = []
+        for name in self.shop_tiers:
+            if name not in self.default_movesets:
+                problems.append(f"shop Pokemon {name} has no default moveset")
+            if name not in self.pokemon_types:
+                problems.append(f"shop Pokemon {name} has no types")
+            if name not in self.nicknames:
+                problems.append(f"shop Pokemon {name} has no nickname")
+        for base, evolution in self.evolutions.items():
+            for name in (base, evolution.evolved_form):
+                if name not in self.default_movesets:
+                    problems.append(f"evolution {base} -> {evolution.evolved_form}: {name} has no default moveset")
+        for round_num, creep_round in self.creep_rounds.items():
+            for name in creep_round.pokemon:
+                if name not in self.pve_movesets:
+                    problems.append(f"creep round {round_num}: {name} has no PVE moveset")
+        for stage in self.stages.values():
+            if not 0 < stage.stage <= len(self.shop_distribution):
+                problems.append(f"stage {stage.stage} has no shop distribution")
+        known_tiers = set(self.shop_tiers.values())
+        for tier in sorted({tier for tiers in self.shop_progression for tier in tiers}):
+            if tier not in known_tiers:
+                problems.append(f"shop tier {tier} has no Pokemon")
+        return problems
+
+    def validate(self) -> "GameConfig":
+        problems = self.problems()
+        if problems:
+            raise ValueError("Invalid game config:\n" + "\n".join(problems))
+        return self
+
+
+_config: T.Optional[GameConfig] = None
+_config_lock = threading.Lock()
+
+
+def get_game_config() -> GameConfig:
+    """
+    Get the shared game config, loading it on first use
+    """
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = GameConfig.load()
+    return _config
+
+
+def reload_game_config(paths: T.Optional[ConfigPaths] = None, validate: bool = False) -> GameConfig:
+    """
+    Parse the config files again and share the result with every game created from now on.
+
+    With `validate`, a config with problems raises ValueError and the current config is kept.
+    """
+    global _config
+    with _config_lock:
+        config = GameConfig.load(paths or (_config.paths if _config else ConfigPaths()))
+        if validate:
+            config.validate()
+        _config = config
+    return config
@@ -24,8 +24,6 @@ class ItemEventManager(Component):
     Defines and manages the item distribution
     """
 
-    CONFIG_PATH = 'data/default_item_schedule.json'
-
     @property
     def dependencies(self) -> T.List:
         return [
@@ -37,10 +35,10 @@ class ItemEventManager(Component):
         Load data files which define item distribution schedules
         """
         super().initialize()
-        
+
         # TODO: make this more configurable. For now, load the basic 'somewhat variable'
-        # default item schedule
-        self.item_schedule: ItemSchedule = ItemSchedule.parse_file(self.CONFIG_PATH)
+        # default item schedule. It is shared with every other game, so never modify it.
+        self.item_schedule: ItemSchedule = self.env.config.item_schedule
 
     def turn_setup(self):
         """
@@ -27,37 +27,19 @@ class CreepRoundManager(Component):
     Creates creep players and assigns Pokemon as required.
     """
 
-    CONFIG_PATH = "data/creep_rounds.txt"
-
     def initialize(self):
         self.creep_round_pokemon = defaultdict(lambda: [])
         self.creep_round_name = defaultdict(lambda: "Creep Round")
-        with open(self.CONFIG_PATH, 'r') as creep_rounds_file:
-            creep_rounds_raw = creep_rounds_file.readlines()
 
         pokemon_factory: PokemonFactory = self.env.pokemon_factory
 
-        for idx, line in enumerate(creep_rounds_raw):
-            round_num = None
-            if line.startswith('#'):
-                continue
-            try:
-                round_num = int(line)
-                # next line is the trainer name
-                self.creep_round_name[round_num] = creep_rounds_raw[idx + 1].strip()
-                # next six lines are the pokemon battle cards
-                pokemon_names = [
-                    pokemon.strip().split(',')[0] for pokemon in creep_rounds_raw[idx + 2:idx + 8]
-                ]
-                team = [
-                    pokemon_factory.create_PVEpokemon_by_name(pokemon) for pokemon in pokemon_names
-                ]
-                self.creep_round_pokemon[round_num] = team
-            except ValueError:
-                # re-raise exception if a line number was parseable
-                if round_num is not None:
-                    print('Error parsing creep round {}'.format(round_num))
-                    raise
+        # only the names are kept, creep players get new Pokemon every round. Building the
+        # prototypes here still catches a bad creep round before the game starts
+        for round_num, creep_round in self.env.config.creep_rounds.items():
+            self.creep_round_name[round_num] = creep_round.name
+            for pokemon in creep_round.pokemon:
+                pokemon_factory.get_prototype(pokemon_factory.PVE_movesets[pokemon])
+            self.creep_round_pokemon[round_num] = list(creep_round.pokemon)
 
     def create_creep_player(self):
         # do a lookup based on the current run
@@ -72,7 +54,7 @@ class CreepRoundManager(Component):
         turn = self.state.turn_number
         for pokemon in self.creep_round_pokemon[turn]:
             # create a new instance of the creep round pokemon
-            poke = pokemon_factory.create_PVEpokemon_by_name(pokemon.name.name)
+            poke = pokemon_factory.create_PVEpokemon_by_name(pokemon)
             player_manager.give_pokemon_to_player(creep_player, poke)
 
         # configure team with 3 random Pokemon
@@ -18,6 +18,25 @@ class BattleStatus(Enum):
     FAINTED = 3
 
 
+class LogPolicy(Enum):
+    """
+    Which battle logs to record. Disabled logs cost nothing.
+    """
+
+    FULL = "full"
+    RENDER_ONLY = "render"
+    EVENTS_ONLY = "events"
+    NONE = "none"
+
+    @property
+    def events(self) -> bool:
+        return self in (LogPolicy.FULL, LogPolicy.EVENTS_ONLY)
+
+    @property
+    def render(self) -> bool:
+        return self in (LogPolicy.FULL, LogPolicy.RENDER_ONLY)
+
+
 class BattleStat(BaseModel):
     """
     Combat statistics
@@ -43,6 +62,7 @@ class BattleSummary(BaseModel):
     team1: T.List[str]  # a list of pokemon IDs that participated in combat
     team2: T.List[str]
     battle_stats: T.Dict[str, BattleStat]  # maps pokemon IDs to their battle statistics
+    seed: T.Optional[int] = None  # replays the battle, see `batterulogico.battle`
 
 
 class Event:
@@ -0,0 +1,204 @@
+"""
+Battle Specs
+
+Frozen, plain-data descriptions of a battle. Battle cards hold items, and items (like hero
+powers) reference the game environment, so the live models are expensive or impossible to
+send to another process. A `BattleSpec` only holds numbers and names, pickles small, and can
+be turned back into live models wherever the battle actually runs.
+"""
+import typing as T
+
+from engine.models import items
+from engine.models.enums import Move
+from engine.models.enums import PokemonId
+from engine.models.enums import PokemonType
+from engine.models.items import ComplexHeroPower
+from engine.models.items import Item
+from engine.models.pokemon import BattleCard
+from engine.utils.type_chart import as_pokemon_type
+
+
+class ItemSpec(T.NamedTuple):
+    """
+    A held item, by class name
+    """
+
+    kind: str
+    level: int
+    consumed: bool = False
+
+    @classmethod
+    def from_item(cls, item: T.Optional[Item]) -> T.Optional["ItemSpec"]:
+        if item is None:
+            return None
+        return cls(kind=type(item).__name__, level=item.level, consumed=item.consumed)
+
+    def to_item(self) -> Item:
+        return getattr(items, self.kind)(level=self.level, consumed=self.consumed)
+
+
+class HeroSpec(T.NamedTuple):
+    """
+    A hero power, by class name, with its fields as JSON. Powers carry state from turn to
+    turn (e.g Blaine's counter), which battles may read.
+
+    The holder is left out, and so is the id.
+    """
+
+    kind: str
+    state: str
+
+    @classmethod
+    def from_power(cls, power: ComplexHeroPower) -> "HeroSpec":
+        return cls(kind=type(power).__name__, state=power.json(exclude={"holder", "id"}))
+
+    def to_power(self) -> ComplexHeroPower:
+        return getattr(items, self.kind).parse_raw(self.state)
+
+
+class CardSpec(T.NamedTuple):
+    """
+    A battle card with everything battles read from it. Moves and types are stored by name.
+
+    Move slots are ordered fast, charged, tm.
+    """
+
+    name: str
+    moves: T.Tuple[str, str, T.Optional[str]]
+    level: float
+    atk_: float
+    def_: float
+    health: float
+    max_health: float
+    f_move_spd: float
+    poke_types: T.Tuple[str, str]
+    move_types: T.Tuple[str, str, str]
+    move_damage: T.Tuple[float, float, float]
+    move_energy: T.Tuple[float, float, float]
+    modifiers: T.Tuple[float, ...]
+    tm_flag: bool
+    shiny: bool
+    energy: float
+    bonus_shield: int
+    status: int
+    choiced: bool
+    team_position: T.Optional[int]
+    multiplier: float
+    item: T.Optional[ItemSpec]
+
+    @classmethod
+    def from_card(cls, card: BattleCard) -> "CardSpec":
+        return cls(
+            name=card.name.name,
+            moves=(card.move_f.name, card.move_ch.name, card.move_tm.name if card.move_tm else None),
+            level=card.level,
+            atk_=card.atk_,
+            def_=card.def_,
+            health=card.health,
+            max_health=card.max_health,
+            f_move_spd=card.f_move_spd,
+            poke_types=(card.poke_type1.name, card.poke_type2.name),
+            move_types=tuple(
+                as_pokemon_type(x).name for x in (card._f_move_type, card._ch_move_type, card._tm_move_type)
+            ),
+            move_damage=(card._move_f_damage, card._move_ch_damage, card._move_tm_damage),
+            move_energy=(card._move_f_energy, card._move_ch_energy, card._move_tm_energy),
+            modifiers=tuple(card.modifiers),
+            tm_flag=card.tm_flag,
+            shiny=card.shiny,
+            energy=card.energy,
+            bonus_shield=card.bonus_shield,
+            status=card.status,
+            choiced=card.choiced,
+            team_position=card.team_position,
+            multiplier=card.multiplier,
+            item=ItemSpec.from_item(card.item),
+        )
+
+    def to_card(self) -> BattleCard:
+        """
+        Build a new battle card holding a new item
+        """
+        move_f, move_ch, move_tm = self.moves
+        # skip __init__, everything it would look up in the gamemaster is already here
+        card = BattleCard.construct(
+            name=PokemonId[self.name],
+            move_f=Move[move_f],
+            move_ch=Move[move_ch],
+            move_tm=Move[move_tm] if move_tm else None,
+            level=self.level,
+            atk_=self.atk_,
+            def_=self.def_,
+            health=self.health,
+            f_move_spd=self.f_move_spd,
+            poke_type1=PokemonType[self.poke_types[0]],
+            poke_type2=PokemonType[self.poke_types[1]],
+            tm_flag=self.tm_flag,
+            shiny=self.shiny,
+            energy=self.energy,
+            bonus_shield=self.bonus_shield,
+            status=self.status,
+            choiced=self.choiced,
+            team_position=self.team_position,
+            multiplier=self.multiplier,
+            modifiers=list(self.modifiers),
+        )
+        card._max_health = self.max_health
+        card._f_move_type, card._ch_move_type, card._tm_move_type = (PokemonType[x] for x in self.move_types)
+        card._move_f_damage, card._move_ch_damage, card._move_tm_damage = self.move_damage
+        card._move_f_energy, card._move_ch_energy, card._move_tm_energy = self.move_energy
+        card.give_item(self.item.to_item() if self.item is not None else None)
+        return card
+
+
+class BattleJob(T.NamedTuple):
+    """
+    The live models for one battle, see `BattleSpec.to_job`
+    """
+
+    team1_cards: T.List[BattleCard]
+    team2_cards: T.List[BattleCard]
+    bonus_types: T.List[PokemonType]
+    team1_hero: T.List[ComplexHeroPower]
+    team2_hero: T.List[ComplexHeroPower]
+    seed: int
+
+
+class BattleSpec(T.NamedTuple):
+    """
+    Everything needed to run one battle, as plain data.
+
+    The weather is stored by its bonus types.
+    """
+
+    team1: T.Tuple[CardSpec, ...]
+    team2: T.Tuple[CardSpec, ...]
+    bonus_types: T.Tuple[str, ...]
+    team1_hero: T.Tuple[HeroSpec, ...]
+    team2_hero: T.Tuple[HeroSpec, ...]
+    seed: int
+
+    @classmethod
+    def from_job(cls, job: BattleJob) -> "BattleSpec":
+        return cls(
+            team1=tuple(CardSpec.from_card(card) for card in job.team1_cards),
+            team2=tuple(CardSpec.from_card(card) for card in job.team2_cards),
+            bonus_types=tuple(x.name for x in job.bonus_types),
+            team1_hero=tuple(HeroSpec.from_power(power) for power in job.team1_hero),
+            team2_hero=tuple(HeroSpec.from_power(power) for power in job.team2_hero),
+            seed=job.seed,
+        )
+
+    def to_job(self) -> BattleJob:
+        """
+        Build new live models for the battle. Nothing is shared with the models the spec was
+        made from.
+        """
+        return BattleJob(
+            team1_cards=[spec.to_card() for spec in self.team1],
+            team2_cards=[spec.to_card() for spec in self.team2],
+            bonus_types=[PokemonType[x] for x in self.bonus_types],
+            team1_hero=[spec.to_power() for spec in self.team1_hero],
+            team2_hero=[spec.to_power() for spec in self.team2_hero],
+            seed=self.seed,
+        )
@@ -7,6 +7,7 @@ TODO: more structuring on the context field that gets passed from battle engine
 """
 import aenum
 from enum import Enum
+from functools import lru_cache
 import typing as T
 
 from pydantic import BaseModel
@@ -157,6 +158,27 @@ class PokemonItem(Item):
         self.holder = pokemon
 
 
+COMBAT_HOOK_METHODS: T.Dict[CombatHook, str] = {
+    CombatHook.PRE_BATTLE: "pre_battle_action",
+    CombatHook.PRE_COMBAT: "pre_combat_action",
+    CombatHook.ON_TICK: "on_tick_action",
+    CombatHook.ON_FAST_MOVE: "on_fast_move_action",
+    CombatHook.ON_ENEMY_FAST_MOVE: "on_enemy_fast_move_action",
+    CombatHook.ON_CHARGED_MOVE: "on_charged_move_action",
+    CombatHook.ON_ENEMY_CHARGED_MOVE: "on_enemy_charged_move_action",
+    CombatHook.POST_COMBAT: "post_combat_action",
+    CombatHook.POST_BATTLE: "post_battle_action",
+}
+
+
+@lru_cache(maxsize=None)
+def _get_combat_hooks(item_class: T.Type["CombatItem"]) -> T.FrozenSet[CombatHook]:
+    return frozenset(
+        hook for hook, name in COMBAT_HOOK_METHODS.items()
+        if getattr(item_class, name) is not getattr(CombatItem, name)
+    )
+
+
 class CombatItem(PokemonItem):
     """
     Base class for items which trigger before or after combat.
@@ -248,24 +270,22 @@ class CombatItem(PokemonItem):
         raise Exception('Cannot find team???')
 
     def get_method(self, combat_hook: CombatHook) -> T.Callable:
-        if combat_hook == CombatHook.PRE_BATTLE:
-            return self.pre_battle_action
-        if combat_hook == CombatHook.PRE_COMBAT:
-            return self.pre_combat_action
-        if combat_hook == CombatHook.ON_TICK:
-            return self.on_tick_action
-        if combat_hook == CombatHook.ON_FAST_MOVE:
-            return self.on_fast_move_action
-        if combat_hook == CombatHook.ON_ENEMY_FAST_MOVE:
-            return self.on_enemy_fast_move_action
-        if combat_hook == CombatHook.ON_CHARGED_MOVE:
-            return self.on_charged_move_action
-        if combat_hook == CombatHook.ON_ENEMY_CHARGED_MOVE:
-            return self.on_enemy_charged_move_action
-        if combat_hook == CombatHook.POST_COMBAT:
-            return self.post_combat_action
-        if combat_hook == CombatHook.POST_BATTLE:
-            return self.post_battle_action
+        name = COMBAT_HOOK_METHODS.get(combat_hook)
+        if name is not None:
+            return getattr(self, name)
+
+    @classmethod
+    def combat_hooks(cls) -> T.FrozenSet[CombatHook]:
+        """
+        The combat hooks this item class does anything on, i.e the hook actions it overrides
+        """
+        return _get_combat_hooks(cls)
+
+    def implements(self, combat_hook: CombatHook) -> bool:
+        """
+        Check if this item does anything on a combat hook
+        """
+        return combat_hook in _get_combat_hooks(type(self))
 
     def pre_battle_action(self, **context: T.Any) -> T.List[Event]:
         """
@@ -285,6 +305,17 @@ class CombatItem(PokemonItem):
         """
         pass
 
+    def on_ticks_action(self, ticks: int, **context: T.Any) -> T.List[Event]:
+        """
+        Run the on tick action for a number of consecutive ticks in which nothing else happens.
+
+        The battle engine uses this to skip over ticks where neither battler can act. By default
+        this just runs `on_tick_action` once per tick. Items can override this to apply their
+        effect in aggregate, but the end result must match running the ticks one by one.
+        """
+        for _ in range(ticks):
+            self.on_tick_action(**context)
+
     def on_fast_move_action(self, **context: T.Any) -> T.List[Event]:
         """
         Run this action on all fast hits
@@ -655,11 +686,20 @@ class LifeOrb(CombinedItem):
         """
         lose health per tick
         """
+        self.on_ticks_action(1, logger=logger, render=render, **context)
+
+    def on_ticks_action(self, ticks: int, logger: "EventLogger" = None,render: "RenderLogger" = None, **context: T.Any):
+        """
+        lose health for a number of ticks
+        """
         holder = self.get_item_holder_from_context(context)
         team = self.get_team_of_holder(context)
 
         before = holder.hp
-        after = holder.hp - per_second(self._HEALTH_LOSS) * self.level
+        after = before
+        for _ in range(ticks):
+            # subtract tick by tick so floating point results match the tick loop exactly
+            after -= per_second(self._HEALTH_LOSS) * self.level
         holder.hp = after
         if logger is not None:
             logger(
@@ -716,11 +756,20 @@ class CellBattery(CombinedItem):
         """
         energy per tick 
         """
-        holder = self.get_item_holder_from_context(context).battlecard
+        self.on_ticks_action(1, logger=logger, render=render, **context)
+
+    def on_ticks_action(self, ticks: int, logger: "EventLogger" = None,render: "RenderLogger" = None, **context: T.Any):
+        """
+        energy for a number of ticks
+        """
+        battler = self.get_item_holder_from_context(context)
+        holder = battler.battlecard
         team = self.get_team_of_holder(context)
-        before = holder.energy
-        after = holder.energy + per_second(self._ENERGY) * self.level
-        holder.energy = after
+        before = battler.energy
+        after = before
+        for _ in range(ticks):
+            after += per_second(self._ENERGY) * self.level
+        battler.energy = after
         if logger:
             logger(
                 'CellBattery on_tick',
@@ -742,17 +791,26 @@ class Leftovers(CombinedItem):
         """
         health per tick 
         """
+        self.on_ticks_action(1, logger=logger, render=render, **context)
+
+    def on_ticks_action(self, ticks: int, logger: "EventLogger" = None,render: "RenderLogger" = None, **context: T.Any):
+        """
+        health for a number of ticks
+        """
         holder = self.get_item_holder_from_context(context)
         team = f"team{self.get_team_of_holder(context)}"
         before = holder.hp
-        after = holder.hp + per_second(self._HEALTH_PER_TICK)
+        after = before
+        for _ in range(ticks):
+            after += per_second(self._HEALTH_PER_TICK)
         holder.hp = after
         if logger:
             logger(
                 "LeftOvers on_tick",
                 f"team{team} {holder.battlecard.name.name} HP {before:.1f} -> {after:.1f}"
             )
-        render("|-heal|p"+str(team[-1])+"a: "+holder.nickname+"|" + str(round(after)) + r"\/" + str(round(holder.battlecard.max_health))+"|[from] item: Leftovers")
+        if render:
+            render("|-heal|p"+str(team[-1])+"a: "+holder.nickname+"|" + str(round(after)) + r"\/" + str(round(holder.battlecard.max_health))+"|[from] item: Leftovers")
 
 
 class Metronome(CombinedItem):
@@ -913,7 +971,7 @@ class FocusBand(CombinedItem):
             return
 
         holder.status = 1
-        holder.energy = 100
+        battler.energy = 100
         if self.level == 1:
             battler.hp = 1
         elif self.level == 2:
@@ -925,7 +983,7 @@ class FocusBand(CombinedItem):
         if logger is not None:
             logger(
                 "FocusBand post_combat",
-                f"team{team} {holder.name.name} revived with {battler.hp} HP and {holder.energy} ENG"
+                f"team{team} {holder.name.name} revived with {battler.hp} HP and {battler.energy} ENG"
             )
         if render:
             render("|-enditem|p" + str(team) + "a: " + battler.nickname + "|Focus Sash")
@@ -955,7 +1013,10 @@ class ShellBell(CombinedItem):
         NOTE(albert/will): this does pre-mitigation damage, which may be imbalanced...
         """
         battler = self.get_item_holder_from_context(context)
-        holder = self.get_item_holder_from_context(context).battlecard
+        # the hook also fires for the enemy's moves, only the holder's own moves heal
+        if context.get('attacker') is not battler:
+            return
+        holder = battler.battlecard
         team = self.get_team_of_holder(context)
         move: str = context['move']
         if move == holder.move_f.name:
@@ -965,7 +1026,7 @@ class ShellBell(CombinedItem):
         elif move == holder.move_tm.name:
             damage = holder._move_tm_damage
         else:
-            raise Exception(f"Received unknown move {move.name}")
+            raise Exception(f"Received unknown move {move}")
 
         before = holder.health
         after = holder.health + self._LIFESTEAL_PCT / 100.0 * self.level * damage
@@ -975,7 +1036,8 @@ class ShellBell(CombinedItem):
                 f"ShellBell {name}",
                 f"team{team} {holder.name.name} HP {before:.1f} -> {after:.1f}"
             )
-        render("|-heal|p" + str(team) + "a: " + battler.nickname + "|" + str(int(after)) + r"\/" + str(int(holder.max_health)) + "|[from] item: Shell Bell")
+        if render:
+            render("|-heal|p" + str(team) + "a: " + battler.nickname + "|" + str(int(after)) + r"\/" + str(int(holder.max_health)) + "|[from] item: Shell Bell")
 
     def on_fast_move_action(self, logger: "EventLogger" = None,render: "RenderLogger" = None, **context: T.Any):
         self._on_damage_move_action("on_fast_move", logger=logger, render = render,**context)
@@ -1052,6 +1114,7 @@ class ExpertBelt(CombinedItem):
         before = holder.battlecard.multiplier
         after = self._MULTIPLIER * self.level
         holder.battlecard.multiplier = after
+        holder.invalidate_damage()
         if logger is not None:
             logger(
                 "ExpertBelt on_attack",
@@ -1079,6 +1142,7 @@ class ExpertBelt(CombinedItem):
         """
         holder = self.get_item_holder_from_context(context)
         holder.battlecard.multiplier -= self._MULTIPLIER * self.level
+        holder.invalidate_damage()
 
 
 class AssaultVest(CombinedItem):
@@ -1162,9 +1226,10 @@ class ChoiceSpecs(CombinedItem):
         change your fast move
         """
         lock_on = Move.LOCK_ON
-        holder = self.get_item_holder_from_context(context).battlecard
+        battler = self.get_item_holder_from_context(context)
         team = self.get_team_of_holder(context)
-        holder.move_f = lock_on
+        battler.battlecard.move_f = lock_on
+        battler.load_moves()
         if logger is not None:
             logger(
                 "ChoiceSpecs pre_battle",
@@ -1175,11 +1240,12 @@ class ChoiceSpecs(CombinedItem):
         """
         energy onhit
         """
-        holder = self.get_item_holder_from_context(context).battlecard
+        battler = self.get_item_holder_from_context(context)
+        holder = battler.battlecard
         team = self.get_team_of_holder(context)
-        before = holder.energy
-        after = holder.energy + self._ENG_GAIN * self.level
-        holder.energy = after
+        before = battler.energy
+        after = battler.energy + self._ENG_GAIN * self.level
+        battler.energy = after
         if logger is not None:
             logger(
                 "ChoiceSpecs on_fast_move",
@@ -141,6 +141,18 @@ class BattleCard(BaseModel):
     def __hash__(self):
         return hash(self._id)
 
+    def clone(self) -> "BattleCard":
+        """
+        Copy this card into a new card with its own ID.
+
+        Skips validation and the gamemaster lookups in `__init__`, so this is much cheaper
+        than building the card again. Only `modifiers` is mutable, so it is the only field
+        that gets copied rather than shared.
+        """
+        card = self.copy(update={'modifiers': list(self.modifiers)})
+        card._id = uuid_as_str()
+        return card
+
     @property
     def max_health(self) -> float:
         return self._max_health
@@ -4,6 +4,7 @@
 
 # maybe we just do a `mutate` function or something
 import codecs
+import random
 import typing as T
 from pydantic import BaseModel, PrivateAttr, StrBytes
 from engine.models.association import Association, PlayerRoster, PlayerShop, PokemonHeldItem
@@ -50,6 +51,9 @@ class State(BaseModel):
     t_phase_elapsed: float = 0.0
     t_phase_duration: float = float('inf')
 
+    # every battle seed is derived from this, so a game can be replayed
+    seed: int = 0
+
     # NOTE: registries are to ensure that these objects do not garbage collected until
     # the state object is destructed. They should not be transmitted over the wire.
     # TODO: figure out why pydantic breaks if the type is set
@@ -181,6 +185,7 @@ class State(BaseModel):
             players=[],
             current_matches=[],
             turn_number=0,
+            seed=random.getrandbits(32),
         )
 
     @classmethod
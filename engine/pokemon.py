@@ -2,9 +2,7 @@
 Pokemon Object Representation
 """
 import random
-import pandas as pd
 import typing as T
-from collections import defaultdict
 
 from engine.base import Component
 from engine.models.enums import Move, PokemonId, PokemonType
@@ -22,31 +20,18 @@ class TmManager(Component):
     Records Pokemon TM (Technical Machine) move modifications
     """
 
-    #CONFIG_PATH = 'data/tm_movesets.txt'
-    CONFIG_PATH = 'data/default_movesets.txt'
-
     def initialize(self):
         """
         Load default TMs for all Pokemon
         """
         super().initialize()
-        with open(self.CONFIG_PATH, 'r') as movesets_file:
-            movesets_raw = movesets_file.readlines()
-
-        self.tm_movesets = defaultdict(lambda: None)
-        for row in movesets_raw:
-            if row.startswith('#') or not row:
-                continue
-            battlecard_split = row.split(',')
-            pokemon = PokemonId[battlecard_split[0]]
-            tm_move = Move[battlecard_split[3]]
-            self.tm_movesets[pokemon] = tm_move
+        self.tm_movesets: T.Mapping[PokemonId, Move] = self.env.config.tm_movesets
 
     def get_tm_move(self, pokemon: PokemonId):
         """
         Get a TM move for a Pokemon
         """
-        return self.tm_movesets[pokemon]
+        return self.tm_movesets.get(pokemon)
 
 
 class PokemonFactory(Component):
@@ -54,34 +39,15 @@ class PokemonFactory(Component):
     Supports creating Pokemon instances
     """
 
-    CONFIG_PATH = 'data/default_movesets.txt'
-    CONFIG_PATH_PVE = 'data/PVE_movesets.txt'
-    NAME_PATH = "data/sanitized_names.csv"
-
-    MOVE_REFERENCE_PATH = "data/move_types.csv"
-    TYPE_REFERENCE_PATH = "data/pokemon_types.csv"
-
     def initialize(self):
         """
         Load default movesets for all Pokemon when instantiating them.
         """
         super().initialize()
-        with open(self.CONFIG_PATH, 'r') as default_movesets_file:
-            default_movesets_raw = default_movesets_file.readlines()
-
-        self.default_movesets = {}  # maps pokemon name to default BattleCard
-        for line in default_movesets_raw:
-            pokemon_name = line.split(',')[0]
-            self.default_movesets[pokemon_name] = line
-
-        with open(self.CONFIG_PATH_PVE, 'r') as PVE_movesets_file:
-            PVE_movesets_raw = PVE_movesets_file.readlines()
-
-        self.PVE_movesets = {}  # maps pokemon name to default BattleCard
-        for line in PVE_movesets_raw:
-            pokemon_name = line.split(',')[0]
-            self.PVE_movesets[pokemon_name] = line
-        self.nickname_map = pd.read_csv(self.NAME_PATH)
+        config = self.env.config
+        self.default_movesets: T.Mapping[str, str] = config.default_movesets  # maps pokemon name to default BattleCard
+        self.PVE_movesets: T.Mapping[str, str] = config.pve_movesets  # maps pokemon name to default BattleCard
+        self.nickname_map: T.Mapping[str, str] = config.nicknames
         self.mew_m_fast = ['SNARL', 'DRAGON_TAIL', 'VOLT_SWITCH', 'INFESTATION', 'SHADOW_CLAW', 'POUND', 'STEEL_WING', 'POISON_JAB', 'CHARGE_BEAM', 'FROST_BREATH', 'DRAGON_TAIL', 'ROCK_SMASH', 'WATERFALL']
         self.mew_m_charged = ['ANCIENT_POWER','DRAGON_CLAW','ICE_BEAM','HYPER_BEAM','SOLAR_BEAM','THUNDER_BOLT','FLAME_CHARGE','LOW_SWEEP','ENERGY_BALL','STONE_EDGE','GYRO_BALL','DARK_PULSE','DAZZLING_GLEAM','SURF']
         self.porygon_m_fast = [
@@ -103,8 +69,12 @@ class PokemonFactory(Component):
             "HIDDEN_POWER_WATER"
         ]
 
-        self.move_reference = pd.read_csv(self.MOVE_REFERENCE_PATH)
-        self.type_reference = pd.read_csv(self.TYPE_REFERENCE_PATH)
+        # types are resolved when the config is loaded, so that creating a Pokemon only does dict lookups
+        self.move_reference: T.Mapping[str, PokemonType] = config.move_types
+        self.type_reference: T.Mapping[str, T.Tuple[PokemonType, PokemonType]] = config.pokemon_types
+
+        # maps a moveset line to a battle card built from it, see `get_prototype`
+        self.prototypes: T.Dict[str, BattleCard] = {}
 
     def get_pokemon_type_reference(self, name: str) -> T.Tuple[PokemonType, PokemonType]:
         """
@@ -112,32 +82,37 @@ class PokemonFactory(Component):
 
         TODO: read from gamemaster instead of loading a manual file
         """
-        type1 = self.type_reference[self.type_reference.name == name].type1.iloc[0].lower()
-        type2 = self.type_reference[self.type_reference.name == name].type2.iloc[0].lower()
-        if type2 == 'no type':
-            type2 = "none"  # feed into enum
-        return (PokemonType[type1], PokemonType[type2])
+        return self.type_reference[name]
 
     def get_move_type_reference(self, move: str) -> PokemonType:
         # TODO: fix this handling
         if move == 'none':
             return PokemonType.none
 
-        return PokemonType[
-            self.move_reference[self.move_reference.move == move].type.iloc[0].lower()
-        ]
+        return self.move_reference[move]
+
+    def get_prototype(self, moveset: str) -> BattleCard:
+        """
+        Get the prototype battle card for a moveset line, building it on first use.
+
+        Prototypes are never handed out. Every card this factory returns is a clone of one.
+        """
+        prototype = self.prototypes.get(moveset)
+        if prototype is None:
+            prototype = self.prototypes[moveset] = BattleCard.from_string(moveset)
+        return prototype
 
     def get_PVE_battle_card(self, pokemon_name):
         """
         Load the default battle card for a Pokemon
         """
-        return BattleCard.from_string(self.PVE_movesets[pokemon_name])
+        return self.get_prototype(self.PVE_movesets[pokemon_name]).clone()
 
     def get_default_battle_card(self, pokemon_name):
         """
         Load the default battle card for a Pokemon
         """
-        return BattleCard.from_string(self.default_movesets[pokemon_name])
+        return self.get_prototype(self.default_movesets[pokemon_name]).clone()
 
     def get_evolved_battle_card(self, evolved_form: BattleCard, battle_card: BattleCard):
         """
@@ -146,7 +121,7 @@ class PokemonFactory(Component):
         Takes the original battle card and checks for tm_flag and shiny being set.
         These properties will be persisted to the new card.
         """
-        evolved_card = BattleCard.from_string(self.default_movesets[evolved_form])
+        evolved_card = self.get_default_battle_card(evolved_form)
         if battle_card.shiny:
             evolved_card.make_shiny()
         if battle_card.tm_flag:
@@ -156,7 +131,7 @@ class PokemonFactory(Component):
         return evolved_card
 
     def get_nickname_by_pokemon_name(self, pokemon_name):
-        return self.nickname_map[self.nickname_map.name == pokemon_name].sanitized_name.iloc[0]
+        return self.nickname_map[pokemon_name]
 
     def create_pokemon_by_name(self, pokemon_name: str):
         """
@@ -216,16 +191,8 @@ class EvolutionManager(Component):
 
     XP_PER_TURN = 50.0
 
-    CONFIG_PATH = "data/evolutions_list.txt"
-
     def initialize(self):
-        with open(self.CONFIG_PATH, 'r') as evolution_list_file:
-            evolutions_raw = evolution_list_file.readlines()
-        self.evolution_config: T.Dict[str, EvolutionConfig] = defaultdict(lambda: None)
-        for line in evolutions_raw:
-            base, turns, evolved = line.split()
-            turns = int(turns)
-            self.evolution_config[base] = EvolutionConfig(evolved, turns)
+        self.evolution_config: T.Mapping[str, EvolutionConfig] = self.env.config.evolutions
 
     def get_evolution(self, pokemon_name: PokemonId):
         """
@@ -95,45 +95,15 @@ class ShopManager(Component):
     Advance the shop. Config for the shop is stored here.
     """
 
-    SHOP_TIERS_PATH = 'data/shop_tiers.txt'
-    SHOP_DISTRIBUTION_PATH = 'data/shop_distribution.txt'
-    SHOP_PROGRESSION_PATH = 'data/shop_progression.txt'
-
     def initialize(self):
         """
         Initialize shop manager and establish route
         """
-        # load shop info
-        with open(self.SHOP_TIERS_PATH, 'r') as shop_tiers_file:
-            shop_tiers_raw = shop_tiers_file.readlines()
-        self.pokemon_tier_lookup = {}
-        for line in shop_tiers_raw:
-            if not line:
-                continue
-            if line.startswith('#'):
-                continue
-            split = line.split()
-            tier = int(split[0].strip())
-            pokemon = split[1].strip()
-            self.pokemon_tier_lookup[pokemon] = tier
-
-        # load shop distribution
-        with open(self.SHOP_DISTRIBUTION_PATH, 'r') as shop_distribution_file:
-            shop_distribution_raw = shop_distribution_file.readlines()
-        self.shop_distribution = []
-        for line in shop_distribution_raw:
-            self.shop_distribution.append([int(x) for x in line.split()])
-
-        # load shop progression
-        with open(self.SHOP_PROGRESSION_PATH, 'r') as shop_progression_file:
-            shop_progression_raw = shop_progression_file.readlines()
-        self.shop_progression = []
-        for line in shop_progression_raw:
-            if not line:
-                continue
-            if line.startswith('#'):
-                continue
-            self.shop_progression.append([int(x) for x in line.split(',')])
+        # shop info is loaded with the game config
+        config = self.env.config
+        self.pokemon_tier_lookup: T.Mapping[str, int] = config.shop_tiers
+        self.shop_distribution: T.Sequence[T.Sequence[int]] = config.shop_distribution
+        self.shop_progression: T.Sequence[T.Sequence[int]] = config.shop_progression
 
         # load shop tier colors
         # TODO: make this configurable
@@ -0,0 +1,88 @@
+"""
+Check the lockstep batch simulator against the regular battle engine
+"""
+import itertools
+import unittest
+
+import numpy as np
+
+from engine.batch_battle import hits_to_ko
+from engine.batch_battle import simulate_batch
+from engine.batterulogico import battle
+from engine.models.battle import LogPolicy
+from engine.models.enums import PokemonType
+from engine.models.items import LifeOrb
+from engine.models.pokemon import BattleCard
+
+MOVESETS = [
+    "snorlax,LICK,BODY_SLAM,SUPER_POWER,14,5,5,5",
+    "venusaur,VINE_WHIP,SLUDGE_BOMB,SOLAR_BEAM,19,5,5,5",
+    "lapras,ICE_SHARD,SURF,SKULL_BASH,16,5,5,5",
+    # self debuffing charged moves
+    "pinsir,FURY_CUTTER,CLOSE_COMBAT,X_SCISSOR,17,5,5,5",
+    "raichu,VOLT_SWITCH,WILD_CHARGE,GRASS_KNOT,12,5,5,5",
+    # buffs and debuffs
+    "arcanine,SNARL,FLAMETHROWER,WILD_CHARGE,19,10,10,10",
+    "blastoise,BITE,HYDRO_PUMP,ICE_BEAM,20,5,6,5",
+]
+
+
+def make_card(moveset: str, tm_flag: bool = False) -> BattleCard:
+    card = BattleCard.from_string(moveset)
+    card.give_item(None)
+    card.tm_flag = tm_flag
+    return card
+
+
+class TestBatchBattle(unittest.TestCase):
+
+    def check_against_battle(self, bonus_types):
+        pairs = list(itertools.product(MOVESETS, repeat=2))
+        team1 = [make_card(a, tm_flag=i % 2 == 0) for i, (a, _) in enumerate(pairs)]
+        team2 = [make_card(b, tm_flag=i % 3 == 0) for i, (_, b) in enumerate(pairs)]
+        seeds = list(range(len(pairs)))
+
+        result = simulate_batch(team1, team2, bonus_types, seeds)
+        winners = {"team1": 1, "team2": 2, "tie": 0}
+        for idx, (card1, card2, seed) in enumerate(zip(team1, team2, seeds)):
+            expected = battle([card1], [card2], bonus_types, log_policy=LogPolicy.NONE, seed=seed)
+            self.assertEqual(
+                (
+                    int(result.winner[idx]),
+                    result.damage_dealt[idx].tolist(),
+                    result.damage_taken[idx].tolist(),
+                ),
+                (
+                    winners[expected["winner"]],
+                    expected["team1damagedealt"] + expected["team2damagedealt"],
+                    expected["team1damagetaken"] + expected["team2damagetaken"],
+                ),
+                f"{card1} vs {card2}",
+            )
+
+    def test_matches_battle(self):
+        self.check_against_battle([])
+
+    def test_matches_battle_with_weather(self):
+        self.check_against_battle([PokemonType.water, PokemonType.electric, PokemonType.bug])
+
+    def test_cards_are_not_modified(self):
+        card1, card2 = make_card(MOVESETS[0]), make_card(MOVESETS[1])
+        before = (card1.energy, card1._move_f_damage, card2.energy, card2._move_f_damage)
+        simulate_batch([card1], [card2], [PokemonType.normal], seeds=[0])
+        self.assertEqual((card1.energy, card1._move_f_damage, card2.energy, card2._move_f_damage), before)
+
+    def test_items_are_rejected(self):
+        card = make_card(MOVESETS[0])
+        card.give_item(LifeOrb(level=1))
+        with self.assertRaises(ValueError):
+            simulate_batch([card], [make_card(MOVESETS[1])])
+
+    def test_hits_to_ko(self):
+        hp = np.array([0.0, 10.0, 10.5, 9.999999, -3.0])
+        damage = np.array([3.0, 5.0, 5.0, 3.0, 2.0])
+        self.assertEqual(hits_to_ko(hp, damage).tolist(), [0, 2, 3, 4, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,11 +4,27 @@ Run some simulated battles
 What this module IS: unit tests for the battle component
 What this module IS NOT: unit tests for the battle logic
 """
+import pickle
 import unittest
+
+from engine import battle as battle_module
 from engine.battle import BattleManager
+from engine.battle import derive_battle_seed
+from engine.battle import get_battle_pool
+from engine.battle import restore_item_state
+from engine.battle import run_battle_job
+from engine.battle import run_battle_job_batch
+from engine.battle import run_battle_specs
+from engine.battle import shutdown_battle_pool
 
 from engine.env import Environment
+from engine.models.battle_spec import BattleJob
+from engine.models.battle_spec import BattleSpec
+from engine.models.items import FocusBand
+from engine.models.enums import PokemonType
+from engine.models.items import Leftovers
 from engine.models.player import Player
+from engine.models.pokemon import BattleCard
 from engine.player import PlayerManager
 
 
@@ -39,5 +55,71 @@ class TestBattleComponent(unittest.TestCase):
         import IPython; IPython.embed()
 
 
+class TestBattleJobs(unittest.TestCase):
+
+    @staticmethod
+    def make_job(seed: int, focus_band: FocusBand = None) -> BattleSpec:
+        team1 = [BattleCard.from_string("lapras,ICE_SHARD,SURF,SKULL_BASH,16,5,5,5")]
+        team2 = [BattleCard.from_string("venusaur,VINE_WHIP,SLUDGE_BOMB,SOLAR_BEAM,19,5,5,5")]
+        team1[0].give_item(focus_band or FocusBand(level=2))
+        team2[0].give_item(Leftovers(level=1))
+        return BattleSpec.from_job(BattleJob(team1, team2, [], [], [], seed=seed))
+
+    def test_derive_battle_seed(self):
+        p1, p2 = Player(name='p1'), Player(name='p2')
+        seed = derive_battle_seed(1, 3, p1, p2)
+        self.assertEqual(derive_battle_seed(1, 3, p1, p2), seed)
+        self.assertNotEqual(derive_battle_seed(2, 3, p1, p2), seed)
+        self.assertNotEqual(derive_battle_seed(1, 4, p1, p2), seed)
+        self.assertNotEqual(derive_battle_seed(1, 3, p2, p1), seed)
+
+    def test_seed_is_recorded(self):
+        res, _ = run_battle_job(self.make_job(7))
+        self.assertEqual(res["seed"], 7)
+
+    def test_item_state_round_trip(self):
+        live = FocusBand(level=2)
+        _, item_states = run_battle_job(self.make_job(0, live))
+        # the job ran on a rebuilt item, so the live item only changes once the state is restored
+        self.assertFalse(live.consumed)
+        restore_item_state(live, item_states[0][0])
+        self.assertTrue(live.consumed)
+
+    def test_batch_matches_single_jobs(self):
+        jobs = [self.make_job(seed) for seed in range(3)]
+        jobs.append(self.make_job(3)._replace(bonus_types=(PokemonType.ice.name,)))
+        single = [run_battle_job(pickle.loads(pickle.dumps(job))) for job in jobs]
+        batched = run_battle_job_batch([pickle.loads(pickle.dumps(job)) for job in jobs])
+        for (res1, items1), (res2, items2) in zip(single, batched):
+            self.assertEqual(items1, items2)
+            self.assertEqual(res1["render"], res2["render"])
+        self.assertEqual(run_battle_job_batch([]), [])
+
+    def test_process_pool_matches_serial(self):
+        jobs = [self.make_job(seed) for seed in range(5)]
+        serial = run_battle_job_batch(pickle.loads(pickle.dumps(jobs)))
+        pooled = run_battle_specs(jobs, max_workers=2)
+        self.assertEqual(len(pooled), len(serial))
+        for (res1, items1), (res2, items2) in zip(serial, pooled):
+            self.assertEqual(items1, items2)
+            self.assertEqual(res1["winner"], res2["winner"])
+            self.assertEqual(res1["render"], res2["render"])
+
+    def test_pool_is_reused(self):
+        pool = get_battle_pool(2)
+        run_battle_specs([self.make_job(seed) for seed in range(2)], max_workers=2)
+        self.assertIs(get_battle_pool(2), pool)
+        # resizing replaces the pool
+        self.assertIsNot(get_battle_pool(3), pool)
+        shutdown_battle_pool()
+
+    def test_small_turns_run_in_process(self):
+        shutdown_battle_pool()
+        jobs = [self.make_job(seed) for seed in range(3)]
+        run_battle_specs(jobs[:1], max_workers=2)
+        run_battle_specs(jobs, max_workers=2, min_parallel_jobs=4)
+        run_battle_specs(jobs, max_workers=1)
+        self.assertIsNone(battle_module._battle_pool)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,612 @@
+"""
+Unit tests for the batterulogico battle logic
+
+These construct battle cards directly instead of going through a game environment.
+"""
+import random
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from engine.batterulogico import AdvantageMatrix
+from engine.batterulogico import Battler
+from engine.batterulogico import BattlerState
+from engine.batterulogico import battle
+from engine.batterulogico import EventLogger
+from engine.batterulogico import HookExecutor
+from engine.batterulogico import INCREMENT
+from engine.batterulogico import LOOKAHEAD_SEED
+from engine.batterulogico import OutcomeCache
+from engine.batterulogico import RenderLogger
+from engine.batterulogico import analyze_type
+from engine.batterulogico import calculate_damage
+from engine.batterulogico import check_advantage
+from engine.batterulogico import count_idle_ticks
+from engine.batterulogico import forecast_attack
+from engine.batterulogico import get_weather
+from engine.batterulogico import hits_to_ko
+from engine.batterulogico import moves
+from engine.batterulogico import outcome_cache
+from engine.batterulogico import outcome_key
+from engine.batterulogico import remaining_hp_fraction
+from engine.batterulogico import resolve_priority
+from engine.batterulogico import simulate1v1
+from engine.batterulogico import turnstodie
+from engine.models.battle import LogPolicy
+from engine.models.combat_hooks import CombatHook
+from engine.models.enums import PokemonType
+from engine.models.items import CellBattery
+from engine.models.items import ChoiceSpecs
+from engine.models.items import ExpertBelt
+from engine.models.items import FocusBand
+from engine.models.items import LifeOrb
+from engine.models.items import LightClay
+from engine.models.items import Leftovers
+from engine.models.items import ShellBell
+from engine.models.pokemon import BattleCard
+
+
+def make_card(moveset: str, item=None) -> BattleCard:
+    card = BattleCard.from_string(moveset)
+    card.give_item(item)
+    return card
+
+
+SNORLAX = "snorlax,LICK,BODY_SLAM,SUPER_POWER,14,5,5,5"
+VENUSAUR = "venusaur,VINE_WHIP,SLUDGE_BOMB,SOLAR_BEAM,19,5,5,5"
+LAPRAS = "lapras,ICE_SHARD,SURF,SKULL_BASH,16,5,5,5"
+CHARIZARD = "charizard,FIRE_SPIN,BLAST_BURN,DRAGON_CLAW,19,5,5,5"
+
+
+class TestIdleTicks(unittest.TestCase):
+
+    def test_count_idle_ticks(self):
+        battler = Battler(make_card(LAPRAS), 0, 1, nickname="Test")
+        cts = battler.battlecard.atk_spd_timer_cts
+        # no energy, so only the fast move matters
+        self.assertEqual(count_idle_ticks(battler), cts // INCREMENT - 1)
+        battler.timer = cts - INCREMENT
+        self.assertEqual(count_idle_ticks(battler), 0)
+
+    def test_charged_cooldown_bounds_idle_ticks(self):
+        battler = Battler(make_card(LAPRAS), 0, 1, nickname="Test")
+        battler.timer = -500
+        # charged moves have a 500 cooldown, which only matters once there is energy for them
+        self.assertGreater(count_idle_ticks(battler), 9)
+        self.assertEqual(count_idle_ticks(battler, energy_on_tick=True), 9)
+        battler.energy = 100
+        self.assertEqual(count_idle_ticks(battler), 9)
+
+
+class TestBattler(unittest.TestCase):
+
+    def test_slots(self):
+        battler = Battler(make_card(LAPRAS), 0, 1, nickname="Test")
+        with self.assertRaises(AttributeError):
+            battler.not_a_field = 1
+
+    def test_flattened_moves(self):
+        battler = Battler(make_card(LAPRAS), 0, 1, nickname="Test")
+        self.assertEqual((battler.move_f, battler.move_ch, battler.move_tm), ("ICE_SHARD", "SURF", "SKULL_BASH"))
+        self.assertEqual(battler.cooldown[0], moves["ICE_SHARD"]["cooldown"])
+        self.assertEqual(battler.required_energy[1], moves["SURF"]["energy"])
+        self.assertEqual(battler.power[1], battler.battlecard._move_ch_damage)
+
+    def test_choice_specs_reloads_moves(self):
+        team1 = [Battler(make_card(LAPRAS, ChoiceSpecs(level=1)), 0, 1, nickname="Test")]
+        team2 = [Battler(make_card(SNORLAX), 0, 2, nickname="Test")]
+        executor = HookExecutor(team1, team2, [], [])
+        executor(CombatHook.PRE_BATTLE, team1[0], team2[0])
+        self.assertEqual(team1[0].move_f, "LOCK_ON")
+        self.assertEqual(team1[0].cooldown[0], moves["LOCK_ON"]["cooldown"])
+
+    def test_energy_written_back(self):
+        card = make_card(LAPRAS)
+        battler = Battler(card, 0, 1, nickname="Test")
+        battler.energy = 42
+        self.assertEqual(card.energy, 0)
+        battler.write_back()
+        self.assertEqual(card.energy, 42)
+
+
+class TestAdvantageMatrix(unittest.TestCase):
+
+    def test_matches_analyze_type(self):
+        with open("data/default_movesets.txt") as f:
+            movesets = [line.strip() for line in f if line.strip()]
+        rng = random.Random(0)
+        for _ in range(50):
+            team1 = [Battler(make_card(x), i, 1, nickname="Test") for i, x in enumerate(rng.sample(movesets, 3))]
+            team2 = [Battler(make_card(x), i, 2, nickname="Test") for i, x in enumerate(rng.sample(movesets, rng.randint(1, 3)))]
+            for battler in team1 + team2:
+                battler.tm_flag = rng.random() < 0.5
+            advantage = AdvantageMatrix(team1, team2)
+            for x in team1:
+                for y in team2:
+                    self.assertEqual(advantage(x, y), analyze_type(x, y))
+                    self.assertEqual(advantage(y, x), analyze_type(y, x))
+                    self.assertEqual(check_advantage(x, y, team1, advantage), check_advantage(x, y, team1))
+                    self.assertEqual(check_advantage(y, x, team2, advantage), check_advantage(y, x, team2))
+
+
+class TestSkipTicks(unittest.TestCase):
+
+    def make_battle(self, item1, item2):
+        team1 = [
+            Battler(make_card(SNORLAX, item1), 0, 1, nickname="Test"),
+            Battler(make_card(VENUSAUR, CellBattery(level=2)), 1, 1, nickname="Test"),
+        ]
+        team2 = [Battler(make_card(LAPRAS, item2), 0, 2, nickname="Test")]
+        executor = HookExecutor(team1, team2, [], [], logger=EventLogger(), render=RenderLogger())
+        return executor, team1[0], team2[0]
+
+    def check_skip_ticks(self, item_factory1, item_factory2, ticks=37):
+        executor, battler1, battler2 = self.make_battle(item_factory1(), item_factory2())
+        for _ in range(ticks):
+            executor(CombatHook.ON_TICK, battler1, battler2)
+        expected = (battler1.hp, battler1.energy, battler2.hp, battler2.energy)
+
+        executor, battler1, battler2 = self.make_battle(item_factory1(), item_factory2())
+        executor.skip_ticks(ticks, battler1, battler2)
+        self.assertEqual(
+            (battler1.hp, battler1.energy, battler2.hp, battler2.energy),
+            expected
+        )
+
+    def test_skip_ticks_matches_tick_loop(self):
+        self.check_skip_ticks(lambda: Leftovers(level=1), lambda: LifeOrb(level=3))
+        self.check_skip_ticks(lambda: CellBattery(level=3), lambda: None)
+
+    def test_subscribers(self):
+        executor, battler1, battler2 = self.make_battle(Leftovers(level=1), LifeOrb(level=3))
+        subscribers = executor.get_subscribers(CombatHook.ON_TICK, battler1, battler2)
+        # the cell battery holder is on the bench, so it does not count
+        self.assertEqual([type(item) for item in subscribers], [Leftovers, LifeOrb])
+        self.assertEqual(executor.get_subscribers(CombatHook.ON_FAST_MOVE, battler1, battler2), [])
+
+
+class TestHookDispatch(unittest.TestCase):
+
+    def test_combat_hooks(self):
+        self.assertEqual(Leftovers.combat_hooks(), frozenset([CombatHook.ON_TICK]))
+        self.assertEqual(LifeOrb.combat_hooks(), frozenset([CombatHook.PRE_BATTLE, CombatHook.ON_TICK]))
+        self.assertTrue(FocusBand(level=1).implements(CombatHook.POST_COMBAT))
+        self.assertFalse(FocusBand(level=1).implements(CombatHook.ON_TICK))
+
+    def test_dispatch_table(self):
+        team1 = [Battler(make_card(SNORLAX, LifeOrb(level=1)), 0, 1, nickname="Test")]
+        team2 = [Battler(make_card(LAPRAS, FocusBand(level=1)), 0, 2, nickname="Test")]
+        executor = HookExecutor(team1, team2, [], [])
+        table = executor.get_dispatch_table(team1[0], team2[0])
+        # hooks without subscribers do not get an entry at all
+        self.assertEqual(set(table), {CombatHook.PRE_BATTLE, CombatHook.ON_TICK, CombatHook.POST_COMBAT})
+        self.assertEqual(table[CombatHook.POST_COMBAT].items, [team2[0].battlecard.item])
+        self.assertIs(executor.get_dispatch_table(team1[0], team2[0]), table)
+
+        executor.refresh()
+        self.assertIsNot(executor.get_dispatch_table(team1[0], team2[0]), table)
+
+    def test_shell_bell_ignores_enemy_moves(self):
+        # the enemy's fast moves used to reach the shell bell and blow up on the move lookup
+        card = make_card(VENUSAUR, ShellBell(level=3))
+        result = battle([card], [make_card(SNORLAX)], [], seed=0)
+        self.assertEqual(result["end"], "knockout")
+        heals = [line for line in result["render"].split("\n") if "Shell Bell" in line]
+        self.assertTrue(heals)
+        self.assertTrue(all("p1a" in line for line in heals))
+
+
+class TestPriority(unittest.TestCase):
+
+    def make_battlers(self):
+        battler1 = Battler(make_card(SNORLAX), 0, 1, nickname="Test")
+        battler2 = Battler(make_card(LAPRAS), 0, 2, nickname="Test")
+        for battler in (battler1, battler2):
+            battler.timer = 2500
+        return battler1, battler2
+
+    @staticmethod
+    def snapshot(battler):
+        card = battler.battlecard
+        return (battler.hp, battler.timer, battler.am, battler.dm, card.energy, card.bonus_shield)
+
+    def test_no_threat(self):
+        battler1, battler2 = self.make_battlers()
+        self.assertEqual(resolve_priority(battler1, battler2), (True, True))
+
+    def test_charged_move_goes_first(self):
+        battler1, battler2 = self.make_battlers()
+        battler1.energy = 100
+        battler2.battlecard.bonus_shield = 0
+        # lapras survives a fast move but not a charged one, while its own fast move is lethal
+        battler1.hp = 1
+        battler2.hp = calculate_damage(battler1, battler1.move_f, battler2)[0] + 1
+        before = (self.snapshot(battler1), self.snapshot(battler2))
+
+        forecast = forecast_attack(battler1, battler2)
+        self.assertTrue(forecast.charged)
+        self.assertTrue(forecast.fatal)
+        self.assertFalse(forecast_attack(battler2, battler1).charged)
+        # the charged move lands first, so the fast move never happens
+        self.assertEqual(resolve_priority(battler1, battler2), (True, False))
+        self.assertEqual((self.snapshot(battler1), self.snapshot(battler2)), before)
+
+    def test_fast_moves_trade(self):
+        battler1, battler2 = self.make_battlers()
+        battler1.hp = battler2.hp = 1
+        self.assertEqual(resolve_priority(battler1, battler2), (True, True))
+
+
+class TestDamageMemo(unittest.TestCase):
+
+    def test_memo(self):
+        attacker = Battler(make_card(SNORLAX), 0, 1, nickname="Test")
+        defender = Battler(make_card(LAPRAS), 0, 2, nickname="Test")
+        move = attacker.move_ch
+        damage = calculate_damage(attacker, move, defender)
+        self.assertIs(calculate_damage(attacker, move, defender), damage)
+
+        # buff stages are part of the key
+        defender.dm = -2
+        self.assertGreater(calculate_damage(attacker, move, defender)[0], damage[0])
+        defender.dm = 0
+        self.assertEqual(calculate_damage(attacker, move, defender), damage)
+
+    def test_invalidate(self):
+        attacker = Battler(make_card(SNORLAX), 0, 1, nickname="Test")
+        defender = Battler(make_card(LAPRAS), 0, 2, nickname="Test")
+        move = attacker.move_ch
+        damage = calculate_damage(attacker, move, defender)
+        attacker.battlecard.multiplier = 1.0
+        # stale until the memo is dropped
+        self.assertEqual(calculate_damage(attacker, move, defender), damage)
+        attacker.invalidate_damage()
+        self.assertGreater(calculate_damage(attacker, move, defender)[0], damage[0])
+
+    def test_expert_belt_invalidates(self):
+        team1 = [Battler(make_card(SNORLAX, ExpertBelt(level=3)), 0, 1, nickname="Test")]
+        team2 = [Battler(make_card(LAPRAS), 0, 2, nickname="Test")]
+        attacker, defender = team1[0], team2[0]
+        executor = HookExecutor(team1, team2, [], [])
+        move = attacker.move_f
+        damage = calculate_damage(attacker, move, defender)
+        executor(CombatHook.ON_FAST_MOVE, attacker, defender, move=move, attacker=attacker, defender=defender)
+        self.assertGreater(calculate_damage(attacker, move, defender)[0], damage[0])
+
+
+def reference_turnstodie(me, them):
+    """
+    The loop based `turnstodie` the closed form replaces
+    """
+    myhp = me.hp
+    theirenergy = them.energy
+    theirmovef = them.move_f
+    theirdps = calculate_damage(them, theirmovef, me)[0] * moves[theirmovef]["cooldown"] / 500
+    if calculate_damage(them, them.move_ch, me)[0] > calculate_damage(them, them.move_tm, me)[0]:
+        whichcharged = them.move_ch
+    else:
+        whichcharged = them.move_tm
+    howmanytheircharged = 0
+    while theirenergy > moves[whichcharged]["energy"]:
+        howmanytheircharged += 1
+        theirenergy -= moves[whichcharged]["energy"]
+    myshields = me.battlecard.bonus_shield
+    while myshields > 0:
+        myshields -= 1
+    chargedincoming = max(0, howmanytheircharged - myshields)
+    turns = 0
+    while myhp > 0 and chargedincoming > 0:
+        myhp -= calculate_damage(them, whichcharged, me)[0]
+        chargedincoming -= 1
+        turns += 1
+    while myhp > 0:
+        myhp -= theirdps
+        turns += 1
+    return turns
+
+
+class TestTurnsToDie(unittest.TestCase):
+
+    def test_hits_to_ko(self):
+        self.assertEqual(hits_to_ko(10, 5), 2)
+        self.assertEqual(hits_to_ko(10.5, 5), 3)
+        self.assertEqual(hits_to_ko(0, 5), 0)
+        self.assertEqual(hits_to_ko(-1, 5), 0)
+        self.assertEqual(hits_to_ko(0.1 + 0.2, 0.3), 2)
+
+    def test_matches_loops(self):
+        with open("data/default_movesets.txt") as f:
+            movesets = [line.strip() for line in f if line.strip()]
+        rng = random.Random(0)
+        for _ in range(500):
+            me = Battler(make_card(rng.choice(movesets)), 0, 1, nickname="Test")
+            them = Battler(make_card(rng.choice(movesets)), 0, 2, nickname="Test")
+            me.hp = rng.choice([me.hp, rng.uniform(-5, me.hp), float(rng.randrange(1, 300))])
+            them.energy = rng.choice([0, 35, 50, 100, rng.randrange(0, 250), rng.uniform(0, 250)])
+            me.battlecard.bonus_shield = rng.randrange(0, 3)
+            me.dm, them.am = rng.randrange(-4, 5), rng.randrange(-4, 5)
+            self.assertEqual(turnstodie(me, them), reference_turnstodie(me, them))
+
+
+class TestLogPolicy(unittest.TestCase):
+
+    @staticmethod
+    def run_battle(log_policy):
+        team1 = [make_card(SNORLAX, Leftovers(level=1)), make_card(VENUSAUR)]
+        team2 = [make_card(LAPRAS, LifeOrb(level=2))]
+        return battle(team1, team2, [], log_policy=log_policy, seed=0)
+
+    def test_policies_do_not_change_results(self):
+        full = self.run_battle(LogPolicy.FULL)
+        self.assertTrue(full["events"])
+        self.assertIn("|-weather|deltastream", full["render"])
+        self.assertIn("item: Leftovers", full["render"])
+
+        for policy in LogPolicy:
+            res = self.run_battle(policy)
+            for key in ("winner", "team1damagedealt", "team1damagetaken", "team2damagedealt", "team2damagetaken"):
+                self.assertEqual(res[key], full[key])
+            if policy.events:
+                self.assertEqual(res["events"], full["events"])
+            else:
+                self.assertEqual(res["events"], [])
+            if policy.render:
+                self.assertEqual(res["render"], full["render"])
+            else:
+                self.assertEqual(res["render"], "")
+
+    def test_lazy_formatting(self):
+        logger = EventLogger()
+        logger.increment_timer(INCREMENT)
+        logger("Health", "{} has {:.0f} HP left", "snorlax", 12.6)
+        event, = logger.events
+        self.assertEqual((event.seq, event.timestamp, event.value), (0, INCREMENT, "snorlax has 13 HP left"))
+
+        disabled = EventLogger(enabled=False)
+        disabled("Health", "{} has {:.0f} HP left", "snorlax", 12.6)
+        self.assertFalse(disabled)
+        self.assertEqual(disabled.events, [])
+
+
+class TestSeededBattle(unittest.TestCase):
+
+    @staticmethod
+    def run_battle(seed):
+        team1 = [make_card("arcanine,SNARL,FLAMETHROWER,WILD_CHARGE,19,10,10,10", Leftovers(level=1))]
+        team2 = [make_card("blastoise,BITE,HYDRO_PUMP,ICE_BEAM,20,5,6,5")]
+        return battle(team1, team2, [], seed=seed)
+
+    def test_same_seed_replays_battle(self):
+        first = self.run_battle(1234)
+        self.assertEqual(first["seed"], 1234)
+        replay = self.run_battle(first["seed"])
+        self.assertEqual(replay["events"], first["events"])
+        self.assertEqual(replay["render"], first["render"])
+
+    def test_unseeded_battle_records_seed(self):
+        first = self.run_battle(None)
+        self.assertIsInstance(first["seed"], int)
+        self.assertEqual(self.run_battle(first["seed"])["render"], first["render"])
+
+    def test_rng_instance(self):
+        res = self.run_battle(random.Random(1234))
+        self.assertIsNone(res["seed"])
+        self.assertEqual(res["render"], self.run_battle(1234)["render"])
+
+    def test_global_random_state_is_untouched(self):
+        state = random.getstate()
+        self.run_battle(1234)
+        self.assertEqual(random.getstate(), state)
+
+
+class TestBattleLimits(unittest.TestCase):
+
+    def test_knockout(self):
+        res = battle([make_card(SNORLAX)], [make_card(LAPRAS)], [], seed=0)
+        self.assertEqual(res["end"], "knockout")
+        self.assertGreater(res["ticks"], 0)
+
+    def test_stalemate(self):
+        # splash barely scratches, and leftovers heals it right back
+        team1 = [make_card("magikarp,SPLASH,SPLASH,SPLASH,40,15,15,15", Leftovers(level=3))]
+        team2 = [make_card("magikarp,SPLASH,SPLASH,SPLASH,40,15,15,15", Leftovers(level=3))]
+        res = battle(team1, team2, [], seed=0, stalemate_ticks=200)
+        self.assertEqual(res["end"], "stalemate")
+        self.assertEqual(res["winner"], "tie")
+        self.assertLess(res["ticks"], 400)
+        self.assertEqual(res["events"][-1].category, "Timeout")
+
+    def test_tick_limit(self):
+        team1 = [make_card(SNORLAX)]
+        team2 = [make_card(LAPRAS)]
+        res = battle(team1, team2, [], seed=0, max_ticks=30)
+        self.assertEqual((res["end"], res["ticks"]), ("tick_limit", 30))
+        left1 = 1 - res["team1damagetaken"][0] / team1[0].hitpoints
+        left2 = 1 - res["team2damagetaken"][0] / team2[0].hitpoints
+        self.assertNotEqual(left1, left2)
+        self.assertEqual(res["winner"], "team1" if left1 > left2 else "team2")
+
+    def test_remaining_hp_fraction(self):
+        team = [Battler(make_card(SNORLAX), 0, 1, nickname="Test"), Battler(make_card(LAPRAS), 1, 1, nickname="Test")]
+        self.assertEqual(remaining_hp_fraction(team), 1.0)
+        team[0].hp = -5
+        expected = team[1].hp / (team[0].battlecard.hitpoints + team[1].battlecard.hitpoints)
+        self.assertAlmostEqual(remaining_hp_fraction(team), expected)
+
+
+class TestFastPath(unittest.TestCase):
+    """
+    Item-free battles skip hook dispatch, which must not change anything about the battle
+    """
+
+    def check_matches_general_path(self, team1, team2, bonus_types, seed):
+        fast = battle([make_card(x) for x in team1], [make_card(x) for x in team2], bonus_types, seed=seed)
+        general = battle(
+            [make_card(x) for x in team1],
+            [make_card(x) for x in team2],
+            bonus_types,
+            seed=seed,
+            fast_path=False,
+        )
+        self.assertEqual(
+            {key: value for key, value in fast.items() if key != "events"},
+            {key: value for key, value in general.items() if key != "events"},
+        )
+        self.assertEqual(
+            [(x.seq, x.timestamp, x.category, x.value) for x in fast["events"]],
+            [(x.seq, x.timestamp, x.category, x.value) for x in general["events"]],
+        )
+
+    def test_matches_general_path(self):
+        with open("data/default_movesets.txt") as f:
+            movesets = [line.strip() for line in f if line.strip()]
+        weathers = [[], [PokemonType.ice, PokemonType.steel], [PokemonType.water, PokemonType.electric, PokemonType.bug]]
+        rng = random.Random(0)
+        for seed in range(40):
+            team1 = rng.sample(movesets, rng.randint(1, 3))
+            team2 = rng.sample(movesets, rng.randint(1, 3))
+            self.check_matches_general_path(team1, team2, rng.choice(weathers), seed)
+
+
+class TestWeather(unittest.TestCase):
+
+    def test_weather(self):
+        weather = get_weather([PokemonType.water, PokemonType.ice])
+        self.assertEqual((weather.name, weather.render), ("Snowy", "hail"))
+        self.assertIs(get_weather([PokemonType.ice, PokemonType.water]), weather)
+        self.assertIs(get_weather(weather), weather)
+        self.assertEqual(get_weather([]).name, "Windy")
+
+
+class TestReentrancy(unittest.TestCase):
+
+    @staticmethod
+    def run_battle(seed):
+        team1 = [make_card(SNORLAX, Leftovers(level=seed % 3 + 1)), make_card(VENUSAUR, LifeOrb(level=1))]
+        team2 = [make_card(LAPRAS, FocusBand(level=seed % 3 + 1)), make_card(SNORLAX)]
+        res = battle(team1, team2, [], log_policy=LogPolicy.EVENTS_ONLY)
+        return [res[key] for key in ("winner", "team1damagedealt", "team2damagedealt")], res["events"]
+
+    def test_concurrent_battles(self):
+        expected = [self.run_battle(seed) for seed in range(6)]
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(self.run_battle, range(6)))
+        self.assertEqual(results, expected)
+
+
+class TestOutcomeCache(unittest.TestCase):
+
+    def setUp(self):
+        outcome_cache.clear()
+
+    def test_simulate1v1_is_memoized(self):
+        battler1 = Battler(make_card(SNORLAX), 0, 1, nickname="Test")
+        battler2 = Battler(make_card(VENUSAUR), 0, 2, nickname="Test")
+        expected = battle([battler1.battlecard], [battler2.battlecard], [], log_policy=LogPolicy.NONE)["winner"]
+        self.assertEqual(simulate1v1(battler1, battler2), expected)
+        self.assertEqual(simulate1v1(battler1, battler2), expected)
+        info = outcome_cache.info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+    def test_fingerprint(self):
+        battler1 = Battler(make_card(SNORLAX), 0, 1, nickname="Test")
+        battler2 = Battler(make_card(VENUSAUR), 0, 2, nickname="Test")
+        key = outcome_key(battler1, battler2)
+        # a copy of the same card in the same state is the same matchup
+        self.assertEqual(outcome_key(Battler(make_card(SNORLAX), 1, 1, nickname="Other"), battler2), key)
+        # small HP changes share a bucket, big ones do not
+        battler1.hp -= 1
+        self.assertEqual(outcome_key(battler1, battler2), key)
+        battler1.hp /= 2
+        self.assertNotEqual(outcome_key(battler1, battler2), key)
+        self.assertNotEqual(outcome_key(battler2, battler1), key)
+        self.assertNotEqual(outcome_key(battler1, battler2, [PokemonType.grass]), outcome_key(battler1, battler2))
+        battler2.battlecard.give_item(FocusBand(level=1))
+        self.assertNotEqual(outcome_key(battler1, battler2), key)
+        key = outcome_key(battler1, battler2)
+        battler1.am = 1
+        self.assertNotEqual(outcome_key(battler1, battler2), key)
+        battler1.am, battler1.dm = 0, -1
+        self.assertNotEqual(outcome_key(battler1, battler2), key)
+
+    @staticmethod
+    def live_battler(moveset: str, team: int, bonus_types=()) -> Battler:
+        """
+        A battler set up the way `battle` sets one up, weather included
+        """
+        card = make_card(moveset)
+        get_weather(bonus_types).apply(card)
+        return Battler(card, 0, team, nickname="Test")
+
+    def test_simulate1v1_applies_weather_once(self):
+        # rain and snow powers up lapras, and adding that twice would flip this matchup
+        bonus_types = [PokemonType.water, PokemonType.ice]
+        battler1 = self.live_battler(VENUSAUR, 1, bonus_types)
+        battler2 = self.live_battler(LAPRAS, 2, bonus_types)
+        expected = battle(
+            [make_card(VENUSAUR)], [make_card(LAPRAS)], bonus_types, log_policy=LogPolicy.NONE, seed=LOOKAHEAD_SEED
+        )["winner"]
+        self.assertEqual(simulate1v1(battler1, battler2, bonus_types), expected)
+
+    def test_simulate1v1_keeps_shields_and_buffs(self):
+        battler1 = self.live_battler(VENUSAUR, 1)
+        battler2 = self.live_battler(CHARIZARD, 2)
+        expected = battle(
+            [make_card(VENUSAUR)], [make_card(CHARIZARD)], [], log_policy=LogPolicy.NONE, seed=LOOKAHEAD_SEED
+        )["winner"]
+        self.assertEqual(simulate1v1(battler1, battler2), expected)
+        self.assertEqual(expected, "team2")
+
+        # charizard has used its shield
+        battler2.battlecard.bonus_shield = 0
+        self.assertEqual(simulate1v1(battler1, battler2), "team1")
+        battler2.battlecard.bonus_shield = 1
+        # venusaur's attack is boosted
+        battler1.am = 4
+        self.assertEqual(simulate1v1(battler1, battler2), "team1")
+        battler1.am = 0
+        # charizard's defense is lowered
+        battler2.dm = -4
+        self.assertEqual(simulate1v1(battler1, battler2), "team1")
+        # the live battlers are left as they were
+        self.assertEqual((battler1.am, battler2.dm, battler2.battlecard.bonus_shield), (0, -4, 1))
+
+    def test_lead_states_skip_pre_battle(self):
+        def categories(**kwargs):
+            res = battle([make_card(VENUSAUR)], [make_card(CHARIZARD, LightClay(level=1))], [], seed=0, **kwargs)
+            return [event.category for event in res["events"]]
+
+        self.assertIn("LightClay pre_battle", categories())
+        # picking up a battle that is under way must not hand out the shields again
+        states = (BattlerState(1, 0, 0), BattlerState(2, 0, 0))
+        self.assertNotIn("LightClay pre_battle", categories(lead_states=states))
+
+    def test_lookahead_leaves_live_state_alone(self):
+        battler1 = Battler(make_card(SNORLAX, LifeOrb(level=3)), 0, 1, nickname="Test")
+        battler2 = Battler(make_card(LAPRAS, FocusBand(level=3)), 0, 2, nickname="Test")
+        battler1.hp /= 3
+        before = (
+            list(battler1.battlecard.modifiers),
+            battler1.battlecard.health,
+            battler2.battlecard.item.consumed,
+        )
+        simulate1v1(battler1, battler2)
+        after = (
+            list(battler1.battlecard.modifiers),
+            battler1.battlecard.health,
+            battler2.battlecard.item.consumed,
+        )
+        self.assertEqual(after, before)
+
+    def test_lru_eviction(self):
+        cache = OutcomeCache(maxsize=2)
+        cache.put(1, "team1")
+        cache.put(2, "team2")
+        self.assertEqual(cache.get(1), "team1")
+        cache.put(3, "tie")
+        # 2 was used least recently
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.info(), (1, 1, 2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Round trip the live battle models through battle specs
+"""
+import pickle
+import unittest
+
+from engine.batterulogico import battle
+from engine.models.battle_spec import BattleJob
+from engine.models.battle_spec import BattleSpec
+from engine.models.battle_spec import CardSpec
+from engine.models.battle_spec import HeroSpec
+from engine.models.battle_spec import ItemSpec
+from engine.models.enums import PokemonId
+from engine.models.enums import PokemonType
+from engine.models.items import BlaineButton
+from engine.models.items import ChoiceSpecs
+from engine.models.items import FocusBand
+from engine.models.items import KogaNinja
+from engine.models.items import LargeAttackShard
+from engine.models.items import Leftovers
+from engine.models.items import RocketHeist
+from engine.models.pokemon import BattleCard
+
+
+def make_card(moveset: str, item=None, tm: bool = False, shiny: bool = False) -> BattleCard:
+    card = BattleCard.from_string(moveset)
+    card.give_item(item)
+    card.tm_flag = tm
+    if shiny:
+        card.make_shiny()
+    return card
+
+
+def make_job(seed: int) -> BattleJob:
+    team1 = [
+        make_card("lapras,ICE_SHARD,SURF,SKULL_BASH,16,5,5,5", FocusBand(level=2), tm=True),
+        make_card("snorlax,LICK,BODY_SLAM,SUPER_POWER,14,5,5,5", ChoiceSpecs(level=1), shiny=True),
+    ]
+    team2 = [
+        make_card("venusaur,VINE_WHIP,SLUDGE_BOMB,SOLAR_BEAM,19,5,5,5", Leftovers(level=3)),
+        make_card("arcanine,SNARL,FLAMETHROWER,WILD_CHARGE,19,10,10,10"),
+    ]
+    team2[1].modifiers[2] = 10
+    return BattleJob(team1, team2, [PokemonType.water, PokemonType.ice], [KogaNinja()], [], seed)
+
+
+class TestBattleSpec(unittest.TestCase):
+
+    def test_item_round_trip(self):
+        item = FocusBand(level=3, consumed=True)
+        spec = ItemSpec.from_item(item)
+        self.assertEqual(spec, ItemSpec("FocusBand", 3, True))
+        rebuilt = spec.to_item()
+        self.assertIsInstance(rebuilt, FocusBand)
+        self.assertEqual((rebuilt.level, rebuilt.consumed), (3, True))
+        self.assertEqual(ItemSpec.from_item(LargeAttackShard()).to_item().stat_contribution, LargeAttackShard().stat_contribution)
+        self.assertIsNone(ItemSpec.from_item(None))
+
+    def test_hero_round_trip(self):
+        blaine = BlaineButton(counter=12, bust=True, jackpot=False)
+        heist = RocketHeist(success=True, used=True, stolen_poke=PokemonId.pikachu)
+        for power in (blaine, heist):
+            rebuilt = pickle.loads(pickle.dumps(HeroSpec.from_power(power))).to_power()
+            self.assertIsInstance(rebuilt, type(power))
+            self.assertEqual(rebuilt.dict(exclude={"id"}), power.dict(exclude={"id"}))
+        self.assertEqual(HeroSpec.from_power(blaine).to_power().counter, 12)
+        self.assertEqual(HeroSpec.from_power(heist).to_power().stolen_poke, PokemonId.pikachu)
+
+    def test_card_round_trip(self):
+        for card in make_job(0).team1_cards + make_job(0).team2_cards:
+            spec = CardSpec.from_card(card)
+            rebuilt = spec.to_card()
+            self.assertEqual(CardSpec.from_card(rebuilt), spec)
+            self.assertEqual(rebuilt.dict(), card.dict())
+            self.assertEqual(rebuilt.max_health, card.max_health)
+            self.assertEqual(rebuilt.atk_spd_timer_cts, card.atk_spd_timer_cts)
+
+    def test_tm_less_card(self):
+        card = make_card("pidgey,TACKLE,TWISTER,AERIAL_ACE,5,5,5,5")
+        card.move_tm = None
+        self.assertIsNone(CardSpec.from_card(card).to_card().move_tm)
+
+    def test_spec_is_plain_data(self):
+        spec = BattleSpec.from_job(make_job(3))
+        self.assertEqual(pickle.loads(pickle.dumps(spec)), spec)
+        self.assertEqual([x.kind for x in spec.team1_hero], ["KogaNinja"])
+        self.assertEqual(spec.bonus_types, ("water", "ice"))
+        self.assertEqual(BattleSpec.from_job(spec.to_job()), spec)
+
+    def test_battles_match(self):
+        for seed in range(5):
+            job = make_job(seed)
+            spec = BattleSpec.from_job(job)
+            rebuilt = pickle.loads(pickle.dumps(spec)).to_job()
+            results = [
+                battle(
+                    x.team1_cards,
+                    x.team2_cards,
+                    x.bonus_types,
+                    team1_hero=x.team1_hero,
+                    team2_hero=x.team2_hero,
+                    seed=x.seed,
+                )
+                for x in (job, rebuilt)
+            ]
+            self.assertEqual(results[0]["render"], results[1]["render"])
+            self.assertEqual(results[0]["team1damagedealt"], results[1]["team1damagedealt"])
+            self.assertEqual(
+                [card.item.consumed for card in job.team1_cards],
+                [card.item.consumed for card in rebuilt.team1_cards],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Tests for the battle benchmark scenarios and baselines
+"""
+import os
+import tempfile
+import unittest
+
+from engine.batterulogico import WEATHER_NAMES
+from engine.batterulogico import battle
+from engine.models.battle import LogPolicy
+from engine.models.items import CombinedItem
+from engine.models.items import FocusBand
+from engine.utils.benchmark_battle import BATTLES
+from engine.utils.benchmark_battle import TICKS_PATH
+from engine.utils.benchmark_battle import ScenarioBuilder
+from engine.utils.benchmark_battle import ScenarioResult
+from engine.utils.benchmark_battle import build_scenarios
+from engine.utils.benchmark_battle import compare
+from engine.utils.benchmark_battle import compare_ticks
+from engine.utils.benchmark_battle import format_pool_results
+from engine.utils.benchmark_battle import load_baseline
+from engine.utils.benchmark_battle import load_ticks
+from engine.utils.benchmark_battle import run_pool_comparison
+from engine.utils.benchmark_battle import run_scenario
+from engine.utils.benchmark_battle import save_baseline
+from engine.utils.benchmark_battle import save_ticks
+from engine.utils.benchmark_battle import subclasses
+
+
+class TestBenchmarkBattle(unittest.TestCase):
+
+    def test_scenarios(self):
+        names = [scenario.name for scenario in build_scenarios(battles=1)]
+        self.assertEqual(len(names), len(set(names)))
+        for name in ('1v1', '3v3', 'fast_movers', 'slow_movers', 'weather_Windy'):
+            self.assertIn(name, names)
+        for cls in subclasses(CombinedItem):
+            self.assertIn(f'item_{cls.__name__}', names)
+        for _, weather, _ in WEATHER_NAMES:
+            self.assertIn(f"weather_{weather.replace(' ', '_')}", names)
+        # hero power hooks never run in battle, so there is nothing to time yet
+        self.assertFalse([name for name in names if name.startswith('hero_')])
+
+    def test_ticks_match_battles(self):
+        scenario = ScenarioBuilder(battles=3).scenario('focus_band', 2, item=FocusBand)
+        result = run_scenario(scenario, rounds=2)
+        ticks = 0
+        for spec in scenario.specs:
+            job = spec.to_job()
+            ticks += battle(job.team1_cards, job.team2_cards, job.bonus_types, log_policy=LogPolicy.NONE, seed=job.seed)['ticks']
+        self.assertEqual((result.battles, result.ticks), (3, ticks))
+        self.assertGreater(result.ticks_per_sec, 0)
+
+    def test_compare(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'baseline.json')
+            save_baseline([ScenarioResult('3v3', 10, 1000, 0.1)], LogPolicy.NONE, path)
+            baseline = load_baseline(path)
+        self.assertEqual(baseline['results']['3v3']['ticks_per_sec'], 10000)
+
+        self.assertEqual(compare([ScenarioResult('3v3', 10, 1000, 0.12)], baseline), [])
+        self.assertEqual(compare([ScenarioResult('1v1', 10, 1000, 1.0)], baseline), [])
+        slower = compare([ScenarioResult('3v3', 10, 1000, 0.2)], baseline)
+        self.assertEqual(len(slower), 1)
+        self.assertIn('ticks/s', slower[0])
+
+    def test_compare_ticks(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'ticks.json')
+            save_ticks([ScenarioResult('3v3', 10, 1000, 0.1)], path)
+            ticks = load_ticks(path)
+        self.assertEqual(ticks['results'], {'3v3': {'battles': 10, 'ticks': 1000}})
+
+        # timings never matter here
+        self.assertEqual(compare_ticks([ScenarioResult('3v3', 10, 1000, 5.0)], ticks), [])
+        self.assertEqual(compare_ticks([ScenarioResult('3v3', 5, 400, 0.1)], ticks), [])
+        changed = compare_ticks([ScenarioResult('3v3', 10, 1001, 0.1)], ticks)
+        self.assertEqual(len(changed), 1)
+        self.assertIn('1001 ticks', changed[0])
+
+    def test_recorded_ticks(self):
+        # the checked in tick counts are for the default number of battles
+        ticks = load_ticks(TICKS_PATH)
+        names = {scenario.name for scenario in build_scenarios(battles=1)}
+        self.assertEqual(set(ticks['results']), names)
+        self.assertEqual({x['battles'] for x in ticks['results'].values()}, {BATTLES})
+
+    def test_pool_comparison(self):
+        results = run_pool_comparison(counts=(1, 3), workers=2, rounds=1)
+        self.assertEqual([(x.jobs, x.workers) for x in results], [(1, 2), (3, 2)])
+        self.assertTrue(all(x.serial > 0 and x.pooled > 0 for x in results))
+        self.assertEqual(len(format_pool_results(results).splitlines()), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Check the shared game config
+"""
+import os
+import tempfile
+import unittest
+
+from engine.env import Environment
+from engine.game_config import ConfigPaths
+from engine.game_config import GameConfig
+from engine.game_config import get_game_config
+from engine.game_config import reload_game_config
+from engine.models.enums import Move
+from engine.models.enums import PokemonId
+
+
+class TestGameConfig(unittest.TestCase):
+
+    def test_default_config_is_valid(self):
+        config = get_game_config()
+        self.assertEqual(config.problems(), [])
+        self.assertIs(config.validate(), config)
+
+    def test_parsed_values(self):
+        config = get_game_config()
+        self.assertEqual(config.stages[1].stage, 1)
+        self.assertEqual(config.shop_tiers['pikachu'], 1)
+        self.assertEqual(config.tm_movesets[PokemonId.charizard], Move[config.default_movesets['charizard'].split(',')[3]])
+        self.assertIsNone(config.tm_movesets.get(PokemonId.mewtwo_armored))
+        self.assertEqual(config.evolutions['bulbasaur'].evolved_form, 'ivysaur')
+        for creep_round in config.creep_rounds.values():
+            self.assertEqual(len(creep_round.pokemon), 6)
+
+    def test_read_only(self):
+        config = get_game_config()
+        with self.assertRaises(TypeError):
+            config.shop_tiers['mew'] = 1
+        with self.assertRaises(TypeError):
+            config.evolutions['mew'] = None
+        with self.assertRaises(AttributeError):
+            config.stages = {}
+
+    def test_shared_by_environments(self):
+        env1 = Environment.create_webless_game(2)
+        env2 = Environment.create_webless_game(2)
+        self.assertIs(env1.config, env2.config)
+        env1.initialize()
+        env2.initialize()
+        self.assertIs(env1.shop_manager.pokemon_tier_lookup, env2.shop_manager.pokemon_tier_lookup)
+        self.assertIs(env1.pokemon_factory.default_movesets, env2.pokemon_factory.default_movesets)
+
+    def test_reload(self):
+        before = get_game_config()
+        env = Environment.create_webless_game(2)
+        reloaded = reload_game_config(validate=True)
+        self.assertIsNot(reloaded, before)
+        self.assertIs(get_game_config(), reloaded)
+        self.assertIs(env.config, before)
+        self.assertIs(Environment.create_webless_game(2).config, reloaded)
+        self.assertEqual(reloaded, before)
+
+    def test_validate_rejects_unknown_pokemon(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            shop_tiers = os.path.join(tmpdir, 'shop_tiers.txt')
+            with open(shop_tiers, 'w') as shop_tiers_file:
+                shop_tiers_file.write('1 pikachu\n1 missingno\n')
+            paths = ConfigPaths()._replace(shop_tiers=shop_tiers)
+            problems = GameConfig.load(paths).problems()
+            current = get_game_config()
+            with self.assertRaises(ValueError):
+                reload_game_config(paths, validate=True)
+        self.assertIs(get_game_config(), current)
+        self.assertIn('shop Pokemon missingno has no default moveset', problems)
+
+
+if __name__ == "__main__":
+    unittest.main()
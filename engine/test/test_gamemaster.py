@@ -0,0 +1,118 @@
+"""
+Check the gamemaster indexes against the raw gamemaster lists
+"""
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from engine import batterulogico
+from engine.models.enums import Move, PokemonId
+from engine.utils.gamemaster import CACHE_VERSION
+from engine.utils.gamemaster import DEFAULT_PATH
+from engine.utils.gamemaster import GameMaster
+from engine.utils.gamemaster import compact_gamemaster
+from engine.utils.gamemaster import file_digest
+from engine.utils.gamemaster import gamemaster
+from engine.utils.gamemaster import load_gamemaster
+
+
+class TestGameMaster(unittest.TestCase):
+
+    def test_pokemon_index(self):
+        for spec in gamemaster.gamemaster_dict['pokemon']:
+            self.assertIs(gamemaster.get_default_pokemon_stats(PokemonId[spec['speciesId']]), spec)
+        self.assertEqual(gamemaster.get_nickname(PokemonId.mr_mime), 'Mr. Mime')
+
+    def test_move_index(self):
+        for spec in gamemaster.gamemaster_dict['moves']:
+            self.assertIs(gamemaster.get_default_move_stats(Move[spec['moveId']]), spec)
+            self.assertIs(gamemaster.moves[spec['moveId']], spec)
+        self.assertIsNone(gamemaster.get_default_move_stats(None))
+
+    def test_cpm(self):
+        self.assertEqual(gamemaster.get_lvl_cpm(1), gamemaster.gamemaster_dict['cpms'][0])
+        self.assertEqual(gamemaster.get_lvl_cpm(10.5), gamemaster.gamemaster_dict['cpms'][19])
+
+    def test_shared_with_battle_engine(self):
+        self.assertIs(batterulogico.moves, gamemaster.moves)
+        self.assertIs(batterulogico.types, gamemaster.types)
+
+    def test_attribute_access(self):
+        self.assertEqual(gamemaster.cpms, gamemaster.gamemaster_dict['cpms'])
+        self.assertEqual(gamemaster.settings.maxBuffStages, gamemaster.gamemaster_dict['settings']['maxBuffStages'])
+        with self.assertRaises(AttributeError):
+            GameMaster.__new__(GameMaster).gamemaster_dict
+
+
+class TestGameMasterCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'gamemaster.json')
+        self.cache_path = os.path.join(self.tmpdir.name, 'cache', 'gamemaster.pkl')
+        shutil.copy(DEFAULT_PATH, self.path)
+        with open(DEFAULT_PATH, 'r') as gamemaster_json:
+            self.full = json.load(gamemaster_json)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_cache(self):
+        with open(self.cache_path, 'rb') as cache_file:
+            return pickle.load(cache_file)
+
+    def test_compact(self):
+        data = compact_gamemaster(self.full)
+        self.assertEqual(data['moves'], self.full['moves'])
+        self.assertEqual(data['types'], self.full['types'])
+        self.assertEqual(data['cpms'], self.full['cpms'])
+        snorlax = next(spec for spec in self.full['pokemon'] if spec['speciesId'] == 'snorlax')
+        compact = next(spec for spec in data['pokemon'] if spec['speciesId'] == 'snorlax')
+        self.assertEqual(compact['baseStats'], snorlax['baseStats'])
+        self.assertEqual(compact['types'], snorlax['types'])
+        self.assertNotIn('fastMoves', compact)
+
+    def test_cache_built_and_reused(self):
+        data = load_gamemaster(self.path, self.cache_path)
+        cache = self.read_cache()
+        self.assertEqual((cache['version'], cache['digest']), (CACHE_VERSION, file_digest(self.path)))
+        self.assertEqual(cache['data'], data)
+        # a cached load does not touch the JSON beyond hashing it
+        cache['data']['cpms'] = [1.0]
+        with open(self.cache_path, 'wb') as cache_file:
+            pickle.dump(cache, cache_file)
+        self.assertEqual(load_gamemaster(self.path, self.cache_path)['cpms'], [1.0])
+
+    def test_source_change_rebuilds(self):
+        load_gamemaster(self.path, self.cache_path)
+        self.full['cpms'][0] = 0.5
+        with open(self.path, 'w') as gamemaster_json:
+            json.dump(self.full, gamemaster_json)
+        self.assertEqual(load_gamemaster(self.path, self.cache_path)['cpms'][0], 0.5)
+        self.assertEqual(self.read_cache()['digest'], file_digest(self.path))
+
+    def test_bad_cache_falls_back(self):
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, 'wb') as cache_file:
+            cache_file.write(b'not a pickle')
+        self.assertEqual(load_gamemaster(self.path, self.cache_path), compact_gamemaster(self.full))
+        with open(self.cache_path, 'wb') as cache_file:
+            pickle.dump({'version': CACHE_VERSION - 1, 'digest': file_digest(self.path), 'data': {}}, cache_file)
+        self.assertEqual(load_gamemaster(self.path, self.cache_path), compact_gamemaster(self.full))
+        self.assertEqual(self.read_cache()['version'], CACHE_VERSION)
+
+    def test_matches_uncached(self):
+        # the first load builds the cache, the second one reads it
+        GameMaster(self.path, self.cache_path)
+        cached = GameMaster(self.path, self.cache_path)
+        uncached = GameMaster(self.path, cache_path=None)
+        self.assertEqual(cached.gamemaster_dict, uncached.gamemaster_dict)
+        self.assertEqual(cached.pokemon_spec, uncached.pokemon_spec)
+        self.assertEqual(cached.move_spec, uncached.move_spec)
+
+
+if __name__ == "__main__":
+    unittest.main()
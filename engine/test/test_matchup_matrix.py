@@ -0,0 +1,75 @@
+"""
+Tests for the cached round-robin matchup matrix
+"""
+import os
+import tempfile
+import unittest
+
+from engine.batterulogico import battle
+from engine.models.battle import LogPolicy
+from engine.utils.matchup_matrix import MOVESETS_PATH
+from engine.utils.matchup_matrix import base_key
+from engine.utils.matchup_matrix import build_cards
+from engine.utils.matchup_matrix import cell_key
+from engine.utils.matchup_matrix import cell_seed
+from engine.utils.matchup_matrix import load_movesets
+from engine.utils.matchup_matrix import matchup_matrix
+
+NAMES = ['charizard', 'blastoise', 'venusaur', 'pinsir']
+
+
+class TestMatchupMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmpdir.name, 'cache.json')
+        self.movesets_path = os.path.join(self.tmpdir.name, 'movesets.txt')
+        with open(MOVESETS_PATH, 'r') as src, open(self.movesets_path, 'w') as dst:
+            dst.write(src.read())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def build(self):
+        # small shards so the process pool gets used
+        return matchup_matrix(NAMES, self.movesets_path, cache_path=self.cache_path, shard_size=5)
+
+    def test_matches_battle(self):
+        matrix = self.build()
+        self.assertEqual(matrix.recomputed, len(NAMES) ** 2)
+        movesets = load_movesets(self.movesets_path)
+        cards = build_cards(movesets, NAMES)
+        base = base_key()
+        winners = {'team1': 1, 'team2': 2, 'tie': 0}
+        for i, row in enumerate(NAMES):
+            for j, col in enumerate(NAMES):
+                seed = cell_seed(cell_key(base, movesets[row], movesets[col]))
+                res = battle([cards[row]], [cards[col]], [], log_policy=LogPolicy.NONE, seed=seed)
+                self.assertEqual(matrix.winner[i, j], winners[res['winner']])
+                self.assertEqual(matrix.damage_dealt[i, j].tolist(), res['team1damagedealt'] + res['team2damagedealt'])
+                self.assertEqual(matrix.damage_taken[i, j].tolist(), res['team1damagetaken'] + res['team2damagetaken'])
+
+    def test_only_changed_cells_recompute(self):
+        first = self.build()
+        cached = self.build()
+        self.assertEqual(cached.recomputed, 0)
+        self.assertEqual(cached.winner.tolist(), first.winner.tolist())
+
+        # changing one moveset invalidates its row and column
+        with open(self.movesets_path, 'r') as f:
+            lines = f.read().replace('pinsir,FURY_CUTTER,', 'pinsir,BUG_BITE,')
+        with open(self.movesets_path, 'w') as f:
+            f.write(lines)
+        self.assertEqual(self.build().recomputed, 2 * len(NAMES) - 1)
+
+    def test_csv(self):
+        path = os.path.join(self.tmpdir.name, 'results.csv')
+        self.build().write_csv(path)
+        with open(path, 'r') as f:
+            rows = f.read().splitlines()
+        self.assertEqual(rows[0], ',' + ','.join(NAMES))
+        self.assertEqual(len(rows), len(NAMES) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Check the Pokemon factory reference lookups
+"""
+import csv
+import unittest
+
+from engine.env import Environment
+from engine.game_config import ConfigPaths
+from engine.game_config import read_csv_column
+from engine.game_config import reference_type
+from engine.models.enums import PokemonId
+from engine.models.enums import PokemonType
+from engine.models.pokemon import BattleCard
+from engine.models.pokemon import Pokemon
+from engine.pokemon import PokemonFactory
+
+
+class TestPokemonFactory(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.env = Environment.create_webless_game(2)
+        self.env.initialize()
+        self.factory: PokemonFactory = self.env.pokemon_factory
+
+    def test_reference_type(self):
+        self.assertEqual(reference_type('Fire'), PokemonType.fire)
+        self.assertEqual(reference_type('No Type'), PokemonType.none)
+
+    def test_read_csv_column(self):
+        names = read_csv_column(ConfigPaths().nicknames, 'name', 'sanitized_name')
+        self.assertEqual(names['charizard'], 'Charizard')
+        self.assertEqual(names['mr_mime'], 'Mr. Mime')
+
+    def test_lookups_match_csvs(self):
+        with open(ConfigPaths().pokemon_types, 'r', newline='') as csv_file:
+            for row in csv.DictReader(csv_file):
+                self.assertEqual(
+                    self.factory.get_pokemon_type_reference(row['name']),
+                    (reference_type(row['type1']), reference_type(row['type2'])),
+                )
+        self.assertEqual(self.factory.get_pokemon_type_reference('venusaur'), (PokemonType.grass, PokemonType.poison))
+        self.assertEqual(self.factory.get_pokemon_type_reference('blastoise'), (PokemonType.water, PokemonType.none))
+        self.assertEqual(self.factory.get_move_type_reference('HEX'), PokemonType.ghost)
+        self.assertEqual(self.factory.get_move_type_reference('none'), PokemonType.none)
+        self.assertEqual(self.factory.get_nickname_by_pokemon_name('charizard'), 'Charizard')
+
+    def test_create_pokemon(self):
+        pokemon = self.factory.create_pokemon_by_name('charizard')
+        self.assertEqual(pokemon.name, PokemonId.charizard)
+        self.assertEqual(pokemon.nickname, 'Charizard')
+        card = pokemon.battle_card
+        self.assertEqual((card.poke_type1, card.poke_type2), (PokemonType.fire, PokemonType.flying))
+        self.assertEqual(card._f_move_type, self.factory.get_move_type_reference(card.move_f.name))
+
+    def test_clone(self):
+        card = BattleCard.from_string("lapras,ICE_SHARD,SURF,SKULL_BASH,16,5,5,5")
+        clone = card.clone()
+        self.assertEqual(clone.dict(), card.dict())
+        self.assertEqual(
+            [getattr(clone, x) for x in BattleCard.__private_attributes__ if x not in ('_id', '_item')],
+            [getattr(card, x) for x in BattleCard.__private_attributes__ if x not in ('_id', '_item')],
+        )
+        self.assertNotEqual(hash(clone), hash(card))
+        clone.modifiers[0] = 5
+        self.assertEqual(card.modifiers[0], 0)
+
+    def test_cards_match_from_string(self):
+        for movesets, get_card in (
+            (self.factory.default_movesets, self.factory.get_default_battle_card),
+            (self.factory.PVE_movesets, self.factory.get_PVE_battle_card),
+        ):
+            for name, moveset in movesets.items():
+                card = get_card(name)
+                expected = BattleCard.from_string(moveset)
+                self.assertEqual(card.dict(), expected.dict())
+                self.assertEqual(card.max_health, expected.max_health)
+                self.assertEqual(card._move_ch_damage, expected._move_ch_damage)
+                self.assertIsNot(card, self.factory.prototypes[moveset])
+
+    def test_created_pokemon_are_independent(self):
+        first = self.factory.create_PVEpokemon_by_name('pidgey')
+        second = self.factory.create_PVEpokemon_by_name('pidgey')
+        self.assertNotEqual(first.id, second.id)
+        self.assertNotEqual(hash(first.battle_card), hash(second.battle_card))
+        first.battle_card.make_shiny()
+        first.battle_card.modifiers[0] = 3
+        self.assertFalse(second.battle_card.shiny)
+        self.assertEqual(second.battle_card.modifiers[0], 0)
+        self.assertEqual(second.battle_card.bonus_shield, -1)
+
+    def test_creep_rounds(self):
+        creep_round_manager = self.env.creep_round_manager
+        for round_num, creep_round in self.env.config.creep_rounds.items():
+            self.assertEqual(creep_round_manager.creep_round_pokemon[round_num], list(creep_round.pokemon))
+        round_num = min(self.env.config.creep_rounds)
+        self.env.state.turn_number = round_num
+        creep_player = creep_round_manager.create_creep_player()
+        party = [Pokemon.get_by_id(x).name.name for x in creep_player.party_config.party if x is not None]
+        self.assertEqual(sorted(party), sorted(self.env.config.creep_rounds[round_num].pokemon))
+
+
+if __name__ == "__main__":
+    unittest.main()
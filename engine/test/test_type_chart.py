@@ -0,0 +1,192 @@
+"""
+Check the dense type chart against the gamemaster type lists
+"""
+import io
+import itertools
+import random
+import unittest
+from contextlib import redirect_stdout
+
+from engine.batterulogico import Battler
+from engine.batterulogico import analyze_type
+from engine.batterulogico import battle
+from engine.batterulogico import calculate_damage
+from engine.models.enums import PokemonType
+from engine.models.pokemon import BattleCard
+from engine.utils.gamemaster import gamemaster
+from engine.utils.type_chart import as_pokemon_type
+from engine.utils.type_chart import type_profile
+from engine.utils.type_chart import TYPE_CHART
+
+MOVESETS = [
+    "lapras,ICE_SHARD,SURF,SKULL_BASH,16,5,5,5",
+    "venusaur,VINE_WHIP,SLUDGE_BOMB,SOLAR_BEAM,19,5,5,5",
+    "charizard,FIRE_SPIN,BLAST_BURN,DRAGON_CLAW,19,5,5,5",
+    "gengar,SHADOW_CLAW,SHADOW_BALL,SLUDGE_BOMB,19,5,5,5",
+    "pidgey,QUICK_ATTACK,TWISTER,AERIAL_ACE,5,5,5,5",
+    "golem,ROCK_THROW,STONE_EDGE,EARTHQUAKE,19,5,5,5",
+]
+
+
+def list_walk_multiplier(move_type, attacker_types, defender_types):
+    """
+    The list walk in calculate_damage that the chart replaces, comparing types as given
+    """
+    types = gamemaster.gamemaster_dict['types']
+    resistances, weaknesses, immunities = [], [], []
+    for x in set(defender_types):
+        resistances += types[x.name]["resistances"]
+        weaknesses += types[x.name]["weaknesses"]
+        immunities += types[x.name]["immunities"]
+
+    multiplier = 1
+    for x in set(attacker_types):
+        if move_type == x:
+            multiplier *= 1.2
+    for x in resistances:
+        if move_type == x:
+            multiplier *= 0.625
+    for x in weaknesses:
+        if move_type == x:
+            multiplier *= 1.6
+    for x in immunities:
+        if move_type == x:
+            multiplier *= 0.390625
+    return multiplier
+
+
+def list_walk_advantage(attacker_moves, defender_types):
+    """
+    The list walk in analyze_type that the chart replaces, for one side
+    """
+    types = gamemaster.gamemaster_dict['types']
+    resistances, weaknesses, immunities = [], [], []
+    for x in set(defender_types):
+        resistances += types[x.name]["resistances"]
+        weaknesses += types[x.name]["weaknesses"]
+        immunities += types[x.name]["immunities"]
+
+    balance = 0
+    for x in attacker_moves:
+        if x in weaknesses:
+            balance += 1
+        if x in resistances:
+            balance -= 1
+        if x in immunities:
+            balance -= 2
+    return balance
+
+
+def make_card(moveset: str, enum_moves: bool, tm: bool = False) -> BattleCard:
+    """
+    Cards are built with gamemaster type names for their moves. PokemonFactory types them
+    with PokemonType instead, so `enum_moves` does the same.
+    """
+    card = BattleCard.from_string(moveset)
+    card.tm_flag = tm
+    card.give_item(None)
+    if enum_moves:
+        card._f_move_type = as_pokemon_type(card._f_move_type)
+        card._ch_move_type = as_pokemon_type(card._ch_move_type)
+        card._tm_move_type = as_pokemon_type(card._tm_move_type)
+    return card
+
+
+def make_battler(moveset: str, enum_moves: bool, tm: bool, index: int = 0) -> Battler:
+    return Battler(make_card(moveset, enum_moves, tm), index, 1, None)
+
+
+def move_slots(battler: Battler):
+    """
+    Move names and the names of their types
+    """
+    card = battler.battlecard
+    return [
+        (card.move_f.name, as_pokemon_type(card._f_move_type).name),
+        (card.move_ch.name, as_pokemon_type(card._ch_move_type).name),
+        (card.move_tm.name, as_pokemon_type(card._tm_move_type).name),
+    ]
+
+
+def type_names(battler: Battler):
+    return tuple(as_pokemon_type(x).name for x in (battler.battlecard.poke_type1, battler.battlecard.poke_type2))
+
+
+class TestTypeChart(unittest.TestCase):
+
+    def test_single_type_chart(self):
+        self.assertEqual(TYPE_CHART[PokemonType.water.value][PokemonType.fire.value], 1.6)
+        self.assertEqual(TYPE_CHART[PokemonType.fire.value][PokemonType.water.value], 0.625)
+        self.assertEqual(TYPE_CHART[PokemonType.normal.value][PokemonType.ghost.value], 0.390625)
+        self.assertEqual(TYPE_CHART[PokemonType.normal.value][PokemonType.normal.value], 1.0)
+
+    def test_profile_matches_list_walk(self):
+        # compare type names throughout, so that the walk applies STAB and effectiveness
+        # together the way the chart does
+        for type1, type2 in itertools.combinations_with_replacement(PokemonType, 2):
+            profile = type_profile(type1, type2)
+            for move_type in PokemonType:
+                for stab, attacker_types in enumerate(((), (move_type.name,))):
+                    self.assertEqual(
+                        profile.damage[stab][move_type.value],
+                        list_walk_multiplier(move_type.name, attacker_types, (type1, type2)),
+                        f"{move_type} vs {type1}/{type2}"
+                    )
+
+    def test_battlers_match_list_walk(self):
+        for enum_moves, tm in itertools.product((False, True), repeat=2):
+            battlers = [make_battler(x, enum_moves, tm, idx) for idx, x in enumerate(MOVESETS)]
+            for attacker, defender in itertools.permutations(battlers, 2):
+                # both kinds of move type are compared as type names
+                defender_types = (defender.battlecard.poke_type1, defender.battlecard.poke_type2)
+                attacker_types = (attacker.battlecard.poke_type1, attacker.battlecard.poke_type2)
+                for move, move_type in move_slots(attacker):
+                    _, multiplier = calculate_damage(attacker, move, defender)
+                    self.assertEqual(
+                        multiplier,
+                        list_walk_multiplier(move_type, type_names(attacker), defender_types),
+                        f"{move} from {attacker.battlecard.name} vs {defender.battlecard.name}"
+                    )
+                count = 3 if tm else 2
+                attacker_moves = [x for _, x in move_slots(attacker)][:count]
+                defender_moves = [x for _, x in move_slots(defender)][:count]
+                self.assertEqual(
+                    analyze_type(attacker, defender),
+                    list_walk_advantage(attacker_moves, defender_types)
+                    - list_walk_advantage(defender_moves, attacker_types),
+                )
+
+    def test_advantage(self):
+        # grass / poison bulbasaur vs fire, water and ghost attacks
+        profile = type_profile(PokemonType.grass, PokemonType.poison)
+        self.assertEqual(profile.advantage[PokemonType.fire.value], 1)
+        self.assertEqual(profile.advantage[PokemonType.water.value], -1)
+        self.assertEqual(profile.advantage[PokemonType.ghost.value], 0)
+        # double weakness counts once, weakness and immunity stack
+        profile = type_profile(PokemonType.water, PokemonType.ground)
+        self.assertEqual(profile.advantage[PokemonType.grass.value], 1)
+        self.assertEqual(profile.advantage[PokemonType.electric.value], -1)
+
+    def test_as_pokemon_type(self):
+        self.assertEqual(as_pokemon_type('fire'), PokemonType.fire)
+        self.assertEqual(as_pokemon_type('Fire'), PokemonType.fire)
+        self.assertEqual(as_pokemon_type(PokemonType.ice), PokemonType.ice)
+        self.assertEqual(as_pokemon_type(None), PokemonType.none)
+
+    def test_move_type_forms_battle_alike(self):
+        # PokemonFactory cards used to miss type effectiveness and gamemaster typed cards used
+        # to miss STAB and weather, so the same teams fought differently
+        for seed, bonus_types in enumerate(([], [PokemonType.water, PokemonType.ice], [PokemonType.grass])):
+            results = []
+            for enum_moves in (False, True):
+                team1 = [make_card(x, enum_moves) for x in MOVESETS[:3]]
+                team2 = [make_card(x, enum_moves) for x in MOVESETS[3:]]
+                random.seed(seed)
+                with redirect_stdout(io.StringIO()):
+                    result = battle(team1, team2, bonus_types)
+                results.append((result["winner"], result["team1damagedealt"], result["team2damagedealt"]))
+            self.assertEqual(results[0], results[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,8 +13,6 @@ class Turn(Component):
     Keeps track of turn and stage
     """
 
-    CONFIG_PATH = 'data/stages.txt'
-
     def advance(self):
         self.state.turn_number += 1
         try:
@@ -41,25 +39,8 @@ class Turn(Component):
         return self.state.turn_number
 
     def initialize(self):
-
-        with open(self.CONFIG_PATH, 'r') as stages_file:
-            stages_raw = stages_file.readlines()
-
-        self.stages: T.Dict[int, StageConfig] = {}
-        turn_number = 1
-        for line in stages_raw:
-            # turn is unit indexed
-            if not line:
-                continue
-            if line.startswith('#'):
-                continue
-
-            entries = line.split()
-            stage = int(entries[0])
-            round = int(entries[1])
-            location = ' '.join(entries[2:])
-            self.stages[turn_number] = StageConfig(stage=stage, round=round, location=location)
-            turn_number += 1
+        # turn is unit indexed
+        self.stages: T.Mapping[int, StageConfig] = self.env.config.stages
 
     def turn_setup(self):
         self.advance()
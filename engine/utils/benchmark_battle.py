@@ -0,0 +1,422 @@
+"""
+Battle benchmarks
+
+Times `engine.batterulogico.battle` over a fixed set of scenarios and reports battles and
+ticks per second for each. Every scenario is a list of battle specs with fixed seeds, so the
+same battles (and the same number of ticks) get run every time and only the timings move.
+
+Tick counts are kept in `data/benchmarks/battle_ticks.json`, which is checked in. A
+scenario whose tick count changes played out differently, so `--compare` flags it on any
+machine. Rewrite the file with `--save-ticks` when a change is meant to alter battles.
+
+Timings depend on the machine, so the timing baseline is not checked in. Save one locally
+with `--save` before changing anything, and `--compare` will also flag every scenario that
+got slower than it by more than the tolerance.
+
+Usage:
+    python -m engine.utils.benchmark_battle
+    python -m engine.utils.benchmark_battle --save
+    python -m engine.utils.benchmark_battle --compare --tolerance 0.2
+    python -m engine.utils.benchmark_battle --save-ticks
+    python -m engine.utils.benchmark_battle --pool
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import typing as T
+
+from engine.battle import run_battle_job_batch
+from engine.battle import run_battle_specs
+from engine.batterulogico import WEATHER_NAMES
+from engine.batterulogico import battle
+from engine.batterulogico import moves
+from engine.models.battle import LogPolicy
+from engine.models.battle_spec import BattleJob
+from engine.models.battle_spec import BattleSpec
+from engine.models.enums import PokemonType
+from engine.models.items import CombinedItem
+from engine.models.pokemon import BattleCard
+from engine.utils.matchup_matrix import MOVESETS_PATH
+from engine.utils.matchup_matrix import load_movesets
+
+TICKS_PATH = 'data/benchmarks/battle_ticks.json'
+# the timing baseline only holds for the machine it was saved on, so it lives in the
+# untracked cache directory
+BASELINE_PATH = 'data/cache/battle_baseline.json'
+BASELINE_VERSION = 1
+BATTLES = 20
+ROUNDS = 3
+TOLERANCE = 0.25
+
+# teams for every scenario that does not pick its own Pokemon
+POOL = [
+    'charizard', 'blastoise', 'venusaur', 'pinsir', 'dragonite', 'snorlax',
+    'lapras', 'gengar', 'machamp', 'alakazam', 'gyarados', 'jolteon',
+]
+ITEM_LEVEL = 3
+# a turn has one battle per pair of players
+POOL_JOB_COUNTS = (1, 2, 4, 8)
+
+
+class Scenario(T.NamedTuple):
+    """
+    One named group of battles, one spec per battle
+    """
+
+    name: str
+    specs: T.Tuple[BattleSpec, ...]
+
+
+class ScenarioResult(T.NamedTuple):
+    """
+    Timings for the best of several rounds of a scenario
+    """
+
+    name: str
+    battles: int
+    ticks: int
+    seconds: float
+
+    @property
+    def battles_per_sec(self) -> float:
+        return self.battles / self.seconds if self.seconds else 0.0
+
+    @property
+    def ticks_per_sec(self) -> float:
+        return self.ticks / self.seconds if self.seconds else 0.0
+
+    def to_json(self) -> T.Dict[str, T.Any]:
+        return {
+            'battles': self.battles,
+            'ticks': self.ticks,
+            'battles_per_sec': round(self.battles_per_sec, 2),
+            'ticks_per_sec': round(self.ticks_per_sec, 1),
+        }
+
+
+class PoolResult(T.NamedTuple):
+    """
+    Timings for running one turn's battles in this process and in the shared worker pool
+    """
+
+    jobs: int
+    workers: int
+    serial: float
+    pooled: float
+
+
+def subclasses(cls: T.Type) -> T.List[T.Type]:
+    """
+    Every subclass of `cls`, in definition order
+    """
+    found = []
+    for sub in cls.__subclasses__():
+        found.append(sub)
+        found.extend(subclasses(sub))
+    return found
+
+
+def movers_by_speed(movesets: T.Dict[str, str], count: int) -> T.Tuple[T.List[str], T.List[str]]:
+    """
+    The `count` Pokemon with the fastest and the slowest fast moves
+    """
+    def cooldown(name: str) -> int:
+        return moves[movesets[name].split(',')[1]]['cooldown']
+
+    ordered = sorted(movesets, key=lambda name: (cooldown(name), name))
+    return ordered[:count], ordered[-count:]
+
+
+class ScenarioBuilder:
+    """
+    Builds battle specs out of the moveset file. Team members are picked by rotating
+    through a list of names, so each battle in a scenario is a different matchup. Items only
+    go to team 1, team 2 always fights without them.
+    """
+
+    def __init__(self, battles: int = BATTLES, movesets_path: str = MOVESETS_PATH):
+        self.battles = battles
+        self.movesets = load_movesets(movesets_path)
+
+    def card(self, name: str, item: T.Optional[T.Type[CombinedItem]] = None) -> BattleCard:
+        card = BattleCard.from_string(self.movesets[name])
+        card.give_item(item(level=ITEM_LEVEL) if item else None)
+        return card
+
+    def scenario(
+        self,
+        name: str,
+        size: int,
+        names: T.Sequence[str] = POOL,
+        item: T.Optional[T.Type[CombinedItem]] = None,
+        bonus_types: T.Sequence[PokemonType] = (),
+    ) -> Scenario:
+        specs = []
+        for seed in range(self.battles):
+            team1 = [names[(seed + i) % len(names)] for i in range(size)]
+            team2 = [names[(seed + size + i) % len(names)] for i in range(size)]
+            job = BattleJob(
+                team1_cards=[self.card(x, item) for x in team1],
+                team2_cards=[self.card(x) for x in team2],
+                bonus_types=list(bonus_types),
+                team1_hero=[],
+                team2_hero=[],
+                seed=seed,
+            )
+            specs.append(BattleSpec.from_job(job))
+        return Scenario(name, tuple(specs))
+
+    def build(self) -> T.List[Scenario]:
+        fast, slow = movers_by_speed(self.movesets, 6)
+        scenarios = [
+            self.scenario('1v1', 1),
+            self.scenario('3v3', 3),
+            self.scenario('fast_movers', 3, names=fast),
+            self.scenario('slow_movers', 3, names=slow),
+        ]
+        # every battler starts with one shield, so 3v3 doubles as the lightly shielded case.
+        # item_LightClay is the heavily shielded one, three more shields each
+        scenarios.extend(self.scenario(f'item_{cls.__name__}', 3, item=cls) for cls in subclasses(CombinedItem))
+        # no hero power scenarios: battle() takes hero powers, but HookExecutor only builds hook
+        # contexts from held items, so their combat hooks never run. A hero scenario would time
+        # an itemless battle with the fast path turned off
+        weathers = [(name, bonus_type) for bonus_type, name, _ in WEATHER_NAMES]
+        weathers.append(('Windy', PokemonType.flying))
+        scenarios.extend(
+            self.scenario(f"weather_{name.replace(' ', '_')}", 3, bonus_types=[bonus_type])
+            for name, bonus_type in weathers
+        )
+        return scenarios
+
+
+def build_scenarios(battles: int = BATTLES, movesets_path: str = MOVESETS_PATH) -> T.List[Scenario]:
+    return ScenarioBuilder(battles, movesets_path).build()
+
+
+def run_scenario(scenario: Scenario, rounds: int = ROUNDS, log_policy: LogPolicy = LogPolicy.NONE) -> ScenarioResult:
+    """
+    Run every battle in a scenario `rounds` times and keep the fastest round.
+
+    Battles use up items, so each round builds new live models from the specs before the
+    clock starts.
+    """
+    best = None
+    ticks = 0
+    for _ in range(rounds):
+        jobs = [spec.to_job() for spec in scenario.specs]
+        ticks = 0
+        start = time.perf_counter()
+        for job in jobs:
+            result = battle(
+                job.team1_cards,
+                job.team2_cards,
+                job.bonus_types,
+                team1_hero=job.team1_hero,
+                team2_hero=job.team2_hero,
+                log_policy=log_policy,
+                seed=job.seed,
+            )
+            ticks += result['ticks']
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return ScenarioResult(scenario.name, len(scenario.specs), ticks, best or 0.0)
+
+
+def run_pool_comparison(
+    counts: T.Sequence[int] = POOL_JOB_COUNTS,
+    workers: T.Optional[int] = None,
+    rounds: int = ROUNDS,
+) -> T.List[PoolResult]:
+    """
+    Time a turn's worth of 3v3 battles run in this process against the same battles run
+    through `run_battle_specs` in the shared pool, keeping the fastest round of each.
+
+    The pool is started before the clock does, since games keep it from turn to turn.
+    """
+    workers = workers or max(2, os.cpu_count() or 1)
+    specs = list(ScenarioBuilder(battles=max(counts)).scenario('3v3', 3).specs)
+    run_battle_specs(specs[:2], workers)
+    results = []
+    for count in counts:
+        timings = []
+        for run in (run_battle_job_batch, lambda x: run_battle_specs(x, workers)):
+            best = None
+            for _ in range(rounds):
+                start = time.perf_counter()
+                run(specs[:count])
+                elapsed = time.perf_counter() - start
+                if best is None or elapsed < best:
+                    best = elapsed
+            timings.append(best)
+        results.append(PoolResult(count, workers, *timings))
+    return results
+
+
+def format_pool_results(results: T.Iterable[PoolResult]) -> str:
+    lines = [f"{'battles':>8} {'workers':>8} {'serial ms':>10} {'pooled ms':>10} {'speedup':>8}"]
+    for result in results:
+        lines.append(
+            f"{result.jobs:>8} {result.workers:>8} {result.serial * 1000:>10.1f} "
+            f"{result.pooled * 1000:>10.1f} {result.serial / result.pooled:>8.2f}"
+        )
+    return '\n'.join(lines)
+
+
+def run_benchmarks(
+    scenarios: T.Iterable[Scenario],
+    rounds: int = ROUNDS,
+    log_policy: LogPolicy = LogPolicy.NONE,
+) -> T.List[ScenarioResult]:
+    return [run_scenario(scenario, rounds, log_policy) for scenario in scenarios]
+
+
+def write_json(data: T.Dict[str, T.Any], path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as json_file:
+        json.dump(data, json_file, indent=2, sort_keys=True)
+        json_file.write('\n')
+
+
+def read_json(path: str) -> T.Dict[str, T.Any]:
+    with open(path, 'r') as json_file:
+        data = json.load(json_file)
+    if data.get('version') != BASELINE_VERSION:
+        raise ValueError(f"Baseline {path} has version {data.get('version')}, expected {BASELINE_VERSION}")
+    return data
+
+
+def save_ticks(results: T.Iterable[ScenarioResult], path: str = TICKS_PATH):
+    data = {
+        'version': BASELINE_VERSION,
+        'results': {result.name: {'battles': result.battles, 'ticks': result.ticks} for result in results},
+    }
+    write_json(data, path)
+
+
+def load_ticks(path: str = TICKS_PATH) -> T.Dict[str, T.Any]:
+    return read_json(path)
+
+
+def save_baseline(results: T.Iterable[ScenarioResult], log_policy: LogPolicy, path: str = BASELINE_PATH):
+    data = {
+        'version': BASELINE_VERSION,
+        'log_policy': log_policy.value,
+        'results': {result.name: result.to_json() for result in results},
+    }
+    write_json(data, path)
+
+
+def load_baseline(path: str = BASELINE_PATH) -> T.Dict[str, T.Any]:
+    return read_json(path)
+
+
+def compare_ticks(results: T.Iterable[ScenarioResult], ticks: T.Dict[str, T.Any]) -> T.List[str]:
+    """
+    Describe every scenario whose battles played out differently from the recorded ones.
+    Scenarios that are missing or were recorded with a different number of battles are
+    skipped.
+    """
+    problems = []
+    for result in results:
+        before = ticks['results'].get(result.name)
+        if before is None or result.battles != before['battles']:
+            continue
+        if result.ticks != before['ticks']:
+            problems.append(f"{result.name}: ran {result.ticks} ticks, recorded {before['ticks']}")
+    return problems
+
+
+def compare(
+    results: T.Iterable[ScenarioResult],
+    baseline: T.Dict[str, T.Any],
+    tolerance: float = TOLERANCE,
+) -> T.List[str]:
+    """
+    Describe every scenario that got slower than the timing baseline by more than the
+    tolerance. Scenarios missing from the baseline are skipped.
+    """
+    problems = []
+    for result in results:
+        before = baseline['results'].get(result.name)
+        if before is None:
+            continue
+        floor = before['ticks_per_sec'] * (1 - tolerance)
+        if result.ticks_per_sec < floor:
+            problems.append(
+                f"{result.name}: {result.ticks_per_sec:.0f} ticks/s, "
+                f"baseline {before['ticks_per_sec']:.0f} ticks/s"
+            )
+    return problems
+
+
+def format_results(results: T.Iterable[ScenarioResult]) -> str:
+    lines = [f"{'scenario':<28} {'battles':>8} {'ticks':>8} {'battles/s':>10} {'ticks/s':>10}"]
+    for result in results:
+        lines.append(
+            f"{result.name:<28} {result.battles:>8} {result.ticks:>8} "
+            f"{result.battles_per_sec:>10.1f} {result.ticks_per_sec:>10.0f}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the battle engine")
+    parser.add_argument('scenarios', nargs='*', help="Scenario names to run, defaults to all of them")
+    parser.add_argument('--battles', type=int, default=BATTLES, help="Battles per scenario")
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help="Rounds per scenario, the fastest is kept")
+    parser.add_argument('--log-policy', default=LogPolicy.NONE.value, choices=[x.value for x in LogPolicy])
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Timing baseline for this machine")
+    parser.add_argument('--ticks', default=TICKS_PATH, help="Checked in tick counts")
+    parser.add_argument('--save', action='store_true', help="Write the timings to the baseline file")
+    parser.add_argument('--save-ticks', action='store_true', help="Write the tick counts to the ticks file")
+    parser.add_argument('--compare', action='store_true', help="Fail if any scenario regressed")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--pool', action='store_true', help="Compare a turn's battles in this process and in the worker pool")
+    parser.add_argument('--workers', type=int, default=None, help="Pool size for --pool, defaults to one per CPU")
+    args = parser.parse_args()
+
+    if args.pool:
+        print(f"{os.cpu_count()} CPUs")
+        print(format_pool_results(run_pool_comparison(workers=args.workers, rounds=args.rounds)))
+        return
+
+    log_policy = LogPolicy(args.log_policy)
+    scenarios = build_scenarios(args.battles)
+    if args.scenarios:
+        unknown = set(args.scenarios) - {x.name for x in scenarios}
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = [x for x in scenarios if x.name in args.scenarios]
+
+    results = run_benchmarks(scenarios, args.rounds, log_policy)
+    print(format_results(results))
+
+    if args.compare:
+        problems = compare_ticks(results, load_ticks(args.ticks))
+        if os.path.exists(args.baseline):
+            baseline = load_baseline(args.baseline)
+            if baseline['log_policy'] != log_policy.value:
+                print(f"Baseline was recorded with log policy {baseline['log_policy']}")
+            problems.extend(compare(results, baseline, args.tolerance))
+        else:
+            print(f"No timing baseline at {args.baseline}, only tick counts were compared. Save one on this machine with --save")
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+        print("No regressions")
+    if args.save:
+        save_baseline(results, log_policy, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+    if args.save_ticks:
+        save_ticks(results, args.ticks)
+        print(f"Tick counts written to {args.ticks}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,149 @@
 """
 Gamemaster dict
+
+The gamemaster is parsed once per process. Everything that needs it, including the battle
+engine, should go through the shared `gamemaster` instance below instead of reading the
+JSON again.
+
+The full pvpoke gamemaster is mostly data the game never reads, so only the parts it does
+read (settings, types, CP multipliers, species stats and moves) get loaded. Those are
+pickled to a cache keyed on the hash of the JSON, and later processes load the pickle.
+When the JSON changes, or the cache is missing or unreadable, the JSON is parsed again and
+the cache rebuilt.
+
+Usage:
+    python -m engine.utils.gamemaster
 """
+import argparse
+import hashlib
 import json
+import os
+import pickle
+import typing as T
+from functools import cached_property
+
 from munch import DefaultMunch
 
 from engine.models.enums import Move, PokemonId
 from engine.models.stats import Stats
 
 
-DEFAULT_PATH = 'battle_engine/src/data/gamemaster.json'
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_PATH = os.path.join(ROOT, 'battle_engine', 'src', 'data', 'gamemaster.json')
+CACHE_PATH = os.path.join(ROOT, 'data', 'cache', 'gamemaster.pkl')
+# bump this whenever compact_gamemaster changes what it keeps
+CACHE_VERSION = 1
+
+SECTIONS = ('settings', 'types', 'cpms', 'moves')
+POKEMON_FIELDS = ('dex', 'speciesId', 'speciesName', 'baseStats', 'types')
+
+
+def file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compact_gamemaster(full: T.Dict) -> T.Dict:
+    """
+    Keep the parts of the gamemaster the game reads. Species are cut down to their stats
+    and types, and species the game has no `PokemonId` for are dropped.
+    """
+    data = {section: full[section] for section in SECTIONS}
+    data['pokemon'] = [
+        {field: spec[field] for field in POKEMON_FIELDS if field in spec}
+        for spec in full['pokemon']
+        if spec['speciesId'] in PokemonId.__members__
+    ]
+    return data
+
+
+def read_cache(cache_path: str, digest: str) -> T.Optional[T.Dict]:
+    """
+    Load the cached gamemaster if it was built from a file with this digest
+    """
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cache = pickle.load(cache_file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError):
+        return None
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION or cache.get('digest') != digest:
+        return None
+    return cache['data']
+
+
+def write_cache(cache_path: str, digest: str, data: T.Dict) -> None:
+    directory = os.path.dirname(cache_path)
+    try:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # write and rename so an interrupted build never leaves a broken cache behind
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as cache_file:
+            pickle.dump(
+                {'version': CACHE_VERSION, 'digest': digest, 'data': data},
+                cache_file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError as exc:
+        # a read-only checkout still works, it just parses the JSON every time
+        print(f"Could not write gamemaster cache {cache_path}: {exc}")
+
+
+def load_gamemaster(path: str = DEFAULT_PATH, cache_path: T.Optional[str] = CACHE_PATH) -> T.Dict:
+    """
+    Load the compact gamemaster for the JSON at `path`, from the cache if it is up to date.
+
+    Pass `cache_path=None` to always parse the JSON.
+    """
+    digest = file_digest(path)
+    if cache_path:
+        data = read_cache(cache_path, digest)
+        if data is not None:
+            return data
+    with open(path, 'r') as gamemaster_json:
+        data = compact_gamemaster(json.load(gamemaster_json))
+    if cache_path:
+        write_cache(cache_path, digest, data)
+    return data
+
 
 class GameMaster:
     """
     Load gamemaster as JSON and support lookup with attributes
+
+    `gamemaster_dict` holds the compact gamemaster from `load_gamemaster`. Pokemon and
+    moves are indexed by `PokemonId` and `Move` when it is loaded, and moves are also
+    indexed by their gamemaster ID in `moves`.
     """
 
     ENV_PROXY = 'gm'
-    GAMEMASTER_PATH = 'battle_engine/src/data/gamemaster.json'
+    GAMEMASTER_PATH = DEFAULT_PATH
 
-    def __init__(self):
-        with open(self.GAMEMASTER_PATH, 'r') as gamemaster_json:
-            self.gamemaster_dict = json.load(gamemaster_json)
-        self.gamemaster = DefaultMunch.fromDict(self.gamemaster_dict)
+    def __init__(self, path: T.Optional[str] = None, cache_path: T.Optional[str] = CACHE_PATH):
+        self.path = path or self.GAMEMASTER_PATH
+        self.gamemaster_dict = load_gamemaster(self.path, cache_path)
+
+        self.cpms: T.List[float] = self.gamemaster_dict['cpms']
+        self.types: T.Dict[str, T.Dict] = self.gamemaster_dict['types']
+        self.moves: T.Dict[str, T.Dict] = {spec['moveId']: spec for spec in self.gamemaster_dict['moves']}
 
         # build a mapping of pokemon ID to spec
-        self.pokemon_spec = {}
+        self.pokemon_spec: T.Dict[PokemonId, T.Dict] = {}
         for spec in self.gamemaster_dict['pokemon']:
-            self.pokemon_spec[PokemonId[spec['speciesId']]] = spec
+            if spec['speciesId'] in PokemonId.__members__:
+                self.pokemon_spec[PokemonId[spec['speciesId']]] = spec
+        self.move_spec: T.Dict[Move, T.Dict] = {
+            Move[name]: spec for name, spec in self.moves.items() if name in Move.__members__
+        }
+
+    @cached_property
+    def gamemaster(self) -> DefaultMunch:
+        """
+        The compact gamemaster with attribute access. Built on first use, since nothing in
+        the game reads the gamemaster through it.
+        """
+        return DefaultMunch.fromDict(self.gamemaster_dict)
 
     def get_lvl_cpm(self, lvl: float) -> float:
         """
@@ -39,9 +156,7 @@ class GameMaster:
         """
         Get all default stats for a Pokemon
         """
-        for spec in self.gamemaster_dict['pokemon']:
-            if spec['speciesId'] == pokemon.name:
-                return spec
+        return self.pokemon_spec.get(pokemon)
 
     def get_default_move_stats(self, move: Move):
         """
@@ -49,11 +164,13 @@ class GameMaster:
         """
         if move is None:
             return None
-        for spec in self.gamemaster_dict['moves']:
-            if spec['moveId'] == move.name:
-                return spec
+        return self.move_spec.get(move)
 
     def __getattr__(self, attr: str):
+        # only called for attributes the instance does not have, so stop here for anything
+        # the munch itself depends on rather than recursing
+        if attr.startswith('_') or attr in ('gamemaster', 'gamemaster_dict'):
+            raise AttributeError(attr)
         return getattr(self.gamemaster, attr)
 
     def get_nickname(self, pokemon: PokemonId):
@@ -64,3 +181,20 @@ class GameMaster:
 
 
 gamemaster = GameMaster()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the compact gamemaster cache")
+    parser.add_argument('--gamemaster', default=DEFAULT_PATH)
+    parser.add_argument('--cache', default=CACHE_PATH)
+    args = parser.parse_args()
+
+    digest = file_digest(args.gamemaster)
+    with open(args.gamemaster, 'r') as gamemaster_json:
+        data = compact_gamemaster(json.load(gamemaster_json))
+    write_cache(args.cache, digest, data)
+    print(f"{len(data['pokemon'])} Pokemon and {len(data['moves'])} moves written to {args.cache}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Round-robin matchup matrix
+
+Simulates every 1v1 pairing in a list of Pokemon. Battle cards are built once from the
+moveset file, cells are sharded across a process pool and run through the batch simulator,
+and results are cached on disk so that only cells whose inputs changed get recomputed.
+
+A cell is keyed on both movesets, the weather, the gamemaster contents and the battle
+engine version. Every cell also gets a random seed derived from its key, so a cached
+result is exactly what rerunning the cell would give.
+
+Usage:
+    python -m engine.utils.matchup_matrix --output sample_results_with_tick.csv
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import typing as T
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine.batch_battle import simulate_batch
+from engine.batterulogico import ENGINE_VERSION
+from engine.models.enums import PokemonType
+from engine.models.pokemon import BattleCard
+from engine.utils.gamemaster import DEFAULT_PATH as GAMEMASTER_PATH
+
+MOVESETS_PATH = 'data/default_movesets.txt'
+CACHE_PATH = 'data/cache/matchup_matrix.json'
+CACHE_VERSION = 1
+SHARD_SIZE = 256
+
+
+def load_movesets(path: str = MOVESETS_PATH) -> T.Dict[str, str]:
+    """
+    Map Pokemon names to their moveset line.
+    """
+    with open(path, 'r') as movesets_file:
+        lines = [line.strip() for line in movesets_file]
+    return {line.split(',')[0]: line for line in lines if line}
+
+
+def build_cards(movesets: T.Dict[str, str], names: T.Iterable[str]) -> T.Dict[str, BattleCard]:
+    """
+    Build one itemless battle card per Pokemon.
+    """
+    cards = {}
+    for name in names:
+        card = BattleCard.from_string(movesets[name])
+        card.give_item(None)
+        cards[name] = card
+    return cards
+
+
+def file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def base_key(bonus_types: T.Iterable[PokemonType] = (), gamemaster_path: str = GAMEMASTER_PATH) -> str:
+    """
+    Hash of everything every cell depends on: gamemaster, engine version and weather.
+    """
+    parts = [file_digest(gamemaster_path), str(ENGINE_VERSION)]
+    parts.extend(sorted(x.name for x in bonus_types))
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+def cell_key(base: str, moveset1: str, moveset2: str) -> str:
+    return hashlib.sha256('|'.join((base, moveset1, moveset2)).encode()).hexdigest()
+
+
+def cell_seed(key: str) -> int:
+    return int(key[:8], 16)
+
+
+class MatchupCache:
+    """
+    Cell results stored as JSON, keyed by `cell_key`.
+
+    Each result is `[winner, team1 dealt, team1 taken, team2 dealt, team2 taken]`. Entries
+    for other name lists or weathers are kept around, since their keys never collide.
+    """
+
+    def __init__(self, path: T.Optional[str] = CACHE_PATH):
+        self.path = path
+        self.results: T.Dict[str, T.List[int]] = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as cache_file:
+                data = json.load(cache_file)
+            if data.get('version') == CACHE_VERSION:
+                self.results = data['results']
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # write and rename so an interrupted run never leaves a broken cache behind
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as cache_file:
+            json.dump({'version': CACHE_VERSION, 'results': self.results}, cache_file)
+        os.replace(tmp_path, self.path)
+
+
+class MatchupMatrix(T.NamedTuple):
+    """
+    Results for every (row, column) pairing, with the row Pokemon on team 1.
+
+    `winner` is 1 or 2 for the winning team and 0 for a tie. The damage arrays have one
+    entry per team in the last axis. `recomputed` counts cells that were not in the cache.
+    """
+
+    names: T.List[str]
+    winner: np.ndarray
+    damage_dealt: np.ndarray
+    damage_taken: np.ndarray
+    recomputed: int
+
+    def ratios(self) -> T.List[T.List[float]]:
+        """
+        Damage dealt over damage taken for the row Pokemon, as a percentage.
+        """
+        return [
+            [
+                round(int(self.damage_dealt[i, j, 0]) / (int(self.damage_taken[i, j, 0]) + 0.1), 3) * 100
+                for j in range(len(self.names))
+            ]
+            for i in range(len(self.names))
+        ]
+
+    def write_csv(self, path: str):
+        with open(path, 'w', newline='') as csvfile:
+            csvwriter = csv.writer(csvfile)
+            csvwriter.writerow([''] + list(self.names))
+            for name, row in zip(self.names, self.ratios()):
+                csvwriter.writerow([name] + row)
+
+
+def run_shard(
+    shard: T.Tuple[T.List[BattleCard], T.List[BattleCard], T.List[PokemonType], T.List[int]]
+) -> T.List[T.List[int]]:
+    """
+    Simulate one shard of cells. Runs in a worker process.
+    """
+    result = simulate_batch(*shard)
+    return np.column_stack([
+        result.winner,
+        result.damage_dealt[:, 0],
+        result.damage_taken[:, 0],
+        result.damage_dealt[:, 1],
+        result.damage_taken[:, 1],
+    ]).tolist()
+
+
+def matchup_matrix(
+    names: T.Sequence[str],
+    movesets_path: str = MOVESETS_PATH,
+    bonus_types: T.Sequence[PokemonType] = (),
+    cache_path: T.Optional[str] = CACHE_PATH,
+    max_workers: T.Optional[int] = None,
+    shard_size: int = SHARD_SIZE,
+) -> MatchupMatrix:
+    """
+    Build the matchup matrix for `names`, reusing cached cells where possible.
+
+    Pass `cache_path=None` to skip the disk cache.
+    """
+    names = list(names)
+    movesets = load_movesets(movesets_path)
+    cards = build_cards(movesets, set(names))
+    cache = MatchupCache(cache_path)
+    base = base_key(bonus_types)
+
+    keys = {}
+    pending = []
+    for row in names:
+        for col in names:
+            key = cell_key(base, movesets[row], movesets[col])
+            keys[row, col] = key
+            if key not in cache.results:
+                pending.append((row, col, key))
+    # the same pairing can show up more than once if names repeat
+    pending = list({key: (row, col, key) for row, col, key in pending}.values())
+
+    shards = []
+    for start in range(0, len(pending), shard_size):
+        cells = pending[start:start + shard_size]
+        shards.append((
+            [cards[row] for row, _, _ in cells],
+            [cards[col] for _, col, _ in cells],
+            list(bonus_types),
+            [cell_seed(key) for _, _, key in cells],
+        ))
+    if len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            shard_results = list(pool.map(run_shard, shards))
+    else:
+        shard_results = [run_shard(shard) for shard in shards]
+
+    for start, results in zip(range(0, len(pending), shard_size), shard_results):
+        for (_, _, key), result in zip(pending[start:start + shard_size], results):
+            cache.results[key] = result
+    if pending:
+        cache.save()
+
+    size = len(names)
+    table = np.array(
+        [[cache.results[keys[row, col]] for col in names] for row in names],
+        dtype=np.int64,
+    ).reshape(size, size, 5)
+    return MatchupMatrix(
+        names=names,
+        winner=table[:, :, 0],
+        damage_dealt=table[:, :, [1, 3]],
+        damage_taken=table[:, :, [2, 4]],
+        recomputed=len(pending),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a round-robin 1v1 matchup matrix")
+    parser.add_argument('names', nargs='*', help="Pokemon to include, defaults to every moveset")
+    parser.add_argument('--movesets', default=MOVESETS_PATH)
+    parser.add_argument('--weather', nargs='*', default=[], help="Pokemon types with a weather bonus")
+    parser.add_argument('--cache', default=CACHE_PATH)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='sample_results_with_tick.csv')
+    args = parser.parse_args()
+
+    names = args.names or list(load_movesets(args.movesets))
+    matrix = matchup_matrix(
+        names,
+        movesets_path=args.movesets,
+        bonus_types=[PokemonType[x] for x in args.weather],
+        cache_path=args.cache,
+        max_workers=args.workers,
+    )
+    matrix.write_csv(args.output)
+    print(f"{len(names) ** 2} cells, {matrix.recomputed} recomputed, written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Type effectiveness chart
+
+Dense multiplier tables indexed by `PokemonType` value, built once from the gamemaster
+`types` data. The battle engine uses these instead of walking resistance / weakness lists.
+"""
+import typing as T
+from functools import lru_cache
+
+from engine.models.enums import PokemonType
+from engine.utils.gamemaster import gamemaster
+
+STAB_MULT = 1.2
+RESISTANCE_MULT = 0.625
+WEAKNESS_MULT = 1.6
+IMMUNITY_MULT = 0.390625  # make this 0 if you're real
+
+NUM_TYPES = len(PokemonType)
+
+
+def as_pokemon_type(value: T.Union[PokemonType, str, None]) -> PokemonType:
+    """
+    Coerce a type reference into a PokemonType.
+
+    Move types read straight from gamemaster are lowercase strings, while the PokemonFactory
+    assigns enums. Both forms show up on battle cards.
+    """
+    if isinstance(value, PokemonType):
+        return value
+    if not value:
+        return PokemonType.none
+    return PokemonType[value.lower()]
+
+
+def build_type_chart(types: T.Dict[str, T.Dict[str, T.List[str]]]) -> T.Tuple[T.Tuple[float, ...], ...]:
+    """
+    Build the single-type multiplier chart.
+
+    Indexed as `chart[attacking_type.value][defending_type.value]`.
+    """
+    chart = [[1.0] * NUM_TYPES for _ in range(NUM_TYPES)]
+    for defending in PokemonType:
+        spec = types.get(defending.name)
+        if spec is None:
+            continue
+        for attacking in spec["resistances"]:
+            chart[PokemonType[attacking].value][defending.value] = RESISTANCE_MULT
+        for attacking in spec["weaknesses"]:
+            chart[PokemonType[attacking].value][defending.value] = WEAKNESS_MULT
+        for attacking in spec["immunities"]:
+            chart[PokemonType[attacking].value][defending.value] = IMMUNITY_MULT
+    return tuple(tuple(row) for row in chart)
+
+
+TYPE_CHART = build_type_chart(gamemaster.gamemaster_dict['types'])
+
+
+class TypeProfile(T.NamedTuple):
+    """
+    Precomputed defensive data for a (deduplicated) set of Pokemon types.
+
+    `damage[stab][attacking_type.value]` is the full damage multiplier for a move hitting this
+    profile, with `stab` being 1 if the attacker gets a same-type bonus. The product is taken
+    in the same order the engine historically applied it (STAB, resistances, weaknesses,
+    immunities) so results are unchanged down to the last bit.
+
+    `advantage[attacking_type.value]` is the discrete matchup score used for switching:
+    +1 if any type is weak, -1 if any type resists and -2 if any type is immune.
+    """
+
+    types: T.FrozenSet[PokemonType]
+    damage: T.Tuple[T.Tuple[float, ...], T.Tuple[float, ...]]
+    advantage: T.Tuple[int, ...]
+
+
+@lru_cache(maxsize=None)
+def _type_profile(types: T.FrozenSet[PokemonType]) -> TypeProfile:
+    damage = ([], [])
+    advantage = []
+    for attacking in range(NUM_TYPES):
+        row = [TYPE_CHART[attacking][defending.value] for defending in types]
+        resisted = row.count(RESISTANCE_MULT)
+        weak = row.count(WEAKNESS_MULT)
+        immune = row.count(IMMUNITY_MULT)
+        for stab, start in enumerate((1, STAB_MULT)):
+            multiplier = start
+            for _ in range(resisted):
+                multiplier *= RESISTANCE_MULT
+            for _ in range(weak):
+                multiplier *= WEAKNESS_MULT
+            for _ in range(immune):
+                multiplier *= IMMUNITY_MULT
+            damage[stab].append(multiplier)
+        advantage.append(bool(weak) - bool(resisted) - 2 * bool(immune))
+    return TypeProfile(
+        types=types,
+        damage=(tuple(damage[0]), tuple(damage[1])),
+        advantage=tuple(advantage),
+    )
+
+
+def type_profile(type1: PokemonType, type2: PokemonType = None) -> TypeProfile:
+    """
+    Get the (cached) type profile for a Pokemon with the given types.
+    """
+    return _type_profile(frozenset(as_pokemon_type(x) for x in (type1, type2 or type1)))